@@ -0,0 +1,187 @@
+"""
+坦克大战资源管理
+字体：按名称查找到的字体文件路径保存在磁盘缓存中，以后启动时直接按路径加载，不再扫描系统字体列表
+（字体没有找到也会记录，删除缓存文件即可重新查找）；同一字体和字号在进程中只创建一次。
+缓存文件位于 $XDG_CACHE_HOME/tank_battle/fonts.json（默认 ~/.cache），可以用环境变量TANK_FONT_CACHE指定，
+TANK_FONT_CACHE为空或者无界面模式（TANK_HEADLESS=1）时不读写磁盘缓存
+音效：在后台线程中初始化音频系统并加载音效和背景音乐，菜单不用等待音频就能显示，
+每个音效加载完成后才能播放（播放由sound_queue统一处理），加载完成后游戏自动获得声音；
+退出前调用stop_audio，等后台线程结束后再关闭pygame
+"""
+import json
+import os
+import threading
+
+import pygame
+
+FONT_CACHE_VERSION = 1
+SOUND_DIR = 'sounds'
+SOUND_FILES = {
+    'shoot': 'shoot.wav',
+    'explosion': 'explosion.wav',
+    'hit': 'hit.wav',
+    'power_up': 'power_up.wav',
+    'game_over': 'game_over.wav',
+    'level_up': 'level_up.wav',
+}
+MUSIC_FILE = 'background.mp3'
+MUSIC_VOLUME = 0.5
+
+
+def default_font_cache_path():
+    # 字体缓存文件的路径，返回None时不使用磁盘缓存
+    if 'TANK_FONT_CACHE' in os.environ:
+        return os.environ['TANK_FONT_CACHE'] or None
+    if os.environ.get('TANK_HEADLESS') == '1':
+        return None
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'tank_battle', 'fonts.json')
+
+
+class AssetManager:
+    def __init__(self, font_cache_path=None, sound_dir=SOUND_DIR):
+        # font_cache_path省略时按环境变量决定（见default_font_cache_path），空字符串表示不使用磁盘缓存
+        self.font_cache_path = font_cache_path if font_cache_path is not None else default_font_cache_path()
+        self.sound_dir = sound_dir
+        self.fonts = {}  # (字体名, 字号, 粗体) -> Font
+        self.font_paths = None  # 字体名和粗体 -> [字体文件路径, 是否需要模拟粗体]，None表示未找到，首次使用时从磁盘读取
+        self.sounds = {}  # 已经加载完成的音效
+        self.audio_enabled = False
+        self.music_loaded = False
+        self.loaded = threading.Event()  # 后台音频加载结束（无论成功与否）
+        self.stopping = threading.Event()  # 游戏正在退出，后台线程不再调用pygame.mixer
+        self.loader = None
+
+    # 字体
+    def font(self, name, size, bold=False):
+        # name可以是单个字体名，也可以是按优先级排列的字体名元组，都找不到时使用pygame默认字体
+        key = (name, size, bold)
+        font = self.fonts.get(key)
+        if font is None:
+            names = name if isinstance(name, tuple) else (name,)
+            for candidate in names:
+                entry = self.font_path(candidate, bold)
+                if entry is None:
+                    continue
+                path, fake_bold = entry
+                try:
+                    font = pygame.font.Font(path, size)
+                except Exception:
+                    continue
+                font.set_bold(fake_bold)
+                break
+            else:
+                font = pygame.font.Font(None, size)
+                font.set_bold(bold)
+            self.fonts[key] = font
+        return font
+
+    def font_path(self, name, bold):
+        if self.font_paths is None:
+            self.font_paths = self._read_font_cache()
+        key = f'{name}|{int(bold)}'
+        if key in self.font_paths:
+            entry = self.font_paths[key]
+            # 字体文件被删除或移动后重新查找
+            if entry is None or os.path.exists(entry[0]):
+                return entry
+        # 只有缓存中没有时才扫描系统字体列表
+        path = pygame.font.match_font(name, bold=bold)
+        entry = None
+        if path is not None:
+            # 没有单独的粗体文件时和SysFont一样模拟粗体
+            entry = [path, bool(bold) and path == pygame.font.match_font(name)]
+        self.font_paths[key] = entry
+        self._write_font_cache()
+        return entry
+
+    def _read_font_cache(self):
+        if not self.font_cache_path:
+            return {}
+        try:
+            with open(self.font_cache_path, encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == FONT_CACHE_VERSION:
+                return data['fonts']
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass
+        return {}
+
+    def _write_font_cache(self):
+        # 先写临时文件再替换，多个进程同时启动时不会读到写了一半的文件；写不了时只在本进程内缓存
+        if not self.font_cache_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.font_cache_path), exist_ok=True)
+            temp_path = f'{self.font_cache_path}.{os.getpid()}.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': FONT_CACHE_VERSION, 'fonts': self.font_paths}, f, ensure_ascii=False, indent=1)
+            os.replace(temp_path, self.font_cache_path)
+        except OSError:
+            pass
+
+    # 音频
+    def start_audio(self):
+        # 在后台线程中加载音频，重复调用不会重复加载
+        if self.loader is None:
+            self.loader = threading.Thread(target=self._load_audio, name='audio-loader', daemon=True)
+            self.loader.start()
+
+    def stop_audio(self):
+        # 退出前调用：通知后台线程停止加载并等待它结束，之后才能安全地调用pygame.quit
+        self.stopping.set()
+        if self.loader is not None:
+            self.loader.join()
+
+    def _load_audio(self):
+        try:
+            if self.stopping.is_set():
+                return
+            try:
+                pygame.mixer.init()
+            except Exception:
+                print("警告：音频系统初始化失败，游戏将在无声模式下运行")
+                return
+            self.audio_enabled = True
+            if not os.path.isdir(self.sound_dir):
+                print(f"警告：{self.sound_dir}文件夹不存在，游戏将在无声模式下运行")
+                return
+            for name, filename in SOUND_FILES.items():
+                if self.stopping.is_set():
+                    return
+                sound = self._load_sound(filename)
+                if sound is not None:
+                    # 每个音效加载完成后立即可以播放
+                    self.sounds[name] = sound
+            if not self.stopping.is_set():
+                self.music_loaded = self._load_music(MUSIC_FILE)
+        finally:
+            self.loaded.set()
+
+    def _load_sound(self, filename):
+        sound_path = os.path.join(self.sound_dir, filename)
+        if not os.path.exists(sound_path):
+            print(f"警告：音效文件不存在: {sound_path}")
+            return None
+        try:
+            return pygame.mixer.Sound(sound_path)
+        except Exception:
+            print(f"警告：无法加载音效: {sound_path}")
+            return None
+
+    def _load_music(self, filename):
+        music_path = os.path.join(self.sound_dir, filename)
+        if not os.path.exists(music_path):
+            print(f"警告：背景音乐文件不存在: {music_path}")
+            return False
+        try:
+            pygame.mixer.music.load(music_path)
+            pygame.mixer.music.set_volume(MUSIC_VOLUME)
+            return True
+        except Exception:
+            print(f"警告：无法加载背景音乐: {music_path}")
+            return False
+
+
+# 进程内共用的资源管理器
+assets = AssetManager()
@@ -0,0 +1,123 @@
+"""
+坦克大战静态背景层
+把墙壁预先绘制到离屏Surface上，墙被摧毁时只重绘变化的格子；
+每帧用背景层擦除上一帧实体所在的区域，不再整屏填充和逐个绘制墙壁
+
+地图按区块绘制：每个区块的墙壁绘制到单独的Surface上，最近用过的区块缓存起来，
+视野移动时只用可见区块拼出屏幕大小的背景，不需要绘制整个地图
+"""
+from collections import OrderedDict
+
+import pygame
+
+from config import BLACK, GRAY, DARK_GRAY, CHUNK_SIZE, BACKGROUND_CHUNK_CACHE
+from wall_grid import BRICK, EMPTY
+
+WALL_COLORS = {
+    BRICK: GRAY,  # 灰色可破坏墙
+}
+STEEL_COLOR = DARK_GRAY  # 深灰色不可破坏墙
+
+
+class BackgroundLayer:
+    def __init__(self, size, chunk_size=CHUNK_SIZE, cache_size=BACKGROUND_CHUNK_CACHE):
+        self.surface = pygame.Surface(size)  # 当前视野的背景，屏幕坐标
+        self.grid = None
+        self.view = None  # 背景对应的视野矩形（世界坐标）
+        self.chunk_size = chunk_size  # 区块边长（格子数）
+        self.cache_size = cache_size
+        self.chunks = OrderedDict()  # (区块列, 区块行) -> 区块Surface，按最近使用的顺序排列
+        self.dirty_cells = set()
+        self.full = True  # 是否需要整体重绘
+
+    def attach(self, grid):
+        # 绑定墙壁网格，网格对象更换时整体重绘
+        if grid is self.grid:
+            return
+        self.grid = grid
+        grid.add_listener(self.invalidate)
+        self.full = True
+
+    def invalidate(self, col, row):
+        if col is None:
+            self.full = True
+        else:
+            self.dirty_cells.add((col, row))
+
+    @staticmethod
+    def _fill_cell(surface, rect, kind):
+        if kind == EMPTY:
+            surface.fill(BLACK, rect)
+        else:
+            surface.fill(WALL_COLORS.get(kind, STEEL_COLOR), rect)
+
+    def _chunk(self, chunk_col, chunk_row):
+        # 取出区块Surface，不在缓存中时绘制，缓存满时丢弃最久没用过的区块
+        key = (chunk_col, chunk_row)
+        surface = self.chunks.get(key)
+        if surface is not None:
+            self.chunks.move_to_end(key)
+            return surface
+        grid = self.grid
+        size = grid.cell_size
+        chunk_size = self.chunk_size
+        surface = pygame.Surface((chunk_size * size, chunk_size * size))
+        surface.fill(BLACK)
+        col0, row0 = chunk_col * chunk_size, chunk_row * chunk_size
+        types = grid.types
+        for row in range(row0, min(row0 + chunk_size, grid.rows)):
+            base = row * grid.cols
+            for col in range(col0, min(col0 + chunk_size, grid.cols)):
+                kind = types[base + col]
+                if kind:
+                    self._fill_cell(surface, ((col - col0) * size, (row - row0) * size, size, size), kind)
+        self.chunks[key] = surface
+        if len(self.chunks) > self.cache_size:
+            self.chunks.popitem(last=False)
+        return surface
+
+    def _compose(self):
+        # 用可见区块拼出视野的背景
+        view = self.view
+        span = self.chunk_size * self.grid.cell_size
+        self.surface.fill(BLACK)
+        chunk_cols = -(-self.grid.cols // self.chunk_size)
+        chunk_rows = -(-self.grid.rows // self.chunk_size)
+        blits = []
+        for chunk_row in range(max(view.top // span, 0), min((view.bottom - 1) // span + 1, chunk_rows)):
+            for chunk_col in range(max(view.left // span, 0), min((view.right - 1) // span + 1, chunk_cols)):
+                blits.append((self._chunk(chunk_col, chunk_row),
+                              (chunk_col * span - view.x, chunk_row * span - view.y)))
+        self.surface.blits(blits, doreturn=False)
+
+    def refresh(self, view=None):
+        # 重绘变化的格子，返回需要在屏幕上更新的区域（屏幕坐标）；整体重绘或视野移动时返回None
+        # view为视野在世界中的矩形，省略时视野就是整个背景
+        if view is None:
+            view = self.surface.get_rect()
+        if self.full:
+            self.chunks.clear()
+            self.dirty_cells.clear()
+        redraw = self.full or view != self.view
+        grid = self.grid
+        size = grid.cell_size
+        chunk_size = self.chunk_size
+        rects = []
+        for col, row in self.dirty_cells:
+            kind = grid.get(col, row)
+            # 已缓存的区块同步更新，没有缓存的区块下次使用时会按最新的墙壁绘制
+            chunk = self.chunks.get((col // chunk_size, row // chunk_size))
+            if chunk is not None:
+                self._fill_cell(chunk, ((col % chunk_size) * size, (row % chunk_size) * size, size, size), kind)
+            if not redraw:
+                rect = pygame.Rect(col * size - view.x, row * size - view.y, size, size)
+                if rect.colliderect(self.surface.get_rect()):
+                    self._fill_cell(self.surface, rect, kind)
+                    rects.append(rect)
+        self.dirty_cells.clear()
+        if redraw:
+            self.full = False
+            self.view = pygame.Rect(view)
+            self._compose()
+            return None
+        return rects
@@ -0,0 +1,214 @@
+"""
+坦克大战批量模拟
+在进程池中并行运行大量无界面游戏，用于AI调参和难度平衡：
+参数网格中的每组config.py覆盖值与每个种子组合成一局游戏，
+每局结束后结果立即追加到JSONL结果文件，最后按参数组合汇总
+
+参数网格可以用JSON文件给出（{"常量名": [取值, ...]} 或覆盖值字典的列表），
+也可以用 --set 常量名=取值1,取值2 逐个给出，多个常量之间取笛卡尔积。
+只能覆盖TUNABLES中列出的常量：它们都在模拟过程中按名称读取，其他常量（例如BLOCK_SIZE、BULLET_SIZE）
+在导入时已经用来计算了别的值（子弹发射位置、精灵大小、默认参数），改了也不会生效
+
+用法：python batch.py --set ENEMY_SHOOT_CHANCE=0.01,0.02 --set BULLET_DAMAGE=25,50 --seeds 100
+      python batch.py --grid grid.json --seeds 1000 --output results.jsonl
+"""
+import argparse
+import ast
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import config
+from headless import INPUTS, RandomInput, run_headless
+
+MAX_TICKS = 36000  # 每局最多模拟的帧数（10分钟游戏时间），保证每局都能结束
+MAX_TASKS_PER_CHILD = 200  # 每个工作进程运行这么多局后重启，限制内存增长
+PENDING_PER_WORKER = 4  # 每个工作进程最多排队的任务数，任务再多也不会一次全部提交
+# 可以覆盖的config.py常量
+TUNABLES = (
+    'ENEMY_SPAWN_TIME', 'ENEMY_DIRECTION_CHANGE_CHANCE', 'ENEMY_WANDER_TIME', 'ENEMY_SHOOT_CHANCE',
+    'ENEMY_AIMED_FIRE', 'ENEMY_AIM_CHANCE',
+    'PLAYER_SPEED', 'PLAYER_COOLDOWN',
+    'BULLET_SPEED', 'BULLET_DAMAGE', 'BULLET_COLLISION',
+    'WALL_BREAKABLE_CHANCE', 'MAP_OBSTACLE_COUNT',
+    'POWER_UP_SPAWN_TIME', 'POWER_UP_MAX_COUNT', 'POWER_UP_LIFETIME',
+    'HEALTH_RESTORE_AMOUNT', 'SPEED_BOOST_DURATION', 'SPEED_BOOST_MULTIPLIER', 'SHIELD_DURATION',
+)
+
+
+def parse_value(text):
+    # 按Python字面量解析，解析失败时当作字符串
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        return text
+
+
+def parse_set(spec):
+    # "常量名=取值1,取值2" -> (常量名, [取值1, 取值2])
+    name, sep, values = spec.partition('=')
+    if not sep or not values:
+        raise argparse.ArgumentTypeError(f'格式应为 常量名=取值1,取值2: {spec}')
+    return name.strip(), [parse_value(value.strip()) for value in values.split(',')]
+
+
+def expand_grid(grid):
+    # 参数网格 -> 覆盖值字典的列表
+    if isinstance(grid, list):
+        return [dict(overrides) for overrides in grid]
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def validate_overrides(combos):
+    for overrides in combos:
+        for name in overrides:
+            if name not in TUNABLES:
+                raise ValueError(f'不能覆盖的常量: {name}（可以覆盖: {", ".join(TUNABLES)}）')
+
+
+def apply_overrides(overrides):
+    # 把覆盖值写入config以及所有用 from config import * 导入了该常量的模块，返回恢复用的原值
+    saved = []
+    for name, value in overrides.items():
+        original = getattr(config, name)
+        for module in list(sys.modules.values()):
+            namespace = getattr(module, '__dict__', None)
+            if namespace is not None and name in namespace and namespace[name] is original:
+                saved.append((namespace, name, original))
+                namespace[name] = value
+    return saved
+
+
+def restore_overrides(saved):
+    for namespace, name, original in reversed(saved):
+        namespace[name] = original
+
+
+def run_game(task):
+    # 在工作进程中运行一局游戏（任务之间恢复config，工作进程可以安全复用）
+    task_id, overrides, seed, max_ticks, input_name = task
+    saved = apply_overrides(overrides)
+    try:
+        input_source = RandomInput(seed) if input_name == 'random' else INPUTS[input_name]()
+        result = run_headless(max_ticks, input_source, seed=seed)
+    finally:
+        restore_overrides(saved)
+    return {
+        'id': task_id,
+        'overrides': overrides,
+        'seed': seed,
+        'level': result['level'],
+        'score': result['score'],
+        'ticks': result['ticks'],
+        'game_over': result['game_over'],
+        'ticks_per_second': result['ticks_per_second'],
+        'worker': os.getpid(),
+    }
+
+
+def make_tasks(combos, seeds, max_ticks, input_name):
+    task_id = 0
+    for overrides in combos:
+        for seed in seeds:
+            yield task_id, overrides, seed, max_ticks, input_name
+            task_id += 1
+
+
+def run_batch(combos, seeds, output, workers=None, max_ticks=MAX_TICKS, input_name='random',
+              max_tasks_per_child=MAX_TASKS_PER_CHILD, progress=True):
+    # 并行运行所有 (参数组合, 种子)，结果按完成顺序写入output，返回每个参数组合的汇总
+    validate_overrides(combos)
+    workers = workers or os.cpu_count() or 1
+    total = len(combos) * len(seeds)
+    tasks = make_tasks(combos, seeds, max_ticks, input_name)
+    summary = {}
+    done = 0
+    start = time.perf_counter()
+
+    with open(output, 'w', encoding='utf-8') as f, \
+            ProcessPoolExecutor(workers, max_tasks_per_child=max_tasks_per_child) as executor:
+        pending = set()
+        while True:
+            # 保持队列中只有有限的任务，内存占用与总局数无关
+            while len(pending) < workers * PENDING_PER_WORKER:
+                task = next(tasks, None)
+                if task is None:
+                    break
+                pending.add(executor.submit(run_game, task))
+            if not pending:
+                break
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                result = future.result()
+                f.write(json.dumps(result, ensure_ascii=False) + '\n')
+                f.flush()
+                key = json.dumps(result['overrides'], sort_keys=True)
+                stats = summary.setdefault(key, {'overrides': result['overrides'], 'games': 0, 'level': 0,
+                                                 'score': 0, 'ticks': 0, 'game_over': 0})
+                stats['games'] += 1
+                stats['level'] += result['level']
+                stats['score'] += result['score']
+                stats['ticks'] += result['ticks']
+                stats['game_over'] += result['game_over']
+                done += 1
+            if progress:
+                elapsed = time.perf_counter() - start
+                print(f"\r已完成 {done}/{total} 局  {elapsed:.1f}s", end='', flush=True)
+    if progress:
+        print()
+
+    for stats in summary.values():
+        games = stats['games']
+        stats['level'] /= games
+        stats['score'] /= games
+        stats['ticks'] /= games
+        stats['game_over'] /= games
+    return list(summary.values())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='坦克大战批量模拟')
+    parser.add_argument('--grid', metavar='FILE', default=None, help='JSON格式的参数网格')
+    parser.add_argument('--set', dest='sets', metavar='NAME=V1,V2', type=parse_set, action='append', default=[],
+                        help='覆盖config.py中的常量，可重复使用')
+    parser.add_argument('--seeds', type=int, default=10, help='每个参数组合运行的局数（种子0..N-1）')
+    parser.add_argument('--first-seed', type=int, default=0, help='第一个种子')
+    parser.add_argument('--ticks', type=int, default=MAX_TICKS, help='每局最多模拟的帧数')
+    parser.add_argument('--input', choices=sorted(INPUTS), default='random', help='脚本化输入类型')
+    parser.add_argument('--workers', type=int, default=None, help='工作进程数（默认为CPU核数）')
+    parser.add_argument('--max-tasks-per-child', type=int, default=MAX_TASKS_PER_CHILD,
+                        help='每个工作进程运行多少局后重启')
+    parser.add_argument('--output', default='batch_results.jsonl', help='每局结果的JSONL文件')
+    args = parser.parse_args(argv)
+
+    grid = {}
+    if args.grid:
+        with open(args.grid, encoding='utf-8') as f:
+            grid = json.load(f)
+    if args.sets:
+        if isinstance(grid, list):
+            parser.error('--set 不能与列表形式的参数网格同时使用')
+        grid.update(dict(args.sets))
+    combos = expand_grid(grid) if grid else [{}]
+    seeds = list(range(args.first_seed, args.first_seed + args.seeds))
+
+    try:
+        validate_overrides(combos)
+    except ValueError as e:
+        parser.error(str(e))
+    summary = run_batch(combos, seeds, args.output, args.workers, args.ticks, args.input,
+                        args.max_tasks_per_child)
+    print(f"结果已保存: {args.output}")
+    for stats in summary:
+        overrides = '  '.join(f'{name}={value}' for name, value in stats['overrides'].items()) or '默认配置'
+        print(f"{overrides}: {stats['games']}局  平均等级 {stats['level']:.2f}  平均分数 {stats['score']:.1f}  "
+              f"平均存活 {stats['ticks']:.0f}帧  结束率 {stats['game_over']:.0%}")
+    return summary
+
+
+if __name__ == "__main__":
+    main()
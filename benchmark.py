@@ -0,0 +1,308 @@
+"""
+坦克大战模拟性能基准测试
+在无界面模式下构造脚本化场景（大量敌人、子弹、障碍物、道具），按规模递增测量每个模拟阶段
+每帧的耗时，输出JSON格式的结果和缩放曲线，并可以与保存的基准结果对比，提前发现O(n²)退化
+
+用法：
+    python benchmark.py --output result.json
+    python benchmark.py --baseline result.json     # 与基准对比，有退化时返回非零退出码
+    python benchmark.py --quick --scenario bullets
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+
+# 必须在导入游戏模块之前设置
+os.environ['TANK_HEADLESS'] = '1'
+
+import numpy as np
+import pygame
+
+from config import *
+from 坦克大战 import TankGame
+from ecs import ENEMY, POWER_UP
+from game_state import save_state, load_state
+
+# 测量的模拟阶段
+PHASES = [
+    'update_tank_timers',
+    'handle_player_movement',
+    'update_enemies',
+    'update_bullets',
+    'update_power_ups',
+    'update_explosions',
+    'spawn_enemies',
+    'spawn_power_up',
+    'save_state',
+    'load_state',
+]
+
+# 场景：每个场景只改变一个规模参数，其余参数使用默认值
+DEFAULTS = {'enemies': 10, 'bullets': 100, 'obstacles': 30, 'power_ups': 3}
+SCENARIOS = {
+    'enemies': [10, 50, 100, 200],
+    'bullets': [100, 1000, 5000, 10000],
+    'obstacles': [30, 100, 200, 300],  # 稀疏到密集的地图
+    'power_ups': [3, 20, 50, 100],
+}
+QUICK_SIZES = 2  # 快速模式只测每个场景的前两个规模
+REPEATS = 5  # 每个规模重复测量的次数，对比时取各次中位数的最小值，排除偶然的系统干扰
+
+REGRESSION_THRESHOLD = 1.25  # 比基准慢25%以上视为退化
+MIN_DELTA_MS = 0.1  # 忽略小于该值的差异：亚毫秒级阶段的计时噪声就有几十微秒
+EXPONENT_THRESHOLD = 0.5  # 缩放指数比基准增加超过该值视为复杂度退化
+
+
+class Scenario:
+    def __init__(self, enemies, bullets, obstacles, power_ups, seed=0):
+        self.enemies = enemies
+        self.bullets = bullets
+        self.power_ups = power_ups
+        self.random = random.Random(seed)
+        self.game = TankGame(headless=True, seed=seed)
+        game = self.game
+        game.reset_game()
+        # 重新生成指定密度的地图
+        game.walls = game.world.create_grid()
+        game.spawn_cells.attach(game.walls)
+        game.create_map(obstacles)
+        for enemy in game.entities.query(ENEMY):
+            game.entities.remove(enemy)
+
+    def free_cell(self):
+        # 在整个地图中随机找一个空格子，找不到时返回None
+        game = self.game
+        for _ in range(1000):
+            x = self.random.randint(1, game.walls.cols - 2) * BLOCK_SIZE
+            y = self.random.randint(1, game.walls.rows - 2) * BLOCK_SIZE
+            rect = pygame.Rect(x, y, BLOCK_SIZE, BLOCK_SIZE)
+            tanks = [game.entities.rects[i] for i in game.entities.query(ENEMY)]
+            tanks.append(game.entities.rects[game.entities.index(game.player)])
+            if not game.walls.collides(rect) and rect.collidelist(tanks) < 0:
+                return x, y
+        return None
+
+    def replenish(self):
+        # 每帧测量之前把实体数量补足到场景规模（不计入耗时）
+        game = self.game
+        game.state = GameState.PLAYING
+        entities = game.entities
+        entities.health[entities.index(game.player)] = 100
+        while entities.count(ENEMY) < self.enemies:
+            cell = self.free_cell()
+            if cell is None:
+                break
+            entities.create_tank(cell[0], cell[1], self.random.choice(list(Direction)), 1, ENEMY)
+        r = self.random
+        while len(game.bullets) < self.bullets:
+            game.bullets.spawn(r.uniform(BLOCK_SIZE, SCREEN_WIDTH - BLOCK_SIZE),
+                               r.uniform(BLOCK_SIZE, SCREEN_HEIGHT - BLOCK_SIZE),
+                               r.choice(list(Direction)), BULLET_SPEED, r.random() < 0.5)
+        while entities.count(POWER_UP) < self.power_ups:
+            game.spawn_power_up()
+
+    def run(self, ticks):
+        # 返回每个阶段每帧耗时（毫秒）的列表
+        game = self.game
+        timer = time.perf_counter
+        samples = {phase: [] for phase in PHASES}
+        directions = list(Direction)
+        for tick in range(ticks):
+            self.replenish()
+            direction = directions[(tick // 30) % 4]
+
+            start = timer()
+            game.update_tank_timers()
+            t0 = timer()
+            game.handle_player_movement(direction)
+            t1 = timer()
+            game.update_enemies()
+            t2 = timer()
+            game.update_bullets()
+            t3 = timer()
+            # 关闭道具定时生成，道具生成单独测量
+            game.power_up_timer = 0
+            game.update_power_ups()
+            t4 = timer()
+            game.update_explosions()
+            t5 = timer()
+            samples['update_tank_timers'].append(t0 - start)
+            samples['handle_player_movement'].append(t1 - t0)
+            samples['update_enemies'].append(t2 - t1)
+            samples['update_bullets'].append(t3 - t2)
+            samples['update_power_ups'].append(t4 - t3)
+            samples['update_explosions'].append(t5 - t4)
+
+            # 生成例程：生成一个再移除，保持规模不变（没有空位时不会生成，也不移除已有的实体）
+            start = timer()
+            spawned = game.spawn_enemies(1)
+            t1 = timer()
+            if spawned:
+                game.entities.remove(game.entities.query(ENEMY)[-1])
+            eid = game.spawn_power_up()
+            t2 = timer()
+            if eid is not None:
+                game.entities.destroy(eid)
+            samples['spawn_enemies'].append(t1 - start)
+            samples['spawn_power_up'].append(t2 - t1)
+
+            # 完整状态的保存和原地恢复（恢复刚保存的状态，不改变场景）
+            start = timer()
+            data = save_state(game)
+            t1 = timer()
+            load_state(game, data)
+            t2 = timer()
+            samples['save_state'].append(t1 - start)
+            samples['load_state'].append(t2 - t1)
+
+        return {phase: [value * 1000 for value in values] for phase, values in samples.items()}
+
+
+def summarize(runs):
+    # runs为每次重复测量的每帧耗时列表；best_ms为各次中位数的最小值，用于与基准对比
+    values = [value for run in runs for value in run]
+    return {
+        'mean_ms': statistics.fmean(values),
+        'median_ms': statistics.median(values),
+        'p95_ms': sorted(values)[int(len(values) * 0.95) - 1] if len(values) > 1 else values[0],
+        'best_ms': min(statistics.median(run) for run in runs),
+    }
+
+
+def scaling_exponent(sizes, times):
+    # 对数坐标下的最小二乘斜率：1表示线性，2表示平方
+    points = [(math.log(s), math.log(t)) for s, t in zip(sizes, times) if s > 0 and t > 0]
+    if len(points) < 2:
+        return None
+    mean_x = statistics.fmean(p[0] for p in points)
+    mean_y = statistics.fmean(p[1] for p in points)
+    var = sum((x - mean_x) ** 2 for x, _ in points)
+    if var == 0:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / var
+
+
+def run_benchmarks(scenarios=None, ticks=200, seed=0, quick=False, log=print, repeats=REPEATS):
+    results = []
+    scaling = {}
+    for name, sizes in SCENARIOS.items():
+        if scenarios and name not in scenarios:
+            continue
+        if quick:
+            sizes = sizes[:QUICK_SIZES]
+        per_phase = {phase: [] for phase in PHASES}
+        for size in sizes:
+            params = dict(DEFAULTS)
+            params[name] = size
+            # 每次重复都从同一种子重新构造场景，工作量完全相同
+            runs = [Scenario(seed=seed, **params).run(ticks) for _ in range(repeats)]
+            phases = {phase: summarize([samples[phase] for samples in runs]) for phase in PHASES}
+            total = sum(p['best_ms'] for p in phases.values())
+            results.append({'scenario': name, 'size': size, 'params': params,
+                            'phases': phases, 'total_best_ms': total})
+            for phase in PHASES:
+                per_phase[phase].append(phases[phase]['best_ms'])
+            log(f"{name:>10} {size:>6}  每帧合计 {total:8.3f}ms  " +
+                "  ".join(f"{phase}={phases[phase]['best_ms']:.3f}" for phase in PHASES))
+        scaling[name] = {
+            'sizes': list(sizes),
+            'exponents': {phase: scaling_exponent(sizes, per_phase[phase]) for phase in PHASES},
+        }
+
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pygame': pygame.version.ver,
+            'platform': platform.platform(),
+            'ticks': ticks,
+            'repeats': repeats,
+            'seed': seed,
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+        },
+        'results': results,
+        'scaling': scaling,
+    }
+
+
+def compare(current, baseline, threshold=REGRESSION_THRESHOLD):
+    # 返回退化列表，每项为描述字符串
+    regressions = []
+    old = {(r['scenario'], r['size']): r for r in baseline.get('results', [])}
+    for result in current['results']:
+        key = (result['scenario'], result['size'])
+        if key not in old:
+            continue
+        for phase, stats in result['phases'].items():
+            before = old[key]['phases'].get(phase)
+            if before is None:
+                continue
+            # 旧的基准文件没有best_ms时使用中位数
+            new_ms = stats['best_ms']
+            old_ms = before.get('best_ms', before['median_ms'])
+            if new_ms - old_ms > MIN_DELTA_MS and new_ms > old_ms * threshold:
+                regressions.append(f"{key[0]}={key[1]} {phase}: {old_ms:.3f}ms -> {new_ms:.3f}ms "
+                                   f"({new_ms / old_ms if old_ms else float('inf'):.2f}x)")
+    for name, curve in current.get('scaling', {}).items():
+        old_curve = baseline.get('scaling', {}).get(name)
+        # 只有测量规模相同时缩放指数才可比
+        if not old_curve or old_curve.get('sizes') != curve['sizes']:
+            continue
+        for phase, exponent in curve['exponents'].items():
+            before = old_curve['exponents'].get(phase)
+            if exponent is None or before is None:
+                continue
+            if exponent - before > EXPONENT_THRESHOLD:
+                regressions.append(f"{name} {phase}: 缩放指数 {before:.2f} -> {exponent:.2f}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='坦克大战模拟性能基准测试')
+    parser.add_argument('--ticks', type=int, default=200, help='每个规模测量的帧数')
+    parser.add_argument('--seed', type=int, default=0, help='场景随机数种子')
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS), help='只运行指定场景（可多次指定）')
+    parser.add_argument('--quick', action='store_true', help='每个场景只测量较小的规模')
+    parser.add_argument('--repeats', type=int, default=REPEATS, help='每个规模重复测量的次数，取最好的一次对比')
+    parser.add_argument('--output', metavar='FILE', help='把结果保存为JSON文件')
+    parser.add_argument('--baseline', metavar='FILE', help='与保存的基准结果对比')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD, help='判定退化的耗时倍数')
+    args = parser.parse_args(argv)
+
+    # 结果JSON输出到标准输出时，进度信息输出到标准错误
+    log = (lambda text: print(text, file=sys.stderr)) if not args.output else print
+    current = run_benchmarks(args.scenario, args.ticks, args.seed, args.quick, log, args.repeats)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存: {args.output}")
+    else:
+        json.dump(current, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+
+    for name, curve in current['scaling'].items():
+        log(f"{name} 缩放指数: " + "  ".join(
+            f"{phase}={exponent:.2f}" for phase, exponent in curve['exponents'].items() if exponent is not None))
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold)
+        if regressions:
+            log(f"发现 {len(regressions)} 处性能退化：")
+            for line in regressions:
+                log("  " + line)
+            return 1
+        log("与基准相比没有性能退化")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""
+坦克大战宽相碰撞
+精确碰撞检测之前先用均匀网格排除离得远的物体，碰撞检测的开销随物体数量线性增长，不再是两两比较：
+    EntityGrid  按网格格子索引坦克或道具的槽位，实体创建、移动和删除时增量更新（EntityStore的监听者），
+                坦克移动时只和扫过区域所在格子中的坦克比较，后移动的坦克看到的是先移动的坦克的新位置
+    box_pairs   每帧把两组矩形（子弹的扫掠区域和坦克、玩家子弹和敌人子弹）按所在格子连接，
+                只返回真正相交的矩形对，全部用NumPy批量完成
+"""
+import numpy as np
+
+from config import BLOCK_SIZE
+
+CELL_SIZE = 2 * BLOCK_SIZE  # 网格格子的边长：一辆坦克最多跨4个格子
+KEY_STRIDE = 1 << 32  # 格子编号 = 行 * KEY_STRIDE + 列（坐标可能为负，例如将要剔除的出界子弹）
+
+
+class EntityGrid:
+    def __init__(self, entities, kinds, cell_size=CELL_SIZE):
+        # kinds为要索引的实体类型
+        self.entities = entities
+        self.kinds = kinds
+        self.cell_size = cell_size
+        self.cells = {}  # (列, 行) -> {槽位: None}
+        self.ranges = {}  # 槽位 -> 它所在的格子范围 (起始列, 起始行, 结束列, 结束行)，结束值包含
+        entities.add_listener(self._entity_changed)
+        self.rebuild()
+
+    def __len__(self):
+        return len(self.ranges)
+
+    def rebuild(self):
+        self.cells = {}
+        self.ranges = {}
+        entities = self.entities
+        for kind in self.kinds:
+            for i in entities.query(kind):
+                self._insert(i, self._cell_range(entities.rects[i]))
+
+    def _cell_range(self, rect):
+        size = self.cell_size
+        return rect.left // size, rect.top // size, (rect.right - 1) // size, (rect.bottom - 1) // size
+
+    def _insert(self, i, cell_range):
+        col0, row0, col1, row1 = cell_range
+        cells = self.cells
+        for row in range(row0, row1 + 1):
+            for col in range(col0, col1 + 1):
+                bucket = cells.get((col, row))
+                if bucket is None:
+                    bucket = cells[col, row] = {}
+                bucket[i] = None
+        self.ranges[i] = cell_range
+
+    def _erase(self, i):
+        col0, row0, col1, row1 = self.ranges.pop(i)
+        cells = self.cells
+        for row in range(row0, row1 + 1):
+            for col in range(col0, col1 + 1):
+                bucket = cells[col, row]
+                del bucket[i]
+                if not bucket:
+                    del cells[col, row]
+
+    def _entity_changed(self, i):
+        # 实体创建、移动或删除后调用，只在所在的格子范围变化时更新
+        if i is None:
+            self.rebuild()
+            return
+        old = self.ranges.get(i)
+        new = None
+        if self.entities.kind[i] in self.kinds:
+            new = self._cell_range(self.entities.rects[i])
+        if new == old:
+            return
+        if old is not None:
+            self._erase(i)
+        if new is not None:
+            self._insert(i, new)
+
+    def query(self, rect):
+        # 与rect相交的实体槽位（与pygame.Rect.colliderect相同，边缘相接不算碰撞）
+        col0, row0, col1, row1 = self._cell_range(rect)
+        rects = self.entities.rects
+        cells = self.cells
+        if col0 == col1 and row0 == row1:
+            bucket = cells.get((col0, row0))
+            if not bucket:
+                return []
+            return [i for i in bucket if rect.colliderect(rects[i])]
+        found = {}
+        for row in range(row0, row1 + 1):
+            for col in range(col0, col1 + 1):
+                bucket = cells.get((col, row))
+                if bucket:
+                    found.update(bucket)
+        return [i for i in found if rect.colliderect(rects[i])]
+
+
+def _cell_keys(boxes, cell_size):
+    # 每个矩形覆盖的所有格子，返回 (矩形下标, 格子编号)
+    col0 = boxes[:, 0] // cell_size
+    row0 = boxes[:, 1] // cell_size
+    width = np.maximum((boxes[:, 2] - 1) // cell_size - col0 + 1, 0)
+    height = np.maximum((boxes[:, 3] - 1) // cell_size - row0 + 1, 0)
+    counts = width * height
+    owner = np.repeat(np.arange(len(boxes)), counts)
+    k = np.arange(len(owner)) - np.repeat(np.cumsum(counts) - counts, counts)
+    w = width[owner]
+    return owner, (row0[owner] + k // w) * KEY_STRIDE + col0[owner] + k % w
+
+
+def box_pairs(a, b, cell_size=CELL_SIZE):
+    # a、b为 (n, 4) 的整数数组，每行一个矩形 (left, top, right, bottom)；
+    # 返回相交（边缘相接不算，宽或高为0的矩形不与任何矩形相交）的矩形对 (a中的下标数组, b中的下标数组)，
+    # 按 (a下标, b下标) 排序
+    empty = np.empty(0, dtype=np.int64)
+    if len(a) == 0 or len(b) == 0:
+        return empty, empty
+    a_owner, a_keys = _cell_keys(a, cell_size)
+    b_owner, b_keys = _cell_keys(b, cell_size)
+    order = np.argsort(b_keys, kind='stable')
+    b_keys = b_keys[order]
+    b_owner = b_owner[order]
+    # 同一格子中的a和b两两组成候选对
+    low = np.searchsorted(b_keys, a_keys, 'left')
+    counts = np.searchsorted(b_keys, a_keys, 'right') - low
+    ia = np.repeat(a_owner, counts)
+    if len(ia) == 0:
+        return empty, empty
+    ib = b_owner[np.arange(len(ia)) - np.repeat(np.cumsum(counts) - counts - low, counts)]
+    # 同时在多个格子中的矩形对去重，再精确判断是否相交
+    pairs = np.unique(ia * len(b) + ib)
+    ia = pairs // len(b)
+    ib = pairs % len(b)
+    hit = ((a[ia, 0] < b[ib, 2]) & (b[ib, 0] < a[ia, 2]) &
+           (a[ia, 1] < b[ib, 3]) & (b[ib, 1] < a[ia, 3]))
+    return ia[hit], ib[hit]
@@ -0,0 +1,431 @@
+"""
+坦克大战子弹存储
+所有子弹按"数组结构"保存在NumPy数组中（x, y, dx, dy, owner, alive），
+每帧用批量数组运算完成移动、出界剔除、墙壁和坦克碰撞检测，最后统一压缩一次数组
+
+碰撞检测按子弹本帧的整条移动路径扫掠，子弹速度超过墙的厚度时也不会穿墙
+"""
+import struct
+
+import numpy as np
+import pygame
+
+from config import WORLD_WIDTH, WORLD_HEIGHT, BULLET_SIZE, Direction
+from broadphase import box_pairs
+
+# 子弹归属
+ENEMY_BULLET = 0
+PLAYER_BULLET = 1
+
+BATCH_MIN = 32  # 需要检测的子弹达到该数量时改用NumPy批量检测，较少时逐个检测
+BROADPHASE_MIN = 16  # 批量检测时坦克达到该数量改用均匀网格找候选对，较少时直接计算子弹×坦克的矩阵
+STORE_HEADER = struct.Struct('<Iq')  # 快照头：子弹数量, 下一个子弹编号
+
+# 各方向的单位移动向量
+DIRECTION_VECTORS = {
+    Direction.UP: (0, -1),
+    Direction.RIGHT: (1, 0),
+    Direction.DOWN: (0, 1),
+    Direction.LEFT: (-1, 0),
+}
+
+
+def pixel_coords(values):
+    # 与pygame.Rect一致的四舍五入取整
+    return np.floor(values + 0.5).astype(np.int64)
+
+
+def _swept_boxes(x0, y0, x1, y1):
+    # 子弹从(x0, y0)移动到(x1, y1)扫过的区域，每行一个 (left, top, right, bottom)
+    return np.stack([np.minimum(x0, x1), np.minimum(y0, y1),
+                     np.maximum(x0, x1) + BULLET_SIZE, np.maximum(y0, y1) + BULLET_SIZE], axis=1)
+
+
+def _gap(x0, y0, x1, y1, rect):
+    # 子弹从(x0, y0)向(x1, y1)移动时到矩形的距离
+    if x1 > x0:
+        return rect.left - (x0 + BULLET_SIZE)
+    if x1 < x0:
+        return x0 - rect.right
+    if y1 > y0:
+        return rect.top - (y0 + BULLET_SIZE)
+    return y0 - rect.bottom
+
+
+class BulletStore:
+    def __init__(self, capacity=256):
+        self.count = 0  # 数组前count个位置是本帧的子弹
+        self.capacity = 0
+        self.x = self.y = self.dx = self.dy = None
+        self.owner = self.alive = None
+        self.serial = None  # 子弹编号，发射时按顺序分配，数组压缩后不变（联机快照用来识别同一颗子弹）
+        self.next_serial = 1
+        self.start_x = self.start_y = None  # 本帧移动前的位置（像素坐标），advance时保存
+        self._grid = None
+        self._grid_view = None
+        # 数组本身就是子弹池：hits为复用已有槽位的发射次数，misses为需要扩容的发射次数
+        self.hits = 0
+        self.misses = 0
+        self._grow(capacity)
+
+    def __len__(self):
+        return self.count
+
+    def _grow(self, capacity):
+        # 扩容时复制已有数据，容量按倍数增长
+        def resize(old, dtype):
+            new = np.zeros(capacity, dtype=dtype)
+            if old is not None:
+                new[:self.count] = old[:self.count]
+            return new
+        self.x = resize(self.x, np.float64)
+        self.y = resize(self.y, np.float64)
+        self.dx = resize(self.dx, np.float64)
+        self.dy = resize(self.dy, np.float64)
+        self.owner = resize(self.owner, np.int8)
+        self.alive = resize(self.alive, np.bool_)
+        self.serial = resize(self.serial, np.int64)
+        self.capacity = capacity
+
+    def clear(self):
+        self.alive[:self.count] = False
+        self.count = 0
+        self.start_x = self.start_y = None
+
+    def spawn(self, x, y, direction, speed, is_player_bullet):
+        if self.count >= self.capacity:
+            self.misses += 1
+            self._grow(self.capacity * 2)
+        else:
+            self.hits += 1
+        i = self.count
+        vx, vy = DIRECTION_VECTORS[direction]
+        self.x[i] = x
+        self.y[i] = y
+        self.dx[i] = vx * speed
+        self.dy[i] = vy * speed
+        self.owner[i] = PLAYER_BULLET if is_player_bullet else ENEMY_BULLET
+        self.alive[i] = True
+        self.serial[i] = self.next_serial
+        self.next_serial += 1
+        self.count += 1
+        return i
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'free': self.capacity - self.count}
+
+    def kill(self, i):
+        self.alive[i] = False
+
+    def advance(self):
+        # 移动所有子弹，出界剔除在扫掠碰撞之后由cull完成（高速子弹可能越过屏幕边缘的墙）
+        n = self.count
+        x = self.x[:n]
+        y = self.y[:n]
+        self.start_x = pixel_coords(x)
+        self.start_y = pixel_coords(y)
+        x += self.dx[:n]
+        y += self.dy[:n]
+
+    def cull(self, width=WORLD_WIDTH, height=WORLD_HEIGHT):
+        # 剔除飞出世界范围的子弹
+        n = self.count
+        x = self.x[:n]
+        y = self.y[:n]
+        out = (x < 0) | (x > width) | (y < 0) | (y > height)
+        self.alive[:n] &= ~out
+
+    def _path(self, idx):
+        # 子弹本帧移动路径的起点和终点（像素坐标）
+        return self.start_x[idx], self.start_y[idx], pixel_coords(self.x[idx]), pixel_coords(self.y[idx])
+
+    def _types_view(self, grid):
+        # 墙壁网格类型数组的零拷贝二维视图，墙被摧毁时自动可见
+        if grid is not self._grid:
+            self._grid = grid
+            self._grid_view = np.frombuffer(grid.types, dtype=np.uint8).reshape(grid.rows, grid.cols)
+        return self._grid_view
+
+    def wall_hits(self, grid):
+        # 返回路径上碰到墙的子弹 [(子弹下标, 列, 行), ...]，并把这些子弹停在第一次接触墙的位置；
+        # 路径上按移动方向取第一个有墙的格子，同一位置的两个格子取行优先顺序中的第一个
+        idx = np.flatnonzero(self.alive[:self.count])
+        if len(idx) == 0:
+            return []
+        x0, y0, x1, y1 = self._path(idx)
+        if len(idx) >= BATCH_MIN:
+            sub = self._wall_candidates(grid, x0, y0, x1, y1)
+            idx, x0, y0, x1, y1 = idx[sub], x0[sub], y0[sub], x1[sub], y1[sub]
+            if len(idx) >= BATCH_MIN:
+                return self._sweep_walls_batch(grid, idx, x0, y0, x1, y1)
+
+        hits = []
+        for i, a, b, c, d in zip(idx.tolist(), x0.tolist(), y0.tolist(), x1.tolist(), y1.tolist()):
+            horizontal = self.dx[i] != 0
+            hit = self._first_wall(grid, horizontal, a, b, c, d)
+            if hit is not None:
+                col, row, contact = hit
+                if horizontal:
+                    self.x[i] = contact
+                else:
+                    self.y[i] = contact
+                hits.append((i, col, row))
+        return hits
+
+    def _first_wall(self, grid, horizontal, x0, y0, x1, y1):
+        # 单颗子弹路径上的第一个墙格子，返回 (列, 行, 接触位置)，检查顺序与批量版本相同
+        size = grid.cell_size
+        cols = grid.cols
+        types = grid.types
+        if horizontal:
+            start, end, across, along_limit, across_limit = x0, x1, y0, cols, grid.rows
+        else:
+            start, end, across, along_limit, across_limit = y0, y1, x0, grid.rows, cols
+        forward = end >= start
+        low = min(start, end) // size
+        high = (max(start, end) + BULLET_SIZE - 1) // size
+        others = range(max(across // size, 0), min((across + BULLET_SIZE - 1) // size, across_limit - 1) + 1)
+        for cell in (range(low, high + 1) if forward else range(high, low - 1, -1)):
+            if not 0 <= cell < along_limit:
+                continue
+            for other in others:
+                col, row = (cell, other) if horizontal else (other, cell)
+                if types[row * cols + col]:
+                    if forward:
+                        return col, row, max(cell * size - BULLET_SIZE, start)
+                    return col, row, min((cell + 1) * size, start)
+        return None
+
+    def _wall_candidates(self, grid, x0, y0, x1, y1):
+        # 粗查：扫掠区域不超过2x2个格子时只需检查四个角所在的格子，大部分子弹在这一步排除
+        types = self._types_view(grid).ravel()
+        size = grid.cell_size
+        cols, rows = grid.cols, grid.rows
+        col0 = np.minimum(x0, x1) // size
+        col1 = (np.maximum(x0, x1) + BULLET_SIZE - 1) // size
+        row0 = np.minimum(y0, y1) // size
+        row1 = (np.maximum(y0, y1) + BULLET_SIZE - 1) // size
+        candidate = (col1 - col0 > 1) | (row1 - row0 > 1)
+        for row, col in ((row0, col0), (row0, col1), (row1, col0), (row1, col1)):
+            inside = (col >= 0) & (col < cols) & (row >= 0) & (row < rows)
+            candidate |= inside & (types[np.where(inside, row * cols + col, 0)] != 0)
+        return np.flatnonzero(candidate)
+
+    def _sweep_walls_batch(self, grid, idx, x0, y0, x1, y1):
+        types = self._types_view(grid).ravel()
+        size = grid.cell_size
+        cols, rows = grid.cols, grid.rows
+
+        # 子弹只沿坐标轴移动：把坐标分为沿移动方向(along)和垂直方向(across)两部分
+        horizontal = self.dx[idx] != 0
+        start = np.where(horizontal, x0, y0)
+        end = np.where(horizontal, x1, y1)
+        across = np.where(horizontal, y0, x0)
+        forward = end >= start
+        along_limit = np.where(horizontal, cols, rows)
+        across_limit = np.where(horizontal, rows, cols)
+
+        # 扫掠区域沿移动方向覆盖的格子，从起点一侧开始逐格检查
+        low = np.minimum(start, end) // size
+        high = (np.maximum(start, end) + BULLET_SIZE - 1) // size
+        first = np.where(forward, low, high)
+        step = np.where(forward, 1, -1)
+        across0 = across // size
+        across1 = (across + BULLET_SIZE - 1) // size
+
+        hit_along = np.full(len(idx), -1, dtype=np.int64)
+        hit_across = np.full(len(idx), -1, dtype=np.int64)
+        for k in range(int((high - low).max()) + 1):
+            cell = first + k * step
+            pending = (hit_along < 0) & (k <= high - low) & (cell >= 0) & (cell < along_limit)
+            if not pending.any():
+                continue
+            # 倒序检查，两个格子都有墙时留下编号较小的（行优先顺序中的第一个）
+            for other in (across1, across0):
+                inside = pending & (other >= 0) & (other < across_limit)
+                flat = np.where(horizontal, other * cols + cell, cell * cols + other)
+                mask = inside & (types[np.where(inside, flat, 0)] != 0)
+                hit_along = np.where(mask, cell, hit_along)
+                hit_across = np.where(mask, other, hit_across)
+
+        hits = np.flatnonzero(hit_along >= 0)
+        if len(hits) == 0:
+            return []
+        # 停在接触位置：向前移动时子弹前沿贴住格子的起始边，向后移动时贴住格子的结束边
+        cell = hit_along[hits]
+        contact = np.where(forward[hits], cell * size - BULLET_SIZE, (cell + 1) * size)
+        contact = np.where(forward[hits], np.maximum(contact, start[hits]), np.minimum(contact, start[hits]))
+        hit_idx = idx[hits]
+        h = horizontal[hits]
+        self.x[hit_idx] = np.where(h, contact, self.x[hit_idx])
+        self.y[hit_idx] = np.where(h, self.y[hit_idx], contact)
+
+        hit_col = np.where(h, cell, hit_across[hits])
+        hit_row = np.where(h, hit_across[hits], cell)
+        return list(zip(hit_idx.tolist(), hit_col.tolist(), hit_row.tolist()))
+
+    def tank_hits(self, rects, is_player_bullet):
+        # 返回路径上碰到坦克的子弹 [(子弹下标, 坦克下标), ...]，取路径上最先接触的坦克（同时接触时按列表顺序）
+        if not rects:
+            return []
+        owner = PLAYER_BULLET if is_player_bullet else ENEMY_BULLET
+        n = self.count
+        idx = np.flatnonzero(self.alive[:n] & (self.owner[:n] == owner))
+        if len(idx) == 0:
+            return []
+        x0, y0, x1, y1 = self._path(idx)
+        if len(idx) < BATCH_MIN:
+            hits = []
+            for i, a, b, c, d in zip(idx.tolist(), x0.tolist(), y0.tolist(), x1.tolist(), y1.tolist()):
+                swept = pygame.Rect(min(a, c), min(b, d), abs(c - a) + BULLET_SIZE, abs(d - b) + BULLET_SIZE)
+                near = swept.collidelistall(rects)
+                if near:
+                    hits.append((i, min(near, key=lambda j: max(_gap(a, b, c, d, rects[j]), 0))))
+            return hits
+
+        if len(rects) >= BROADPHASE_MIN:
+            return self._tank_hits_broadphase(rects, idx, x0, y0, x1, y1)
+
+        # 坦克在第一维、子弹在第二维：沿第一维求any比沿最后一维快得多
+        boxes = np.array([(r.left, r.top, r.right, r.bottom) for r in rects], dtype=np.int64).T[:, :, None]
+        left = np.minimum(x0, x1)
+        top = np.minimum(y0, y1)
+        right = np.maximum(x0, x1) + BULLET_SIZE
+        bottom = np.maximum(y0, y1) + BULLET_SIZE
+        # 扫掠区域与坦克相交（与pygame.Rect.colliderect相同，边缘相接不算碰撞）
+        overlap = ((left < boxes[2]) & (boxes[0] < right) &
+                   (top < boxes[3]) & (boxes[1] < bottom))
+        hit = np.flatnonzero(overlap.any(axis=0))
+        if len(hit) == 0:
+            return []
+        # 只对碰到坦克的子弹计算沿移动方向到每个坦克的距离，起点已经重叠时为0
+        x0, y0, x1, y1 = x0[hit], y0[hit], x1[hit], y1[hit]
+        gap = np.where(x1 > x0, boxes[0] - (x0 + BULLET_SIZE),
+                       np.where(x1 < x0, x0 - boxes[2],
+                                np.where(y1 > y0, boxes[1] - (y0 + BULLET_SIZE), y0 - boxes[3])))
+        gap = np.where(overlap[:, hit], np.maximum(gap, 0), np.iinfo(np.int64).max)
+        first = gap.argmin(axis=0)
+        return list(zip(idx[hit].tolist(), first.tolist()))
+
+    def _tank_hits_broadphase(self, rects, idx, x0, y0, x1, y1):
+        # 坦克较多时先用均匀网格找出扫掠区域与坦克相交的 (子弹, 坦克) 对，不再构造子弹×坦克的矩阵；
+        # 结果与矩阵版本相同：每颗子弹取沿移动方向最先接触的坦克，距离相同时取列表中靠前的坦克
+        boxes = np.array([(r.left, r.top, r.right, r.bottom) for r in rects], dtype=np.int64)
+        k, j = box_pairs(_swept_boxes(x0, y0, x1, y1), boxes)
+        if len(k) == 0:
+            return []
+        x0, y0, x1, y1 = x0[k], y0[k], x1[k], y1[k]
+        gap = np.where(x1 > x0, boxes[j, 0] - (x0 + BULLET_SIZE),
+                       np.where(x1 < x0, x0 - boxes[j, 2],
+                                np.where(y1 > y0, boxes[j, 1] - (y0 + BULLET_SIZE), y0 - boxes[j, 3])))
+        order = np.lexsort((j, np.maximum(gap, 0), k))
+        k, j = k[order], j[order]
+        _, first = np.unique(k, return_index=True)
+        return list(zip(idx[k[first]].tolist(), j[first].tolist()))
+
+    def bullet_hits(self):
+        # 本帧移动中相遇的玩家子弹和敌人子弹 [(玩家子弹下标, 敌人子弹下标), ...]；
+        # 两颗子弹都沿坐标轴匀速移动，求两个方向上同时重叠的时间段，按相遇的先后配对，每颗子弹最多抵消一颗
+        n = self.count
+        alive = self.alive[:n]
+        mine = np.flatnonzero(alive & (self.owner[:n] == PLAYER_BULLET))
+        theirs = np.flatnonzero(alive & (self.owner[:n] == ENEMY_BULLET))
+        if len(mine) == 0 or len(theirs) == 0:
+            return []
+        a = self._path(mine)
+        b = self._path(theirs)
+        ia, ib = box_pairs(_swept_boxes(*a), _swept_boxes(*b))
+        if len(ia) == 0:
+            return []
+        enter = np.zeros(len(ia))
+        leave = np.ones(len(ia))
+        for a0, a1, b0, b1 in ((a[0], a[2], b[0], b[2]), (a[1], a[3], b[1], b[3])):
+            # 相对位置 d(t) = d0 + v*t，|d(t)| < BULLET_SIZE 时在这个方向上重叠
+            d0 = a0[ia] - b0[ib]
+            v = (a1[ia] - a0[ia]) - (b1[ib] - b0[ib])
+            still = v == 0
+            speed = np.where(still, 1, v)
+            t0 = (-BULLET_SIZE - d0) / speed
+            t1 = (BULLET_SIZE - d0) / speed
+            overlapping = np.abs(d0) < BULLET_SIZE
+            enter = np.maximum(enter, np.where(still, np.where(overlapping, 0.0, 1.0), np.minimum(t0, t1)))
+            leave = np.minimum(leave, np.where(still, np.where(overlapping, 1.0, 0.0), np.maximum(t0, t1)))
+        meet = np.flatnonzero(enter < leave)
+        hits = []
+        used = set()
+        for k in meet[np.lexsort((ib[meet], ia[meet], enter[meet]))].tolist():
+            i, j = int(mine[ia[k]]), int(theirs[ib[k]])
+            if i not in used and j not in used:
+                used.add(i)
+                used.add(j)
+                hits.append((i, j))
+        return hits
+
+    def compact(self):
+        # 每帧一次，把存活的子弹移到数组前部
+        n = self.count
+        keep = np.flatnonzero(self.alive[:n])
+        k = len(keep)
+        if k == n:
+            return
+        for arr in (self.x, self.y, self.dx, self.dy, self.owner, self.serial):
+            arr[:k] = arr[keep]
+        if self.start_x is not None and len(self.start_x) == n:
+            # 起点与子弹保持对应，渲染插值时使用
+            self.start_x = self.start_x[keep]
+            self.start_y = self.start_y[keep]
+        self.alive[:k] = True
+        self.alive[k:n] = False
+        self.count = k
+
+    # 快照
+    def capture(self):
+        # 把前count颗子弹打包成字节串（每个数组连续保存）
+        n = self.count
+        parts = [STORE_HEADER.pack(n, self.next_serial)]
+        parts.extend(arr[:n].tobytes() for arr in self._arrays())
+        return b''.join(parts)
+
+    def restore(self, data):
+        # 从capture的结果原地恢复，容量不足时先扩容
+        n, next_serial = STORE_HEADER.unpack_from(data)
+        self.clear()
+        capacity = self.capacity
+        while capacity < n:
+            capacity *= 2
+        if capacity != self.capacity:
+            self._grow(capacity)
+        offset = STORE_HEADER.size
+        for arr in self._arrays():
+            arr[:n] = np.frombuffer(data, dtype=arr.dtype, count=n, offset=offset)
+            offset += arr.itemsize * n
+        self.count = n
+        self.next_serial = next_serial
+
+    def _arrays(self):
+        return self.x, self.y, self.dx, self.dy, self.owner, self.alive, self.serial
+
+    def items(self, alpha=1.0, view=None):
+        # 用于绘制：[(x, y, 是否玩家子弹), ...]
+        # alpha小于1时在本帧移动的起点和终点之间插值（渲染帧介于两个逻辑帧之间）
+        # 指定视野矩形时只返回视野中的子弹，坐标相对于视野左上角
+        n = self.count
+        idx = np.flatnonzero(self.alive[:n])
+        x = self.x[idx]
+        y = self.y[idx]
+        if alpha < 1 and self.start_x is not None and len(self.start_x) == n:
+            start_x = self.start_x[idx]
+            start_y = self.start_y[idx]
+            x = start_x + (x - start_x) * alpha
+            y = start_y + (y - start_y) * alpha
+        owner = self.owner[idx]
+        x = pixel_coords(x)
+        y = pixel_coords(y)
+        if view is not None:
+            visible = ((x > view.left - BULLET_SIZE) & (x < view.right) &
+                       (y > view.top - BULLET_SIZE) & (y < view.bottom))
+            if not visible.all():
+                x, y, owner = x[visible], y[visible], owner[visible]
+            x -= view.x
+            y -= view.y
+        return list(zip(x.tolist(), y.tolist(), (owner == PLAYER_BULLET).tolist()))
@@ -0,0 +1,275 @@
+"""
+坦克大战联机客户端
+客户端不运行游戏逻辑：每个逻辑帧把键盘输入发送给服务器，收到快照后按差量还原游戏状态并绘制，
+每个输入包同时确认收到的最新快照，服务器据此选择差量的基准；
+发射请求在每个输入包中重发，直到服务器在快照中确认，丢失一个输入包不会丢掉这次发射
+
+用法：python client.py [--host 127.0.0.1] [--port 7777]
+     python client.py --bots 8 --duration 30   # 不创建窗口，模拟8名随机操作的玩家，结束时输出每个客户端的带宽
+"""
+import argparse
+import asyncio
+
+import numpy as np
+import pygame
+from pygame.locals import *
+
+from config import *
+from background import BackgroundLayer
+from sprites import SpriteAtlas
+from text_cache import TextCache, get_font
+from ecs import PLAYER, EXPLOSION, POWER_UP, TANK_COLORS
+from net_protocol import (DEFAULT_PORT, HELLO, INPUT, SNAPSHOT, BYE, FRAGMENT, INPUT_MESSAGE, NO_SNAPSHOT,
+                          NO_PLAYER, SNAPSHOT_HISTORY, SHIELDED, VISIBLE, FragmentBuffer, decode_snapshot)
+from replay import encode_input
+from scripted_input import RandomInput
+from wall_grid import EMPTY, BRICK
+from world import World, Camera
+
+HELLO_INTERVAL = 0.5  # 收到第一个快照之前重发加入请求的间隔（秒）
+
+
+class NetClient(asyncio.DatagramProtocol):
+    def __init__(self):
+        self.transport = None
+        self.fragments = FragmentBuffer()  # 分片发送的快照
+        self.snapshots = {}  # 快照编号 -> Snapshot，保存可能被服务器用作基准的快照
+        self.latest = None  # 最新的快照
+        self.player = NO_PLAYER  # 自己的坦克的实体ID
+        self.sequence = 0  # 输入序号
+        self.fire_sequence = 0  # 等待服务器确认的发射请求（按下发射键时的输入序号），0表示没有
+        self.bytes_received = 0
+        self.snapshots_received = 0
+        self.full_snapshots = 0
+        self.undecodable = 0  # 基准快照已经丢弃、无法还原的快照数
+        self.elapsed = 0.0  # 运行时间（秒）
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, address):
+        self.bytes_received += len(data)
+        if data and data[0] == FRAGMENT:
+            data = self.fragments.add(data)
+            if data is None:
+                return
+        if not data or data[0] != SNAPSHOT:
+            return
+        result = decode_snapshot(data, self.snapshots)
+        if result is None:
+            self.undecodable += 1
+            return
+        player, fire_ack, base_frame, snapshot = result
+        if fire_ack >= self.fire_sequence:
+            self.fire_sequence = 0
+        self.snapshots_received += 1
+        if base_frame == NO_SNAPSHOT:
+            self.full_snapshots += 1
+        # 乱序到达的旧快照不再使用
+        if self.latest is not None and snapshot.frame <= self.latest.frame:
+            return
+        self.latest = snapshot
+        self.player = player
+        self.snapshots[snapshot.frame] = snapshot
+        # 服务器只会用不早于本快照基准的快照作为之后的基准，更早的快照可以丢弃
+        oldest = snapshot.frame if base_frame == NO_SNAPSHOT else base_frame
+        oldest = max(oldest, snapshot.frame - SNAPSHOT_HISTORY)
+        for frame in [frame for frame in self.snapshots if frame < oldest]:
+            del self.snapshots[frame]
+
+    def hello(self):
+        self.transport.sendto(bytes((HELLO,)))
+
+    def send_input(self, direction, fire):
+        self.sequence += 1
+        if fire:
+            self.fire_sequence = self.sequence
+        ack = self.latest.frame if self.latest is not None else NO_SNAPSHOT
+        pending = self.fire_sequence != 0
+        self.transport.sendto(INPUT_MESSAGE.pack(INPUT, self.sequence, ack, encode_input(direction, pending),
+                                                 self.fire_sequence))
+
+    def bye(self):
+        self.transport.sendto(bytes((BYE,)))
+
+
+class KeyboardInput:
+    # 读取窗口事件和方向键，返回 (方向或None, 是否发射)；关闭窗口或按Esc时running变为False
+    def __init__(self):
+        self.running = True
+
+    def __call__(self, game):
+        fire = False
+        for event in pygame.event.get():
+            if event.type == QUIT or (event.type == KEYDOWN and event.key == K_ESCAPE):
+                self.running = False
+            elif event.type == KEYDOWN and event.key == K_SPACE:
+                fire = True
+        keys = pygame.key.get_pressed()
+        for key, direction in ((K_UP, Direction.UP), (K_RIGHT, Direction.RIGHT),
+                               (K_DOWN, Direction.DOWN), (K_LEFT, Direction.LEFT)):
+            if keys[key]:
+                return direction, fire
+        return None, fire
+
+
+class SnapshotRenderer:
+    # 把快照绘制到窗口：墙壁网格按快照同步，背景层和精灵图集与单机游戏相同
+    def __init__(self):
+        pygame.display.init()
+        pygame.font.init()
+        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        pygame.display.set_caption('坦克大战（联机）')
+        self.atlas = SpriteAtlas()
+        self.background = BackgroundLayer((SCREEN_WIDTH, SCREEN_HEIGHT))
+        self.font = get_font('Microsoft YaHei', 36)
+        self.text_cache = TextCache()
+        self.world = None
+        self.camera = None
+        self.walls = None
+        self.wall_types = None  # 墙壁网格当前对应的快照墙壁数据
+
+    def sync_walls(self, snapshot):
+        # 按快照更新墙壁网格，只修改变化的格子（背景层随之只重绘这些格子）
+        width, height = snapshot.info[3:5]
+        if self.world is None or (self.world.width, self.world.height) != (width, height):
+            self.world = World(width, height)
+            self.camera = Camera(self.world)
+            self.walls = self.world.create_grid()
+            self.background.attach(self.walls)
+            self.wall_types = None
+        if snapshot.walls is self.wall_types:
+            return
+        walls = self.walls
+        if self.wall_types is None:
+            walls.load_types(snapshot.walls)
+        else:
+            new = np.frombuffer(snapshot.walls, dtype=np.uint8)
+            for cell in np.flatnonzero(new != np.frombuffer(self.wall_types, dtype=np.uint8)).tolist():
+                col, row = cell % walls.cols, cell // walls.cols
+                if new[cell] == EMPTY:
+                    walls.remove(col, row)
+                else:
+                    walls.add(col, row, new[cell] == BRICK)
+        self.wall_types = snapshot.walls
+
+    def draw(self, snapshot, player):
+        self.sync_walls(snapshot)
+        entities = snapshot.entities
+        # 摄像机跟随自己的坦克，被消灭后跟随其他玩家
+        follow = entities.get(player)
+        if follow is None or follow[0] != PLAYER:
+            follow = next((record for record in entities.values() if record[0] == PLAYER), None)
+        if follow is not None:
+            self.camera.follow(follow[1] + BLOCK_SIZE // 2, follow[2] + BLOCK_SIZE // 2)
+        view = self.camera.rect
+        offset_x, offset_y = self.camera.offset
+
+        screen = self.screen
+        self.background.refresh(view)
+        screen.blit(self.background.surface, (0, 0))
+
+        # 绘制顺序与单机游戏相同：道具、子弹、坦克、爆炸
+        atlas = self.atlas
+        visible = view.inflate(2 * BLOCK_SIZE, 2 * BLOCK_SIZE)
+        sprites = []
+        tanks = []
+        explosions = []
+        for kind, x, y, direction, health, flags, extra, lifetime in entities.values():
+            if not visible.collidepoint(x, y):
+                continue
+            if kind == POWER_UP:
+                if flags & VISIBLE:
+                    sprites.append(atlas.power_up(x - offset_x, y - offset_y, POWER_UP_TYPES[extra]))
+            elif kind == EXPLOSION:
+                explosions.append(atlas.explosion(x - offset_x, y - offset_y, extra, lifetime))
+            else:
+                tanks.append(atlas.tank(x - offset_x, y - offset_y, TANK_COLORS[kind], direction, health,
+                                        bool(flags & SHIELDED)))
+        sprites.extend(atlas.bullet(x - offset_x, y - offset_y, is_player_bullet)
+                       for x, y, is_player_bullet in snapshot.bullet_positions()
+                       if visible.collidepoint(x, y))
+        sprites.extend(tanks)
+        sprites.extend(explosions)
+        screen.blits(sprites, doreturn=False)
+
+        score, level, state = snapshot.info[:3]
+        players = sum(1 for record in entities.values() if record[0] == PLAYER)
+        screen.blit(self.text_cache.render(self.font, f'分数: {score}', WHITE), (10, 10))
+        screen.blit(self.text_cache.render(self.font, f'等级: {level}', WHITE), (10, 50))
+        screen.blit(self.text_cache.render(self.font, f'玩家: {players}', WHITE), (10, 90))
+        if state == GameState.GAME_OVER.value:
+            text = self.text_cache.render(self.font, '游戏结束，即将开始新的一局', RED)
+            screen.blit(text, text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)))
+        elif player not in entities:
+            text = self.text_cache.render(self.font, '你的坦克被消灭了，正在观战', YELLOW)
+            screen.blit(text, text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)))
+        pygame.display.flip()
+
+
+async def run_client(host, port, input_source, renderer=None, duration=None):
+    # 每个逻辑帧发送一次输入并绘制最新的快照，返回客户端（包含接收统计）
+    loop = asyncio.get_running_loop()
+    client = NetClient()
+    transport, _ = await loop.create_datagram_endpoint(lambda: client, remote_addr=(host, port))
+    tick_time = 1.0 / TICK_RATE
+    start = next_tick = loop.time()
+    last_hello = None
+    try:
+        while duration is None or loop.time() - start < duration:
+            now = loop.time()
+            if client.latest is None and (last_hello is None or now - last_hello >= HELLO_INTERVAL):
+                client.hello()
+                last_hello = now
+            direction, fire = input_source(None)
+            if not getattr(input_source, 'running', True):
+                break
+            client.send_input(direction, fire)
+            if renderer is not None and client.latest is not None:
+                renderer.draw(client.latest, client.player)
+            next_tick += tick_time
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+    finally:
+        client.elapsed = loop.time() - start
+        client.bye()
+        transport.close()
+    return client
+
+
+async def run_bots(host, port, count, duration, seed=None):
+    # 在同一个进程中运行多个无界面客户端，每个客户端随机操作
+    return await asyncio.gather(*(run_client(host, port, RandomInput(None if seed is None else seed + n),
+                                             duration=duration)
+                                  for n in range(count)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='坦克大战联机客户端')
+    parser.add_argument('--host', default='127.0.0.1', help='服务器地址')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='服务器端口（UDP）')
+    parser.add_argument('--bots', type=int, default=0, help='不创建窗口，模拟指定数量的随机操作玩家')
+    parser.add_argument('--duration', type=float, default=None, help='运行指定秒数后退出')
+    parser.add_argument('--seed', type=int, default=None, help='模拟玩家的随机数种子')
+    args = parser.parse_args(argv)
+
+    if args.bots:
+        clients = asyncio.run(run_bots(args.host, args.port, args.bots, args.duration, args.seed))
+        for n, client in enumerate(clients, 1):
+            print(f"客户端 {n}: {client.bytes_received / client.elapsed / 1024:.1f} KB/s  "
+                  f"快照 {client.snapshots_received / client.elapsed:.1f}/秒  完整快照 {client.full_snapshots}  "
+                  f"无法还原 {client.undecodable}")
+        total = sum(client.bytes_received / client.elapsed for client in clients)
+        print(f"平均每个客户端 {total / len(clients) / 1024:.1f} KB/s")
+        return 0
+
+    renderer = SnapshotRenderer()
+    try:
+        asyncio.run(run_client(args.host, args.port, KeyboardInput(), renderer, args.duration))
+    except KeyboardInterrupt:
+        pass
+    pygame.quit()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
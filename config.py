@@ -8,7 +8,17 @@ from enum import Enum
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
 BLOCK_SIZE = 30
-FPS = 60
+WORLD_WIDTH = SCREEN_WIDTH  # 世界（地图）大小，可以大于窗口，摄像机跟随玩家滚动
+WORLD_HEIGHT = SCREEN_HEIGHT
+CHUNK_SIZE = 8  # 地图区块的边长（格子数），绘制和模拟都以区块为单位跳过看不到、离玩家太远的部分
+ACTIVE_CHUNK_MARGIN = 1  # 视野外还要继续模拟的区块圈数，更远处的敌人暂停行动
+BACKGROUND_CHUNK_CACHE = 64  # 最多缓存的区块背景Surface数量
+FPS = 60  # 渲染帧率上限（capped模式）
+TICK_RATE = 60  # 游戏逻辑每秒固定推进的帧数，所有计时器都按逻辑帧计数，与渲染帧率无关
+MAX_CATCH_UP_TICKS = 5  # 渲染卡顿时每次最多补推进的逻辑帧数，落后更多时丢弃，游戏暂时变慢而不是越追越慢
+RENDER_MODE = 'capped'  # 渲染模式：capped按FPS限制帧率，uncapped不限制，vsync跟随显示器刷新率
+RENDER_MODES = ('capped', 'uncapped', 'vsync')
+MAX_DIRTY_RECTS = 300  # 每帧局部更新的矩形数量上限，超过时整屏刷新
 
 # 颜色定义
 BLACK = (0, 0, 0)
@@ -37,7 +47,10 @@ class GameState(Enum):
 # 敌人参数
 ENEMY_SPAWN_TIME = 600  # 每10秒生成新敌人
 ENEMY_DIRECTION_CHANGE_CHANCE = 0.02  # 2%的几率改变方向
-ENEMY_SHOOT_CHANCE = 0.01  # 1%的几率发射子弹
+ENEMY_WANDER_TIME = 30  # 随机改变方向或碰撞后沿新方向行驶0.5秒，再继续追击玩家
+ENEMY_SHOOT_CHANCE = 0.01  # 1%的几率发射子弹（只在不瞄准时使用）
+ENEMY_AIMED_FIRE = False  # 为True时敌人只在玩家位于同一行或同一列、且中间没有墙时才开火（默认随机开火）
+ENEMY_AIM_CHANCE = 0.05  # 瞄准时每帧开火的几率（相当于平均20帧的反应时间）
 
 # 玩家参数
 PLAYER_SPEED = 3
@@ -46,9 +59,12 @@ PLAYER_COOLDOWN = 30
 # 子弹参数
 BULLET_SPEED = 5
 BULLET_DAMAGE = 25
+BULLET_SIZE = 4  # 子弹边长（像素）
+BULLET_COLLISION = True  # 玩家子弹和敌人子弹相撞时互相抵消（经典坦克大战的规则）
 
 # 墙壁参数
 WALL_BREAKABLE_CHANCE = 0.7  # 70%的几率是可破坏的
+MAP_OBSTACLE_COUNT = 30  # 随机地图中障碍物的数量
 
 # 爆炸效果参数
 EXPLOSION_LIFETIME = 20
@@ -58,6 +74,7 @@ POWER_UP_SPAWN_TIME = 900  # 每15秒生成一个道具
 POWER_UP_MAX_COUNT = 3  # 场上最多同时存在的道具数量
 POWER_UP_LIFETIME = 600  # 道具存在时间，10秒
 POWER_UP_FLASH_INTERVAL = 10  # 道具闪烁间隔
+POWER_UP_TYPES = ("health", "speed", "shield")  # 道具类型
 
 # 道具效果参数
 HEALTH_RESTORE_AMOUNT = 50  # 生命值恢复道具恢复的生命值
@@ -0,0 +1,375 @@
+"""
+坦克大战实体组件存储
+坦克、爆炸和道具不再是各自带属性和Rect的对象，而是存储中的一个槽位：
+每种组件（位置、速度、生命值、各种计时器）保存在一个紧凑数组中，下标就是槽位号，
+计时器倒数等对所有实体相同的操作用NumPy视图批量完成
+
+实体ID由代数和槽位号组成，实体删除后槽位立即回收（O(1)），代数加一，旧ID随之失效
+子弹和墙壁仍然分别保存在BulletStore和WallGrid中
+"""
+import struct
+from array import array
+
+import numpy as np
+import pygame
+
+from config import *
+
+# 实体类型（FREE表示空闲槽位）
+FREE = 0
+PLAYER = 1
+ENEMY = 2
+EXPLOSION = 3
+POWER_UP = 4
+KIND_COUNT = 5
+
+INDEX_BITS = 20  # 实体ID低位为槽位号，高位为代数
+INDEX_MASK = (1 << INDEX_BITS) - 1
+GENERATION_MASK = 0xFFFFFFFF
+
+# 组件名 -> array类型码（numpy也使用同样的类型码）
+COMPONENTS = {
+    'x': 'd',  # 位置
+    'y': 'd',
+    'speed': 'd',  # 速度
+    'base_speed': 'd',
+    'direction': 'b',  # Direction的值
+    'health': 'i',
+    'cooldown': 'i',  # 坦克计时器
+    'cooldown_time': 'i',
+    'shield': 'i',
+    'speed_boost': 'i',
+    'wander': 'i',  # 敌人暂停追击、随机行驶的剩余帧数
+    'lifetime': 'i',  # 爆炸和道具计时器
+    'frame': 'i',
+    'flash_timer': 'i',
+    'visible': 'b',
+    'variant': 'b',  # 道具类型在POWER_UP_TYPES中的下标
+}
+
+DIRECTIONS = list(Direction)
+# 每个方向的单位移动量，按Direction的值索引
+DIRECTION_STEPS = [(0, -1), (1, 0), (0, 1), (-1, 0)]
+# 子弹相对坦克左上角的发射位置，按Direction的值索引
+MUZZLE_OFFSETS = [
+    (BLOCK_SIZE // 2 - 2, -5),
+    (BLOCK_SIZE, BLOCK_SIZE // 2 - 2),
+    (BLOCK_SIZE // 2 - 2, BLOCK_SIZE),
+    (-5, BLOCK_SIZE // 2 - 2),
+]
+TANK_COLORS = {PLAYER: GREEN, ENEMY: RED}
+TANK_HEALTH = 100
+BATCH_MIN = 16  # 实体数量达到该值时计时器改用NumPy批量更新
+STORE_HEADER = struct.Struct('<IIq')  # 快照头：槽位数量, 空闲槽位数量, 下一个创建序号
+
+
+class EntityStore:
+    def __init__(self, capacity=64):
+        self.capacity = 0
+        self.kind = bytearray()  # 每个槽位的实体类型
+        self.generation = array('I')  # 每个槽位的代数
+        self.serial = array('q')  # 创建序号，查询结果按创建顺序排列
+        self.columns = {}
+        for name, typecode in COMPONENTS.items():
+            column = array(typecode)
+            self.columns[name] = column
+            setattr(self, name, column)
+        self.rects = []  # 每个槽位的碰撞矩形，坐标与x/y同步（与pygame.Rect赋值相同的取整方式）
+        self.free = []  # 空闲槽位栈
+        self.counts = [0] * KIND_COUNT
+        self.next_serial = 0
+        # 槽位复用统计：hits为复用空闲槽位的次数，misses为需要扩容的次数
+        self.hits = 0
+        self.misses = 0
+        self.members = [{} for _ in range(KIND_COUNT)]  # 每类实体的槽位号（字典保持创建顺序，删除为O(1)）
+        self._views = {}  # 组件名 -> NumPy视图
+        self._queries = {}  # 实体类型 -> 槽位号列表缓存，创建或删除该类实体时失效
+        # 实体创建、移动和删除的监听者，调用方式为 listener(槽位号)；整体恢复时槽位号为None
+        self.listeners = []
+        self.world_width = WORLD_WIDTH  # 坦克移动时限制在世界范围内
+        self.world_height = WORLD_HEIGHT
+        self._grow(capacity)
+
+    def __len__(self):
+        return self.capacity - len(self.free)
+
+    def _grow(self, capacity):
+        # 扩容前释放所有NumPy视图（array被导出缓冲区时无法改变大小）
+        self._views.clear()
+        extra = capacity - self.capacity
+        self.kind.extend(bytes(extra))
+        self.generation.frombytes(bytes(extra * self.generation.itemsize))
+        self.serial.frombytes(bytes(extra * self.serial.itemsize))
+        for column in self.columns.values():
+            column.frombytes(bytes(extra * column.itemsize))
+        self.rects.extend(pygame.Rect(0, 0, 0, 0) for _ in range(extra))
+        # 新槽位倒序压栈，先分配下标小的槽位
+        self.free = list(range(capacity - 1, self.capacity - 1, -1)) + self.free
+        self.capacity = capacity
+
+    def view(self, name):
+        # 组件数组的零拷贝NumPy视图，扩容后失效，调用者不要长期持有
+        view = self._views.get(name)
+        if view is None:
+            if name == 'kind':
+                view = np.frombuffer(self.kind, dtype=np.uint8)
+            elif name == 'serial':
+                view = np.frombuffer(self.serial, dtype=np.int64)
+            elif name == 'generation':
+                view = np.frombuffer(self.generation, dtype=np.uint32)
+            else:
+                column = self.columns[name]
+                view = np.frombuffer(column, dtype=column.typecode)
+            self._views[name] = view
+        return view
+
+    def kinds(self):
+        return self.view('kind')
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def _notify(self, i):
+        for listener in self.listeners:
+            listener(i)
+
+    def create(self, kind, x, y):
+        # 创建实体，所有组件清零，返回实体ID
+        if self.free:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self._grow(self.capacity * 2)
+        i = self.free.pop()
+        self.kind[i] = kind
+        self.serial[i] = self.next_serial
+        self.next_serial += 1
+        for column in self.columns.values():
+            column[i] = 0
+        self.x[i] = x
+        self.y[i] = y
+        self.rects[i].update(x, y, BLOCK_SIZE, BLOCK_SIZE)
+        self.counts[kind] += 1
+        self.members[kind][i] = None
+        self._queries.pop(kind, None)
+        self._notify(i)
+        return (self.generation[i] << INDEX_BITS) | i
+
+    def create_tank(self, x, y, direction, speed, kind=ENEMY):
+        eid = self.create(kind, x, y)
+        i = eid & INDEX_MASK
+        self.direction[i] = direction.value
+        self.speed[i] = speed
+        self.base_speed[i] = speed  # 保存基础速度
+        self.health[i] = TANK_HEALTH
+        self.cooldown_time[i] = PLAYER_COOLDOWN if kind == PLAYER else PLAYER_COOLDOWN * 2  # 发射子弹的冷却时间
+        return eid
+
+    def create_explosion(self, x, y):
+        eid = self.create(EXPLOSION, x, y)
+        self.lifetime[eid & INDEX_MASK] = EXPLOSION_LIFETIME
+        return eid
+
+    def create_power_up(self, x, y, power_type):
+        eid = self.create(POWER_UP, x, y)
+        i = eid & INDEX_MASK
+        self.variant[i] = POWER_UP_TYPES.index(power_type)
+        self.lifetime[i] = POWER_UP_LIFETIME
+        self.visible[i] = True
+        return eid
+
+    def remove(self, i):
+        # 按槽位号删除实体，槽位立即可以复用
+        kind = self.kind[i]
+        if kind == FREE:
+            return
+        self.counts[kind] -= 1
+        del self.members[kind][i]
+        self._queries.pop(kind, None)
+        self.kind[i] = FREE
+        self.generation[i] = (self.generation[i] + 1) & GENERATION_MASK
+        self.free.append(i)
+        self._notify(i)
+
+    def destroy(self, eid):
+        i = self.index(eid)
+        if i is not None:
+            self.remove(i)
+
+    def clear(self):
+        for i in range(self.capacity):
+            self.remove(i)
+
+    def index(self, eid):
+        # 实体ID对应的槽位号，实体已被删除时返回None
+        i = eid & INDEX_MASK
+        if i < self.capacity and self.kind[i] != FREE and self.generation[i] == eid >> INDEX_BITS:
+            return i
+        return None
+
+    def entity_id(self, i):
+        return (self.generation[i] << INDEX_BITS) | i
+
+    def get(self, eid, name):
+        return self.columns[name][self.index(eid)]
+
+    def count(self, kind):
+        return self.counts[kind]
+
+    def query(self, kind):
+        # 某类实体的槽位号列表，按创建顺序排列（返回的列表是缓存，调用者不要修改）
+        slots = self._queries.get(kind)
+        if slots is None:
+            slots = self._queries[kind] = list(self.members[kind])
+        return slots
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'free': len(self.free)}
+
+    # 位置和移动
+    def set_position(self, i, x, y):
+        self.x[i] = x
+        self.y[i] = y
+        rect = self.rects[i]
+        rect.x = x
+        rect.y = y
+        self._notify(i)
+
+    def move(self, i, direction=None):
+        # 坦克按当前方向移动一步并限制在世界范围内
+        if direction is not None:
+            self.direction[i] = direction.value
+        step_x, step_y = DIRECTION_STEPS[self.direction[i]]
+        speed = self.speed[i]
+        x = self.x[i] + step_x * speed
+        y = self.y[i] + step_y * speed
+
+        # 边界检查
+        if x < 0:
+            x = 0
+        elif x > self.world_width - BLOCK_SIZE:
+            x = self.world_width - BLOCK_SIZE
+        if y < 0:
+            y = 0
+        elif y > self.world_height - BLOCK_SIZE:
+            y = self.world_height - BLOCK_SIZE
+        self.set_position(i, x, y)
+
+    def muzzle(self, i):
+        # 坦克发射子弹的位置
+        dx, dy = MUZZLE_OFFSETS[self.direction[i]]
+        return self.x[i] + dx, self.y[i] + dy
+
+    # 批量系统：实体较少时逐个处理，较多时用NumPy视图对整个数组批量处理
+    def tick_tank_timers(self):
+        # 所有坦克的冷却、护盾和速度提升计时器各减一，速度提升结束时恢复基础速度
+        if self.counts[PLAYER] + self.counts[ENEMY] < BATCH_MIN:
+            for kind in (PLAYER, ENEMY):
+                for i in self.query(kind):
+                    self._tick_tank(i)
+            return
+        # 其他类型的实体这三个组件始终为0，空闲槽位的旧数据在创建时清零，因此不需要按类型筛选
+        for name in ('cooldown', 'shield'):
+            timer = self.view(name)
+            timer -= timer > 0
+        boost = self.view('speed_boost')
+        boosted = boost > 0
+        if boosted.any():
+            boost -= boosted
+            expired = boosted & (boost == 0)
+            speed = self.view('speed')
+            speed[expired] = self.view('base_speed')[expired]
+
+    def _tick_tank(self, i):
+        if self.cooldown[i] > 0:
+            self.cooldown[i] -= 1
+        if self.shield[i] > 0:
+            self.shield[i] -= 1
+        if self.speed_boost[i] > 0:
+            self.speed_boost[i] -= 1
+            if self.speed_boost[i] <= 0:
+                self.speed[i] = self.base_speed[i]  # 恢复基础速度
+
+    def tick_explosions(self):
+        # 推进所有爆炸的动画帧，删除播放完的爆炸
+        if self.counts[EXPLOSION] < BATCH_MIN:
+            frame, lifetime = self.frame, self.lifetime
+            for i in self.query(EXPLOSION):
+                frame[i] += 1
+                if frame[i] >= lifetime[i]:
+                    self.remove(i)
+            return
+        explosions = self.kinds() == EXPLOSION
+        frame = self.view('frame')
+        frame += explosions
+        for i in np.flatnonzero(explosions & (frame >= self.view('lifetime'))).tolist():
+            self.remove(i)
+
+    def tick_power_ups(self):
+        # 所有道具的剩余时间减一，并每隔POWER_UP_FLASH_INTERVAL帧切换一次可见性
+        if self.counts[POWER_UP] < BATCH_MIN:
+            lifetime, flash_timer, visible = self.lifetime, self.flash_timer, self.visible
+            for i in self.query(POWER_UP):
+                lifetime[i] -= 1
+                flash_timer[i] += 1
+                if flash_timer[i] >= POWER_UP_FLASH_INTERVAL:
+                    flash_timer[i] = 0
+                    visible[i] ^= 1
+            return
+        power_ups = self.kinds() == POWER_UP
+        self.view('lifetime')[power_ups] -= 1
+        flash_timer = self.view('flash_timer')
+        flash_timer += power_ups
+        flash = power_ups & (flash_timer >= POWER_UP_FLASH_INTERVAL)
+        flash_timer[flash] = 0
+        self.view('visible')[flash] ^= 1
+
+    # 快照
+    def capture(self):
+        # 把存储打包成字节串：槽位的类型、代数和创建序号，空闲槽位栈，以及所有实体的组件
+        # （空闲槽位的组件在创建时清零，不需要保存）
+        live = np.flatnonzero(self.kinds())
+        parts = [STORE_HEADER.pack(self.capacity, len(self.free), self.next_serial),
+                 bytes(self.kind), self.generation.tobytes(), self.serial.tobytes(), array('I', self.free).tobytes()]
+        parts.extend(self.view(name)[live].tobytes() for name in self.columns)
+        return b''.join(parts)
+
+    def restore(self, data):
+        # 从capture的结果原地恢复，槽位数量不同时重新分配数组
+        capacity, free_count, next_serial = STORE_HEADER.unpack_from(data)
+        if capacity != self.capacity:
+            listeners, size = self.listeners, (self.world_width, self.world_height)
+            self.__init__(capacity)
+            self.listeners = listeners
+            self.world_width, self.world_height = size
+        offset = STORE_HEADER.size
+        self.kind[:] = data[offset:offset + capacity]
+        offset += capacity
+        for name in ('generation', 'serial'):
+            view = self.view(name)
+            view[:] = np.frombuffer(data, dtype=view.dtype, count=capacity, offset=offset)
+            offset += view.nbytes
+        self.free = np.frombuffer(data, dtype=np.uint32, count=free_count, offset=offset).tolist()
+        offset += 4 * free_count
+        self.next_serial = next_serial
+
+        kinds = self.kinds()
+        live = np.flatnonzero(kinds)
+        for name in self.columns:
+            view = self.view(name)
+            view[live] = np.frombuffer(data, dtype=view.dtype, count=len(live), offset=offset)
+            offset += view.itemsize * len(live)
+
+        # 按创建顺序重建每类实体的成员表，碰撞矩形按恢复后的位置设置
+        self.counts = np.bincount(kinds, minlength=KIND_COUNT).tolist()
+        self.counts[FREE] = 0
+        self.members = [{} for _ in range(KIND_COUNT)]
+        self._queries.clear()
+        order = live[np.argsort(self.view('serial')[live], kind='stable')]
+        members = self.members
+        for i, kind in zip(order.tolist(), kinds[order].tolist()):
+            members[kind][i] = None
+        rects, x, y = self.rects, self.x, self.y
+        for i in live.tolist():
+            rects[i].update(x[i], y[i], BLOCK_SIZE, BLOCK_SIZE)
+        self._notify(None)
@@ -0,0 +1,186 @@
+"""
+坦克大战流场寻路
+以玩家所在格子为起点，在墙壁网格上做一次广度优先搜索，得到每个空格子到玩家的步数；
+敌人只需比较所在格子四个相邻格子的步数就能得到前进方向（O(1)），
+所有敌人共用同一张流场，追击的敌人再多也只需要计算一次；
+有多名玩家时从所有玩家所在格子同时开始搜索，每个格子的步数是到最近玩家的步数
+
+流场只在玩家换了格子或网格变化时更新：墙被摧毁时只从该格子向外传播缩短的距离，
+新增墙或整个网格被替换时才整体重算
+
+地图很大时只在活动区域（玩家周围的区块）内搜索，每次重算的开销与地图大小无关
+"""
+from collections import deque
+
+from ecs import DIRECTIONS, DIRECTION_STEPS
+from wall_grid import EMPTY
+
+UNREACHABLE = 0x7FFFFFFF  # 无法到达玩家的格子（以及墙所在格子）的步数
+
+
+class FlowField:
+    def __init__(self):
+        self.grid = None
+        self.roots = None  # 所有玩家所在格子 ((列, 行), ...)
+        self.bounds = None  # 搜索范围 (起始列, 起始行, 结束列, 结束行)，None表示整个网格
+        self.inside = bytearray()  # 每个格子是否在搜索范围内
+        self.distance = []  # 每个格子到玩家的步数
+        self.visited = []  # 上次重算以来步数被设置过的格子，重算时只需要重置这些格子
+        self.adjacent = []  # 每个格子的相邻格子下标，绑定网格时预先计算
+        self.opened = []  # 上次更新后被摧毁的墙所在格子
+        self.full = True  # 是否需要整体重算
+        self.rebuilds = 0  # 整体重算次数
+        self.patches = 0  # 局部更新次数
+
+    def attach(self, grid):
+        # 绑定墙壁网格，网格对象更换时整体重算
+        if grid is self.grid:
+            return
+        # 相邻格子只由网格尺寸决定，尺寸相同的新网格直接沿用
+        if self.grid is None or (grid.cols, grid.rows) != (self.grid.cols, self.grid.rows):
+            self.adjacent = [self._neighbors(grid, i) for i in range(grid.cols * grid.rows)]
+        self.grid = grid
+        grid.add_listener(self.invalidate)
+        self.distance = [UNREACHABLE] * (grid.cols * grid.rows)
+        self.visited = []
+        self._set_bounds(None)
+        self.opened.clear()
+        self.full = True
+
+    def invalidate(self, col, row):
+        if col is None or self.grid.get(col, row) != EMPTY:
+            # 新增墙会让距离变长，直接整体重算（只在创建地图时发生）
+            self.full = True
+        else:
+            self.opened.append(row * self.grid.cols + col)
+
+    def update(self, col, row, bounds=None, others=()):
+        # 每帧敌人移动前调用，col和row为玩家所在格子，bounds为搜索范围（None或覆盖整个网格时不限制），
+        # others为其他玩家所在格子
+        grid = self.grid
+        if bounds == (0, 0, grid.cols, grid.rows):
+            bounds = None
+        if bounds != self.bounds:
+            self._set_bounds(bounds)
+        roots = ((col, row),) + tuple(others)
+        if self.full or roots != self.roots:
+            self.roots = roots
+            self._rebuild()
+        elif self.opened:
+            self._open_cells()
+
+    def _set_bounds(self, bounds):
+        self.bounds = bounds
+        self.full = True
+        grid = self.grid
+        if bounds is None:
+            self.inside = bytearray(b'\x01' * (grid.cols * grid.rows))
+            return
+        col0, row0, col1, row1 = bounds
+        cols = grid.cols
+        self.inside = inside = bytearray(cols * grid.rows)
+        for row in range(row0, row1):
+            inside[row * cols + col0:row * cols + col1] = b'\x01' * (col1 - col0)
+
+    def _rebuild(self):
+        # 从玩家格子开始逐层向外搜索，每层的步数加一
+        # 只重置上次搜索到的格子，不重新分配整个数组
+        grid = self.grid
+        distance = self.distance
+        for i in self.visited:
+            distance[i] = UNREACHABLE
+        self.visited = visited = []
+        self.opened.clear()
+        self.full = False
+        self.rebuilds += 1
+
+        inside = self.inside
+        frontier = []
+        for col, row in self.roots:
+            if not grid.in_bounds(col, row):
+                continue
+            start = row * grid.cols + col
+            if inside[start] and distance[start]:
+                distance[start] = 0
+                frontier.append(start)
+        visited += frontier
+        types = grid.types
+        adjacent = self.adjacent
+        step = 0
+        while frontier:
+            step += 1
+            layer = []
+            for i in frontier:
+                for neighbor in adjacent[i]:
+                    if distance[neighbor] == UNREACHABLE and types[neighbor] == EMPTY and inside[neighbor]:
+                        distance[neighbor] = step
+                        layer.append(neighbor)
+            visited += layer
+            frontier = layer
+
+    def _open_cells(self):
+        # 被摧毁的墙变成空格子后只会让距离变短：从这些格子开始向外传播更短的距离
+        grid = self.grid
+        distance = self.distance
+        queue = deque()
+        for i in self.opened:
+            if grid.types[i] != EMPTY or not self.inside[i]:
+                continue
+            best = distance[i]
+            for neighbor in self.adjacent[i]:
+                best = min(best, distance[neighbor] + 1)
+            if best < distance[i]:
+                distance[i] = best
+                self.visited.append(i)
+                queue.append(i)
+        self.opened.clear()
+        self.patches += 1
+        # 起点的距离可能不同，按距离排序后传播以减少重复更新（找到更短距离的格子会重新入队，结果仍是最短距离）
+        self._spread(deque(sorted(queue, key=distance.__getitem__)))
+
+    @staticmethod
+    def _neighbors(grid, i):
+        cols = grid.cols
+        col, row = i % cols, i // cols
+        neighbors = []
+        if row > 0:
+            neighbors.append(i - cols)
+        if col < cols - 1:
+            neighbors.append(i + 1)
+        if row < grid.rows - 1:
+            neighbors.append(i + cols)
+        if col > 0:
+            neighbors.append(i - 1)
+        return tuple(neighbors)
+
+    def _spread(self, queue):
+        # 只穿过空格子，并且只在找到更短距离时更新
+        types = self.grid.types
+        inside = self.inside
+        distance = self.distance
+        adjacent = self.adjacent
+        visited = self.visited
+        while queue:
+            i = queue.popleft()
+            step = distance[i] + 1
+            for neighbor in adjacent[i]:
+                if step < distance[neighbor] and types[neighbor] == EMPTY and inside[neighbor]:
+                    distance[neighbor] = step
+                    visited.append(neighbor)
+                    queue.append(neighbor)
+
+    def distance_at(self, col, row):
+        if not self.grid.in_bounds(col, row):
+            return UNREACHABLE
+        return self.distance[row * self.grid.cols + col]
+
+    def direction_at(self, col, row):
+        # 从该格子走向玩家的方向（距离减一的第一个相邻格子），已在玩家格子或无法到达时返回None
+        current = self.distance_at(col, row)
+        if current == 0 or current == UNREACHABLE:
+            return None
+        # 按Direction的顺序比较相邻格子，整体重算和局部更新得到的方向完全相同
+        for direction, (dx, dy) in zip(DIRECTIONS, DIRECTION_STEPS):
+            if self.distance_at(col + dx, row + dy) == current - 1:
+                return direction
+        return None
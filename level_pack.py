@@ -0,0 +1,221 @@
+"""
+坦克大战关卡包
+多个设计好的关卡保存在一个二进制文件中，用mmap打开后按索引直接定位到第N关，
+加载一关只读取这一关的数据，不需要解析整个文件；格子数据与WallGrid.types的格式相同，可以整体复制到网格中
+
+关卡包格式（小端）：
+    文件头    magic 'TKLV', 版本, 关卡数量
+    关卡索引  每个关卡 (数据偏移, 数据长度)
+    关卡数据  列数, 行数, 初始敌人数量, 名称长度, 出生点数量,
+              名称(UTF-8), 格子类型(每格一个字节), 每个出生点 (类型, 列, 行)
+
+文本关卡格式（便于编辑，用本工具转换成关卡包）：
+    name: 关卡名称
+    enemies: 初始敌人数量（可省略，省略时与随机地图相同）
+    之后每行是地图的一行：. 空地  # 可破坏墙  @ 不可破坏墙  P 玩家出生点  E 敌人出生点
+    以 ; 开头的行是注释，同一个文件中的多个关卡用 --- 分隔
+
+用法：python level_pack.py 关卡文本文件... -o 关卡包文件
+"""
+import argparse
+import mmap
+import struct
+
+from wall_grid import EMPTY, BRICK, STEEL
+
+MAGIC = b'TKLV'
+VERSION = 1
+HEADER = struct.Struct('<4sHI')
+INDEX_ENTRY = struct.Struct('<II')
+LEVEL_HEADER = struct.Struct('<HHHBH')
+SPAWN = struct.Struct('<BHH')
+
+# 出生点类型
+PLAYER_SPAWN = 0
+ENEMY_SPAWN = 1
+
+# 文本关卡中的字符 -> (格子类型, 出生点类型)
+TILE_CHARS = {
+    '.': (EMPTY, None),
+    '#': (BRICK, None),
+    '@': (STEEL, None),
+    'P': (EMPTY, PLAYER_SPAWN),
+    'E': (EMPTY, ENEMY_SPAWN),
+}
+
+
+class LevelPackError(Exception):
+    pass
+
+
+class Level:
+    def __init__(self, name, cols, rows, tiles, spawns=(), enemies=0):
+        if len(tiles) != cols * rows:
+            raise LevelPackError(f'关卡 {name} 的格子数量与尺寸不符')
+        self.name = name
+        self.cols = cols
+        self.rows = rows
+        self.tiles = bytes(tiles)  # 每个格子的墙类型，按行排列
+        self.spawns = list(spawns)  # (出生点类型, 列, 行)
+        self.enemies = enemies  # 初始敌人数量，0表示使用默认数量
+
+    @property
+    def player_spawn(self):
+        # 玩家出生点 (列, 行)，没有设置时返回None
+        for kind, col, row in self.spawns:
+            if kind == PLAYER_SPAWN:
+                return col, row
+        return None
+
+    @property
+    def enemy_spawns(self):
+        return [(col, row) for kind, col, row in self.spawns if kind == ENEMY_SPAWN]
+
+    def to_bytes(self):
+        name = self.name.encode('utf-8')[:255]
+        out = bytearray(LEVEL_HEADER.pack(self.cols, self.rows, self.enemies, len(name), len(self.spawns)))
+        out += name
+        out += self.tiles
+        for spawn in self.spawns:
+            out += SPAWN.pack(*spawn)
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if len(data) < LEVEL_HEADER.size:
+            raise LevelPackError('关卡数据损坏')
+        cols, rows, enemies, name_len, spawn_count = LEVEL_HEADER.unpack_from(data, 0)
+        offset = LEVEL_HEADER.size
+        if len(data) != offset + name_len + cols * rows + spawn_count * SPAWN.size:
+            raise LevelPackError('关卡数据损坏')
+        name = bytes(data[offset:offset + name_len]).decode('utf-8', errors='replace')
+        offset += name_len
+        tiles = data[offset:offset + cols * rows]
+        offset += cols * rows
+        spawns = [SPAWN.unpack_from(data, offset + k * SPAWN.size) for k in range(spawn_count)]
+        return cls(name, cols, rows, tiles, spawns, enemies)
+
+
+def parse_text(text, source='<text>'):
+    # 解析文本关卡，返回关卡列表
+    levels = []
+    blocks = [[]]
+    for number, line in enumerate(text.splitlines(), 1):
+        if line.strip() == '---':
+            blocks.append([])
+        elif not line.startswith(';'):
+            blocks[-1].append((number, line.rstrip()))
+
+    for block in blocks:
+        meta = {}
+        grid = []
+        for number, line in block:
+            if not line:
+                continue
+            key, sep, value = line.partition(':')
+            if sep and not grid and key.strip() in ('name', 'enemies'):
+                meta[key.strip()] = value.strip()
+            else:
+                grid.append((number, line))
+        if not grid:
+            if meta:
+                raise LevelPackError(f'{source}: 关卡 {meta.get("name", "")} 没有地图')
+            continue
+
+        cols = len(grid[0][1])
+        tiles = bytearray()
+        spawns = []
+        for row, (number, line) in enumerate(grid):
+            if len(line) != cols:
+                raise LevelPackError(f'{source}:{number}: 每行的长度必须相同（应为{cols}）')
+            for col, char in enumerate(line):
+                if char not in TILE_CHARS:
+                    raise LevelPackError(f'{source}:{number}: 未知的格子字符 {char!r}')
+                kind, spawn = TILE_CHARS[char]
+                tiles.append(kind)
+                if spawn is not None:
+                    spawns.append((spawn, col, row))
+        try:
+            enemies = int(meta.get('enemies', 0))
+        except ValueError:
+            raise LevelPackError(f'{source}: enemies必须是整数')
+        name = meta.get('name', f'{source} #{len(levels) + 1}')
+        levels.append(Level(name, cols, len(grid), tiles, spawns, enemies))
+    return levels
+
+
+def write_pack(path, levels):
+    records = [level.to_bytes() for level in levels]
+    offset = HEADER.size + len(records) * INDEX_ENTRY.size
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(records)))
+        for record in records:
+            f.write(INDEX_ENTRY.pack(offset, len(record)))
+            offset += len(record)
+        for record in records:
+            f.write(record)
+
+
+class LevelPack:
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            try:
+                self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise LevelPackError(f'关卡包为空: {path}')
+        if len(self.data) < HEADER.size:
+            raise LevelPackError(f'不是关卡包文件: {path}')
+        magic, version, count = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC:
+            raise LevelPackError(f'不是关卡包文件: {path}')
+        if version != VERSION:
+            raise LevelPackError(f'不支持的关卡包版本: {version}')
+        if len(self.data) < HEADER.size + count * INDEX_ENTRY.size:
+            raise LevelPackError(f'关卡包索引损坏: {path}')
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def level(self, n):
+        # 第n关（从0开始），只读取索引中的一项和这一关的数据
+        if not 0 <= n < self.count:
+            raise IndexError(n)
+        offset, length = INDEX_ENTRY.unpack_from(self.data, HEADER.size + n * INDEX_ENTRY.size)
+        if offset + length > len(self.data):
+            raise LevelPackError(f'关卡包数据损坏: 第{n + 1}关')
+        return Level.from_bytes(self.data[offset:offset + length])
+
+    def close(self):
+        self.data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='把文本关卡转换成坦克大战关卡包')
+    parser.add_argument('files', nargs='+', help='文本关卡文件，按顺序组成关卡包')
+    parser.add_argument('-o', '--output', required=True, help='输出的关卡包文件')
+    args = parser.parse_args(argv)
+
+    levels = []
+    for path in args.files:
+        with open(path, encoding='utf-8') as f:
+            levels.extend(parse_text(f.read(), path))
+    if not levels:
+        parser.error('没有找到任何关卡')
+    write_pack(args.output, levels)
+    for n, level in enumerate(levels, 1):
+        print(f"第{n}关 {level.name}: {level.cols}x{level.rows}  墙 {level.cols * level.rows - level.tiles.count(EMPTY)}  "
+              f"敌人出生点 {len(level.enemy_spawns)}")
+    print(f"关卡包已保存: {args.output}（{len(levels)}关）")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
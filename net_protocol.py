@@ -0,0 +1,254 @@
+"""
+坦克大战联机协议
+服务器和客户端之间用UDP通信，每个数据包的第一个字节是消息类型：
+    HELLO     客户端 -> 服务器  请求加入游戏（收到第一个快照之前定期重发）
+    INPUT     客户端 -> 服务器  输入序号, 已收到的最新快照编号, 输入字节（与录像的输入编码相同）, 发射序号
+    SNAPSHOT  服务器 -> 客户端  游戏状态快照
+    BYE       客户端 -> 服务器  离开游戏
+    FRAGMENT  服务器 -> 客户端  超过MAX_DATAGRAM字节的快照消息的一个分片：快照编号, 分片序号, 分片数量, 数据
+
+快照按差量压缩：服务器保存最近SNAPSHOT_HISTORY帧的快照，只发送与客户端确认收到的快照（基准）相比
+变化了的实体、新增或变化的子弹、消失的实体和子弹以及变化的墙壁格子；
+客户端还没有确认过快照或者基准已经过期时发送完整快照。
+大世界的完整快照可能远超一个UDP数据包的安全大小，这样的消息拆成多个分片发送，客户端收齐后再解码；
+丢失分片的快照整个作废，客户端不会确认它，服务器继续发送完整快照直到客户端确认
+子弹做匀速直线运动，只在第一次出现时发送位置和速度，之后客户端按快照编号推算位置，不需要每帧发送
+
+发射请求不能因为丢包而丢失：客户端按下发射键时记下当时的输入序号（发射序号），之后每个输入包都带着
+发射位和这个序号，直到服务器在快照中确认处理过该序号为止；服务器按发射序号去重，同一次发射只处理一次
+
+快照消息格式（小端）：
+    消息类型, 玩家实体ID, 标志（第0位表示消息体经过zlib压缩）, 已处理的最新发射序号, 消息体
+消息体：
+    快照编号, 基准编号, 分数, 等级, 游戏状态, 世界宽, 世界高, 各部分的数量, 墙壁格式
+    变化的实体   每个 (实体ID, 类型, x, y, 方向, 生命值, 标志, 道具类型或爆炸帧, 爆炸时长)
+    消失的实体   每个 实体ID
+    变化的子弹   每个 (子弹编号, x, y, dx, dy, 归属, 位置对应的快照编号)
+    消失的子弹   每个 子弹编号
+    墙壁        完整格式为所有格子的类型（每格一个字节），差量格式为每个变化的格子 (格子下标, 类型)
+"""
+import struct
+import zlib
+
+import numpy as np
+
+from ecs import PLAYER, ENEMY, EXPLOSION, POWER_UP
+from bullet_store import PLAYER_BULLET, pixel_coords
+
+DEFAULT_PORT = 7777
+
+# 消息类型
+HELLO = 1
+INPUT = 2
+SNAPSHOT = 3
+BYE = 4
+FRAGMENT = 5
+
+NO_SNAPSHOT = 0xFFFFFFFF  # 没有基准快照（完整快照），或者客户端还没有收到快照
+NO_PLAYER = 0xFFFFFFFF  # 客户端没有自己的坦克
+SNAPSHOT_HISTORY = 64  # 服务器保存的快照数量，客户端确认的快照更旧时发送完整快照
+COMPRESS_MIN = 128  # 消息体达到该字节数时尝试zlib压缩
+MAX_DATAGRAM = 1200  # 单个UDP数据包的最大字节数（低于常见的MTU，不会在IP层分片），更大的消息拆成分片
+
+INPUT_MESSAGE = struct.Struct('<BIIBI')
+SNAPSHOT_PREFIX = struct.Struct('<BIBI')
+FRAGMENT_HEADER = struct.Struct('<BIHH')
+SNAPSHOT_HEADER = struct.Struct('<IIIHBHHHHHHBI')
+ENTITY = struct.Struct('<IBiiBBBHH')
+BULLET = struct.Struct('<IffffBI')
+ID = struct.Struct('<I')
+WALL_CELL = np.dtype([('cell', '<u4'), ('kind', 'u1')])
+
+COMPRESSED = 0x01  # 快照标志：消息体经过zlib压缩
+WALLS_DELTA = 0
+WALLS_FULL = 1
+
+# 实体标志
+SHIELDED = 0x01
+VISIBLE = 0x02
+
+SNAPSHOT_KINDS = (POWER_UP, PLAYER, ENEMY, EXPLOSION)  # 快照中的实体按绘制顺序排列
+
+
+class Snapshot:
+    # 一帧的游戏状态：实体和子弹按ID保存为元组，元组不同就是有变化
+    def __init__(self, frame, info, entities, bullets, walls):
+        self.frame = frame  # 快照编号，服务器每帧加一，跨局不重置
+        self.info = info  # (分数, 等级, 游戏状态, 世界宽, 世界高)
+        self.entities = entities  # 实体ID -> (类型, x, y, 方向, 生命值, 标志, 道具类型或爆炸帧, 爆炸时长)
+        self.bullets = bullets  # 子弹编号 -> (x, y, dx, dy, 归属, 位置对应的快照编号)
+        self.walls = walls  # 每个格子的墙类型
+
+    def bullet_positions(self):
+        # 按快照编号推算所有子弹当前的像素坐标 [(x, y, 是否玩家子弹), ...]
+        if not self.bullets:
+            return []
+        x, y, dx, dy, owner, frame = (np.array(column) for column in zip(*self.bullets.values()))
+        elapsed = self.frame - frame
+        return list(zip(pixel_coords(x + dx * elapsed).tolist(), pixel_coords(y + dy * elapsed).tolist(),
+                        (owner == PLAYER_BULLET).tolist()))
+
+
+def capture_snapshot(game, frame, previous=None):
+    # 从服务器的游戏状态生成快照，previous为上一帧的快照（用来沿用子弹记录和墙壁数据）
+    entities = game.entities
+    records = {}
+    for kind in SNAPSHOT_KINDS:
+        for i in entities.query(kind):
+            if kind == EXPLOSION:
+                record = (kind, int(entities.x[i]), int(entities.y[i]), 0, 0, 0, entities.frame[i], entities.lifetime[i])
+            elif kind == POWER_UP:
+                rect = entities.rects[i]
+                record = (kind, rect.x, rect.y, 0, 0, VISIBLE if entities.visible[i] else 0, entities.variant[i], 0)
+            else:
+                rect = entities.rects[i]
+                record = (kind, rect.x, rect.y, entities.direction[i], max(0, min(entities.health[i], 255)),
+                          SHIELDED if entities.shield[i] > 0 else 0, 0, 0)
+            records[entities.entity_id(i)] = record
+
+    # 子弹沿用上一帧的记录，只有新发射的子弹或者位置与推算不符（例如游戏结束后子弹停止）时才生成新记录
+    bullets = game.bullets
+    n = bullets.count
+    alive = bullets.alive[:n]
+    old = previous.bullets if previous is not None else {}
+    shots = {}
+    for serial, x, y, dx, dy, owner in zip(bullets.serial[:n][alive].tolist(), bullets.x[:n][alive].tolist(),
+                                           bullets.y[:n][alive].tolist(), bullets.dx[:n][alive].tolist(),
+                                           bullets.dy[:n][alive].tolist(), bullets.owner[:n][alive].tolist()):
+        record = old.get(serial)
+        if (record is None or abs(record[0] + record[2] * (frame - record[5]) - x) > 0.5
+                or abs(record[1] + record[3] * (frame - record[5]) - y) > 0.5):
+            record = (x, y, dx, dy, owner, frame)
+        shots[serial] = record
+
+    # 墙壁没有变化时共用上一帧的数据，编码时按对象是否相同快速判断
+    types = game.walls.types
+    walls = previous.walls if previous is not None and previous.walls == types else bytes(types)
+    info = (game.score, game.level, game.state.value, game.world.width, game.world.height)
+    return Snapshot(frame, info, records, shots, walls)
+
+
+def encode_snapshot(snapshot, baseline=None):
+    # 编码相对基准快照的差量（baseline为None时为完整快照），返回 (标志, 消息体)
+    base_entities = baseline.entities if baseline is not None else {}
+    base_bullets = baseline.bullets if baseline is not None else {}
+    changed = [(eid, record) for eid, record in snapshot.entities.items() if base_entities.get(eid) != record]
+    removed = [eid for eid in base_entities if eid not in snapshot.entities]
+    shots = [(serial, record) for serial, record in snapshot.bullets.items() if base_bullets.get(serial) != record]
+    gone = [serial for serial in base_bullets if serial not in snapshot.bullets]
+
+    if baseline is None or len(baseline.walls) != len(snapshot.walls):
+        wall_format, wall_data = WALLS_FULL, snapshot.walls
+        wall_count = len(wall_data)
+    elif baseline.walls is snapshot.walls:
+        wall_format, wall_data, wall_count = WALLS_DELTA, b'', 0
+    else:
+        new = np.frombuffer(snapshot.walls, dtype=np.uint8)
+        cells = np.flatnonzero(new != np.frombuffer(baseline.walls, dtype=np.uint8))
+        cells_out = np.empty(len(cells), dtype=WALL_CELL)
+        cells_out['cell'] = cells
+        cells_out['kind'] = new[cells]
+        wall_format, wall_data, wall_count = WALLS_DELTA, cells_out.tobytes(), len(cells)
+
+    score, level, state, width, height = snapshot.info
+    parts = [SNAPSHOT_HEADER.pack(snapshot.frame, NO_SNAPSHOT if baseline is None else baseline.frame,
+                                  score, level, state, width, height, len(changed), len(removed),
+                                  len(shots), len(gone), wall_format, wall_count)]
+    parts.extend(ENTITY.pack(eid, *record) for eid, record in changed)
+    parts.extend(ID.pack(eid) for eid in removed)
+    parts.extend(BULLET.pack(serial, *record) for serial, record in shots)
+    parts.extend(ID.pack(serial) for serial in gone)
+    parts.append(wall_data)
+    body = b''.join(parts)
+
+    # 只在压缩后确实更短时使用压缩
+    if len(body) >= COMPRESS_MIN:
+        compressed = zlib.compress(body, 1)
+        if len(compressed) < len(body):
+            return COMPRESSED, compressed
+    return 0, body
+
+
+def snapshot_message(player, flags, body, fire_ack=0):
+    return SNAPSHOT_PREFIX.pack(SNAPSHOT, player, flags, fire_ack) + body
+
+
+def split_message(message, frame):
+    # 超过MAX_DATAGRAM字节的快照消息拆成分片，返回要发送的数据包列表
+    if len(message) <= MAX_DATAGRAM:
+        return [message]
+    size = MAX_DATAGRAM - FRAGMENT_HEADER.size
+    count = (len(message) + size - 1) // size
+    return [FRAGMENT_HEADER.pack(FRAGMENT, frame, n, count) + message[n * size:(n + 1) * size]
+            for n in range(count)]
+
+
+class FragmentBuffer:
+    # 客户端按快照编号收集分片，收齐后拼回完整的快照消息
+    def __init__(self):
+        self.pending = {}  # 快照编号 -> [分片数据或None, ...]
+
+    def add(self, data):
+        # 返回拼好的快照消息，还没有收齐时返回None
+        if len(data) < FRAGMENT_HEADER.size:
+            return None
+        _, frame, index, count = FRAGMENT_HEADER.unpack_from(data)
+        parts = self.pending.get(frame)
+        if parts is None:
+            parts = self.pending[frame] = [None] * count
+            # 迟迟收不齐的旧快照直接丢弃
+            for old in [old for old in self.pending if old < frame - SNAPSHOT_HISTORY]:
+                del self.pending[old]
+        if count != len(parts) or index >= count:
+            return None
+        parts[index] = data[FRAGMENT_HEADER.size:]
+        if any(part is None for part in parts):
+            return None
+        del self.pending[frame]
+        return b''.join(parts)
+
+
+def decode_snapshot(data, snapshots):
+    # 解码快照消息，snapshots为客户端保存的 快照编号 -> Snapshot；
+    # 返回 (玩家实体ID, 已处理的发射序号, 基准编号, 快照)，基准快照已经丢弃时返回None
+    _, player, flags, fire_ack = SNAPSHOT_PREFIX.unpack_from(data)
+    body = data[SNAPSHOT_PREFIX.size:]
+    if flags & COMPRESSED:
+        body = zlib.decompress(body)
+    (frame, base_frame, score, level, state, width, height, changed, removed, shots, gone,
+     wall_format, wall_count) = SNAPSHOT_HEADER.unpack_from(body)
+    if base_frame == NO_SNAPSHOT:
+        baseline = None
+        entities, bullets = {}, {}
+    else:
+        baseline = snapshots.get(base_frame)
+        if baseline is None:
+            return None
+        entities, bullets = dict(baseline.entities), dict(baseline.bullets)
+
+    offset = SNAPSHOT_HEADER.size
+    for _ in range(changed):
+        eid, *record = ENTITY.unpack_from(body, offset)
+        entities[eid] = tuple(record)
+        offset += ENTITY.size
+    for _ in range(removed):
+        entities.pop(ID.unpack_from(body, offset)[0], None)
+        offset += ID.size
+    for _ in range(shots):
+        serial, *record = BULLET.unpack_from(body, offset)
+        bullets[serial] = tuple(record)
+        offset += BULLET.size
+    for _ in range(gone):
+        bullets.pop(ID.unpack_from(body, offset)[0], None)
+        offset += ID.size
+
+    if wall_format == WALLS_FULL:
+        walls = bytes(body[offset:offset + wall_count])
+    elif wall_count:
+        cells = np.frombuffer(body, dtype=WALL_CELL, count=wall_count, offset=offset)
+        types = np.frombuffer(baseline.walls, dtype=np.uint8).copy()
+        types[cells['cell']] = cells['kind']
+        walls = types.tobytes()
+    else:
+        walls = baseline.walls
+    return player, fire_ack, base_frame, Snapshot(frame, (score, level, state, width, height), entities, bullets, walls)
@@ -0,0 +1,190 @@
+"""
+坦克大战帧性能分析器
+在游戏循环的各个阶段和绘制循环周围计时，提供显示滚动帧时间百分位和实体数量的叠加层，
+并可以把整个会话导出为Chrome trace_event格式的JSON（在chrome://tracing或Perfetto中打开）
+
+关闭时section()直接返回一个共享的空上下文，几乎没有额外开销
+"""
+import json
+import time
+from collections import deque
+
+FRAME_HISTORY = 300  # 滚动统计的帧数（60帧/秒时约5秒）
+MAX_TRACE_EVENTS = 2000000  # 跟踪事件上限，防止长时间会话耗尽内存
+
+OVERLAY_COLOR = (255, 255, 255)
+OVERLAY_BACKGROUND = (0, 0, 0)
+OVERLAY_ALPHA = 180
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * fraction))
+    return sorted_values[index]
+
+
+class _NullSection:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SECTION = _NullSection()
+
+
+class _Section:
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, self.start, time.perf_counter_ns())
+        return False
+
+
+class FrameProfiler:
+    def __init__(self, history=FRAME_HISTORY):
+        self.enabled = False  # 是否计时
+        self.overlay = False  # 是否显示叠加层
+        self.tracing = False  # 是否记录跟踪事件
+        self.history = history
+        self.frame_times = deque(maxlen=history)  # 每帧耗时（纳秒）
+        self.section_times = {}  # 阶段名 -> 每帧耗时（纳秒）
+        self.frame_sections = {}  # 当前帧各阶段的累计耗时
+        self.frame_start = None
+        self.origin = time.perf_counter_ns()
+        self.trace_events = []
+        self.dropped_events = 0
+        self.font = None
+
+    def section(self, name):
+        if not self.enabled:
+            return NULL_SECTION
+        return _Section(self, name)
+
+    def record(self, name, start, end):
+        duration = end - start
+        self.frame_sections[name] = self.frame_sections.get(name, 0) + duration
+        if self.tracing:
+            self._trace({'name': name, 'ph': 'X', 'pid': 1, 'tid': 1,
+                         'ts': (start - self.origin) / 1000, 'dur': duration / 1000})
+
+    def _trace(self, event):
+        if len(self.trace_events) < MAX_TRACE_EVENTS:
+            self.trace_events.append(event)
+        else:
+            self.dropped_events += 1
+
+    def begin_frame(self):
+        if self.enabled:
+            self.frame_start = time.perf_counter_ns()
+
+    def end_frame(self, counts=None):
+        # 结束一帧，counts为实体数量，用于叠加层和跟踪中的计数器
+        if not self.enabled or self.frame_start is None:
+            return
+        end = time.perf_counter_ns()
+        self.frame_times.append(end - self.frame_start)
+        for name, duration in self.frame_sections.items():
+            times = self.section_times.get(name)
+            if times is None:
+                times = self.section_times[name] = deque(maxlen=self.history)
+            times.append(duration)
+        self.frame_sections = {}
+        if self.tracing:
+            self._trace({'name': 'frame', 'ph': 'X', 'pid': 1, 'tid': 0,
+                         'ts': (self.frame_start - self.origin) / 1000,
+                         'dur': (end - self.frame_start) / 1000})
+            if counts:
+                self._trace({'name': 'entities', 'ph': 'C', 'pid': 1,
+                             'ts': (end - self.origin) / 1000, 'args': dict(counts)})
+        self.frame_start = None
+
+    def toggle_overlay(self):
+        self.overlay = not self.overlay
+        self.enabled = self.overlay or self.tracing
+        if not self.enabled:
+            self.reset()
+
+    def reset(self):
+        self.frame_times.clear()
+        self.section_times = {}
+        self.frame_sections = {}
+        self.frame_start = None
+
+    def start_trace(self):
+        self.tracing = True
+        self.enabled = True
+
+    def save_trace(self, path):
+        data = {
+            'traceEvents': [
+                {'name': 'process_name', 'ph': 'M', 'pid': 1, 'args': {'name': '坦克大战'}},
+                {'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': 0, 'args': {'name': '帧'}},
+                {'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': 1, 'args': {'name': '阶段'}},
+            ] + self.trace_events,
+            'displayTimeUnit': 'ms',
+            'otherData': {'dropped_events': self.dropped_events},
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        print(f"性能跟踪已保存: {path}（{len(self.trace_events)}个事件）")
+
+    def stats(self):
+        # 滚动窗口内的帧时间百分位和各阶段平均耗时（毫秒）
+        frames = sorted(self.frame_times)
+        result = {
+            'frames': len(frames),
+            'p50': percentile(frames, 0.50) / 1e6,
+            'p95': percentile(frames, 0.95) / 1e6,
+            'p99': percentile(frames, 0.99) / 1e6,
+            'max': frames[-1] / 1e6 if frames else 0.0,
+            'sections': {},
+        }
+        for name, times in self.section_times.items():
+            ordered = sorted(times)
+            result['sections'][name] = (sum(ordered) / len(ordered) / 1e6, percentile(ordered, 0.95) / 1e6)
+        return result
+
+    def overlay_lines(self, counts=None, fps=None):
+        stats = self.stats()
+        lines = [f"帧时间 p50 {stats['p50']:.2f}  p95 {stats['p95']:.2f}  p99 {stats['p99']:.2f}  "
+                 f"最大 {stats['max']:.2f} ms"]
+        if fps is not None:
+            lines.append(f"FPS {fps:.1f}  ({stats['frames']}帧)")
+        for name, (mean, p95) in sorted(stats['sections'].items(), key=lambda item: -item[1][0]):
+            lines.append(f"{name:<24} {mean:6.3f}  p95 {p95:6.3f}")
+        if counts:
+            lines.append("  ".join(f"{name} {value}" for name, value in counts.items()))
+        return lines
+
+    def draw_overlay(self, screen, counts=None, fps=None):
+        import pygame
+        from text_cache import get_font
+        if self.font is None:
+            self.font = get_font('Microsoft YaHei', 14)
+        lines = self.overlay_lines(counts, fps)
+        rendered = [self.font.render(line, True, OVERLAY_COLOR) for line in lines]
+        width = max(surface.get_width() for surface in rendered) + 10
+        height = sum(surface.get_height() for surface in rendered) + 10
+        background = pygame.Surface((width, height))
+        background.set_alpha(OVERLAY_ALPHA)
+        background.fill(OVERLAY_BACKGROUND)
+        x = screen.get_width() - width - 5
+        y = 5
+        screen.blit(background, (x, y))
+        for surface in rendered:
+            screen.blit(surface, (x + 5, y + 5))
+            y += surface.get_height()
+        return pygame.Rect(x, 5, width, height)
@@ -0,0 +1,277 @@
+"""
+坦克大战录像
+记录一局游戏的随机数种子和每帧输入，并定期保存完整的游戏状态关键帧，
+回放时可以直接跳到任意帧附近的关键帧，不必从第0帧重新模拟
+
+录像文件格式（小端）：
+    文件头    magic 'TKRP', 版本, 种子, 总帧数, 关键帧间隔, 关键帧数量, 输入数据长度
+    关键帧索引  每个关键帧 (帧号, 数据偏移, 数据长度)
+    输入数据    每帧一个字节（低3位方向，第4位发射），按 (字节, 重复次数) 游程编码
+    关键帧数据  zlib压缩的游戏状态（格式见game_state）
+
+用法：python replay.py 录像文件 [--seek 帧号] [--verify] [--levels 关卡包]
+（录像不包含关卡包，回放使用关卡包录制的录像时需要指定同一个关卡包；世界大小保存在关键帧中，回放时自动使用）
+"""
+import argparse
+import os
+import struct
+import time
+import zlib
+
+from config import Direction, GameState
+from ecs import ENEMY
+from game_state import save_state, load_state, state_world_size
+
+MAGIC = b'TKRP'
+VERSION = 11  # 文件格式或游戏规则变化（旧录像无法按原样重放）时加一
+HEADER = struct.Struct('<4sHQIIII')
+INDEX_ENTRY = struct.Struct('<III')
+
+KEYFRAME_INTERVAL = 600  # 默认每10秒保存一个关键帧
+
+FIRE_BIT = 0x08
+
+
+class ReplayError(Exception):
+    pass
+
+
+# 输入编码：0表示不移动，1~4对应四个方向
+def encode_input(direction, fire):
+    code = 0 if direction is None else direction.value + 1
+    return code | (FIRE_BIT if fire else 0)
+
+
+def decode_input(code):
+    direction_code = code & 0x07
+    direction = None if direction_code == 0 else Direction(direction_code - 1)
+    return direction, bool(code & FIRE_BIT)
+
+
+def rle_encode(data):
+    out = bytearray()
+    i = 0
+    n = len(data)
+    while i < n:
+        value = data[i]
+        run = 1
+        while i + run < n and run < 255 and data[i + run] == value:
+            run += 1
+        out.append(value)
+        out.append(run)
+        i += run
+    return bytes(out)
+
+
+def rle_decode(data):
+    out = bytearray()
+    for i in range(0, len(data), 2):
+        out.extend(bytes((data[i],)) * data[i + 1])
+    return out
+
+
+# 关键帧：game_state打包的完整游戏状态，zlib压缩
+def encode_keyframe(game):
+    return zlib.compress(save_state(game))
+
+
+def decode_keyframe(data):
+    return zlib.decompress(data)
+
+
+class Replay:
+    def __init__(self, seed, inputs=None, keyframes=None, keyframe_interval=KEYFRAME_INTERVAL):
+        self.seed = seed
+        self.inputs = bytearray(inputs or b'')  # 每帧一个输入字节
+        self.keyframes = dict(keyframes or {})  # 帧号 -> 压缩的状态数据
+        self.keyframe_interval = keyframe_interval
+
+    def __len__(self):
+        return len(self.inputs)
+
+    def input_at(self, tick):
+        return decode_input(self.inputs[tick])
+
+    def world_size(self):
+        # 录制时的世界大小，保存在第0帧的关键帧中
+        if 0 not in self.keyframes:
+            return None
+        return state_world_size(decode_keyframe(self.keyframes[0]))
+
+    def keyframe_before(self, tick):
+        # 不晚于指定帧的最近关键帧
+        candidates = [t for t in self.keyframes if t <= tick]
+        if not candidates:
+            return None
+        return max(candidates)
+
+    def to_bytes(self):
+        inputs = rle_encode(self.inputs)
+        ticks = sorted(self.keyframes)
+        index = bytearray()
+        blobs = bytearray()
+        for t in ticks:
+            data = self.keyframes[t]
+            index += INDEX_ENTRY.pack(t, len(blobs), len(data))
+            blobs += data
+        header = HEADER.pack(MAGIC, VERSION, self.seed, len(self.inputs), self.keyframe_interval,
+                             len(ticks), len(inputs))
+        return header + bytes(index) + inputs + bytes(blobs)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if len(data) < HEADER.size:
+            raise ReplayError('录像文件不完整')
+        magic, version, seed, tick_count, interval, keyframe_count, input_len = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ReplayError('不是坦克大战录像文件')
+        if version != VERSION:
+            raise ReplayError(f'不支持的录像版本: {version}')
+        offset = HEADER.size
+        index = [INDEX_ENTRY.unpack_from(data, offset + i * INDEX_ENTRY.size) for i in range(keyframe_count)]
+        offset += keyframe_count * INDEX_ENTRY.size
+        inputs = rle_decode(data[offset:offset + input_len])
+        offset += input_len
+        if len(inputs) != tick_count:
+            raise ReplayError('录像输入数据损坏')
+        keyframes = {t: bytes(data[offset + start:offset + start + length]) for t, start, length in index}
+        return cls(seed, inputs, keyframes, interval)
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+
+class ReplayRecorder:
+    def __init__(self, path=None, keyframe_interval=KEYFRAME_INTERVAL):
+        self.path = path
+        self.keyframe_interval = keyframe_interval
+        self.game = None
+        self.replay = None
+        self.saved = True
+
+    def start(self, game):
+        # 在reset_game之后调用，记录种子和第0帧的关键帧
+        self.game = game
+        self.replay = Replay(game.seed, keyframe_interval=self.keyframe_interval)
+        self.replay.keyframes[0] = encode_keyframe(game)
+        self.saved = False
+
+    def tick(self, direction, fire):
+        # 记录输入并推进一帧，每隔一段时间保存一个关键帧
+        game = self.game
+        was_over = game.state == GameState.GAME_OVER
+        self.replay.inputs.append(encode_input(direction, fire))
+        game.tick(direction, fire)
+        recorded = len(self.replay.inputs)
+        if recorded % self.keyframe_interval == 0:
+            self.replay.keyframes[recorded] = encode_keyframe(game)
+        # 游戏结束时自动保存
+        if not was_over and game.state == GameState.GAME_OVER:
+            self.save()
+
+    def save(self):
+        if self.path is None or self.replay is None or self.saved:
+            return
+        try:
+            self.replay.save(self.path)
+            self.saved = True
+            print(f"录像已保存: {self.path}")
+        except OSError:
+            print(f"警告：无法保存录像: {self.path}")
+
+
+class ReplayPlayer:
+    def __init__(self, replay, game=None):
+        if game is None:
+            from 坦克大战 import TankGame
+            game = TankGame(headless=True, world_size=replay.world_size())
+        self.replay = replay
+        self.game = game
+        self.position = 0  # 下一个要执行的输入帧
+        game.reset_game(replay.seed)
+
+    def step(self):
+        # 执行一帧录像输入，录像结束时返回False
+        if self.position >= len(self.replay):
+            return False
+        direction, fire = self.replay.input_at(self.position)
+        self.game.tick(direction, fire)
+        self.position += 1
+        return True
+
+    def fast_forward(self, ticks):
+        for _ in range(ticks):
+            if not self.step():
+                break
+
+    def seek(self, tick):
+        # 恢复到不晚于目标帧的关键帧，再模拟剩余的几帧
+        tick = max(0, min(tick, len(self.replay)))
+        keyframe = self.replay.keyframe_before(tick)
+        # 当前位置已经在关键帧和目标帧之间时直接向前模拟
+        if keyframe is None:
+            if tick < self.position:
+                self.game.reset_game(self.replay.seed)
+                self.position = 0
+        elif not keyframe <= self.position <= tick:
+            load_state(self.game, decode_keyframe(self.replay.keyframes[keyframe]))
+            self.position = keyframe
+        self.fast_forward(tick - self.position)
+
+    def verify(self):
+        # 从头模拟整段录像，检查每个关键帧是否与重新模拟的状态一致
+        self.seek(0)
+        mismatches = []
+        for t in sorted(self.replay.keyframes):
+            self.fast_forward(t - self.position)
+            if save_state(self.game) != decode_keyframe(self.replay.keyframes[t]):
+                mismatches.append(t)
+        return mismatches
+
+
+def main(argv=None):
+    os.environ['TANK_HEADLESS'] = '1'
+    parser = argparse.ArgumentParser(description='坦克大战录像工具')
+    parser.add_argument('file', help='录像文件')
+    parser.add_argument('--seek', type=int, default=None, help='跳转到指定帧并显示游戏状态')
+    parser.add_argument('--verify', action='store_true', help='重新模拟并校验所有关键帧')
+    parser.add_argument('--levels', metavar='FILE', default=None, help='录制时使用的关卡包')
+    args = parser.parse_args(argv)
+
+    replay = Replay.load(args.file)
+    print(f"种子: {replay.seed}  帧数: {len(replay)}  关键帧: {len(replay.keyframes)} "
+          f"(间隔 {replay.keyframe_interval})")
+    game = None
+    if args.levels:
+        from level_pack import LevelPack
+        from 坦克大战 import TankGame
+        game = TankGame(headless=True, world_size=replay.world_size())
+        game.use_level_pack(LevelPack(args.levels))
+    player = ReplayPlayer(replay, game)
+
+    if args.seek is not None:
+        start = time.perf_counter()
+        player.seek(args.seek)
+        elapsed = time.perf_counter() - start
+        game = player.game
+        print(f"跳转到第 {player.position} 帧，耗时 {elapsed * 1000:.1f}ms")
+        print(f"分数: {game.score}  等级: {game.level}  生命: {game.entities.get(game.player, 'health')}  "
+              f"敌人: {game.entities.count(ENEMY)}  子弹: {len(game.bullets)}  状态: {game.state.name}")
+
+    if args.verify:
+        mismatches = player.verify()
+        if mismatches:
+            print(f"关键帧不一致: {mismatches}")
+            return 1
+        print("所有关键帧校验通过")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
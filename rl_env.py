@@ -0,0 +1,183 @@
+"""
+坦克大战强化学习环境
+在无界面模式下用 reset()/step(动作) 驱动游戏逻辑，返回 (观测, 奖励, 是否结束, 信息)
+
+观测是按格子划分的NumPy数组 (通道, 行, 列)，每个通道一种对象（墙、玩家、敌人、子弹、道具），
+每步原地重写同一块缓冲区并返回它的只读视图，不产生逐步拷贝；需要保存历史观测时请自行copy()
+VectorTankEnv一次推进K局游戏，所有观测放在同一个 (K, 通道, 行, 列) 数组中
+
+动作：0~9的整数，个位 动作 % 5 为方向（0不动，1~4对应上、右、下、左），动作 >= 5 表示发射；
+也可以直接传入 (方向或None, 是否发射)
+"""
+import os
+
+import numpy as np
+
+# 必须在导入游戏模块之前设置，游戏模块在导入时决定是否初始化显示和音频
+os.environ['TANK_HEADLESS'] = '1'
+
+from config import BLOCK_SIZE, Direction, GameState
+from ecs import PLAYER, ENEMY, POWER_UP
+from bullet_store import PLAYER_BULLET, pixel_coords
+from wall_grid import WallGrid
+from 坦克大战 import TankGame
+
+# 观测通道
+CHANNELS = ('walls', 'player', 'enemies', 'player_bullets', 'enemy_bullets', 'power_ups')
+WALLS, PLAYER_CHANNEL, ENEMY_CHANNEL, PLAYER_BULLET_CHANNEL, ENEMY_BULLET_CHANNEL, POWER_UP_CHANNEL = range(len(CHANNELS))
+
+ACTION_COUNT = 10
+MAX_STEPS = 36000  # 每局最多步数，超过时截断
+
+# 奖励
+REWARD_PER_SCORE = 0.01  # 每消灭一个敌人（100分）奖励1
+PENALTY_PER_DAMAGE = 0.01  # 每损失1点生命值的惩罚
+PENALTY_DEATH = 1.0  # 游戏结束的惩罚
+
+
+def decode_action(action):
+    if isinstance(action, tuple):
+        return action
+    action = int(action)
+    code = action % 5
+    return (None if code == 0 else Direction(code - 1)), action >= 5
+
+
+def encode_action(direction, fire):
+    return (0 if direction is None else direction.value + 1) + (5 if fire else 0)
+
+
+class TankEnv:
+    def __init__(self, seed=None, max_steps=MAX_STEPS, frame_skip=1, out=None):
+        # out：可选的外部观测缓冲区（向量化环境用它把所有观测放在一个数组里）
+        self.game = TankGame(headless=True, seed=seed)
+        self.max_steps = max_steps
+        self.frame_skip = frame_skip
+        walls = self.game.walls
+        self.rows = walls.rows
+        self.cols = walls.cols
+        self.observation_shape = (len(CHANNELS), self.rows, self.cols)
+        if out is None:
+            out = np.zeros(self.observation_shape, dtype=np.uint8)
+        self._buffer = out
+        self.observation = out.view()
+        self.observation.flags.writeable = False
+        self.steps = 0
+        self.score = 0
+        self.health = 0
+
+    def reset(self, seed=None):
+        game = self.game
+        game.reset_game(seed)
+        self.steps = 0
+        self.score = game.score
+        self.health = self.player_health()
+        self._observe()
+        return self.observation
+
+    def player_health(self):
+        return max(0, self.game.entities.get(self.game.player, 'health'))
+
+    def step(self, action):
+        game = self.game
+        direction, fire = decode_action(action)
+        for _ in range(self.frame_skip):
+            game.tick(direction, fire)
+            fire = False  # 发射只在第一帧生效，相当于按一次发射键
+            if game.state == GameState.GAME_OVER:
+                break
+        self.steps += 1
+
+        health = self.player_health()
+        done = game.state == GameState.GAME_OVER
+        reward = (game.score - self.score) * REWARD_PER_SCORE - (self.health - health) * PENALTY_PER_DAMAGE
+        if done:
+            reward -= PENALTY_DEATH
+        self.score = game.score
+        self.health = health
+        truncated = not done and self.steps >= self.max_steps
+
+        self._observe()
+        info = {'score': game.score, 'level': game.level, 'health': health, 'ticks': game.ticks,
+                'truncated': truncated}
+        return self.observation, reward, done or truncated, info
+
+    def _cells(self, xs, ys):
+        # 对象中心所在格子在单个通道中的下标
+        cols = np.clip((xs + BLOCK_SIZE // 2) // BLOCK_SIZE, 0, self.cols - 1).astype(np.intp)
+        rows = np.clip((ys + BLOCK_SIZE // 2) // BLOCK_SIZE, 0, self.rows - 1).astype(np.intp)
+        return rows * self.cols + cols
+
+    def _observe(self):
+        # 所有对象按 (通道, 格子) 编号后用一次bincount统计每个格子中对象的数量（超过255时截断）
+        game = self.game
+        size = self.rows * self.cols
+        parts = []
+
+        entities = game.entities
+        x = entities.view('x')
+        y = entities.view('y')
+        for channel, kind in ((PLAYER_CHANNEL, PLAYER), (ENEMY_CHANNEL, ENEMY), (POWER_UP_CHANNEL, POWER_UP)):
+            slots = entities.query(kind)
+            if slots:
+                parts.append(self._cells(x[slots], y[slots]) + channel * size)
+
+        bullets = game.bullets
+        n = bullets.count
+        if n:
+            alive = bullets.alive[:n]
+            # 子弹只有4像素，按左上角所在的格子计算
+            cells = (np.clip(pixel_coords(bullets.y[:n][alive]) // BLOCK_SIZE, 0, self.rows - 1) * self.cols +
+                     np.clip(pixel_coords(bullets.x[:n][alive]) // BLOCK_SIZE, 0, self.cols - 1))
+            channels = np.where(bullets.owner[:n][alive] == PLAYER_BULLET,
+                                PLAYER_BULLET_CHANNEL * size, ENEMY_BULLET_CHANNEL * size)
+            parts.append(cells + channels)
+
+        flat = self._buffer.reshape(-1)
+        if parts:
+            counts = np.bincount(np.concatenate(parts), minlength=flat.size)
+            np.minimum(counts, 255, out=counts)
+            flat[:] = counts
+        else:
+            flat[:] = 0
+        # 墙壁通道直接取墙壁网格的类型数组（1可破坏墙，2不可破坏墙）
+        flat[:size] = np.frombuffer(game.walls.types, dtype=np.uint8)
+
+
+class VectorTankEnv:
+    def __init__(self, count, seed=None, max_steps=MAX_STEPS, frame_skip=1):
+        # 第i局游戏使用种子 seed + i（seed为None时每局随机）
+        grid = WallGrid()
+        self.count = count
+        self.observation_shape = (len(CHANNELS), grid.rows, grid.cols)
+        self._buffer = np.zeros((count,) + self.observation_shape, dtype=np.uint8)
+        self.envs = [TankEnv(seed=None if seed is None else seed + i, max_steps=max_steps,
+                             frame_skip=frame_skip, out=self._buffer[i]) for i in range(count)]
+        self.observations = self._buffer.view()
+        self.observations.flags.writeable = False
+        # 奖励和结束标志同样每步原地重写
+        self._rewards = np.zeros(count, dtype=np.float32)
+        self._dones = np.zeros(count, dtype=np.bool_)
+        self.rewards = self._rewards.view()
+        self.rewards.flags.writeable = False
+        self.dones = self._dones.view()
+        self.dones.flags.writeable = False
+
+    def reset(self):
+        for env in self.envs:
+            env.reset()
+        return self.observations
+
+    def step(self, actions):
+        # 一次推进所有游戏；结束的游戏自动开始新的一局，
+        # 结束时的观测保存在info['final_observation']中（只有结束的游戏才拷贝）
+        infos = []
+        for i, (env, action) in enumerate(zip(self.envs, actions)):
+            _, reward, done, info = env.step(action)
+            if done:
+                info['final_observation'] = env.observation.copy()
+                env.reset()
+            self._rewards[i] = reward
+            self._dones[i] = done
+            infos.append(info)
+        return self.observations, self.rewards, self.dones, infos
@@ -0,0 +1,50 @@
+"""
+坦克大战脚本化输入
+每帧返回 (方向或None, 是否发射) 的输入源，用于无界面模拟、批量模拟和联机客户端的模拟玩家；
+本模块没有导入时的副作用（不设置TANK_HEADLESS，不导入游戏模块）
+"""
+import random
+
+from config import Direction
+
+
+class IdleInput:
+    def __call__(self, game):
+        return None, False
+
+
+class RandomInput:
+    def __init__(self, seed=None, change_chance=0.05, fire_chance=0.1):
+        self.random = random.Random(seed)
+        self.change_chance = change_chance
+        self.fire_chance = fire_chance
+        self.direction = None
+
+    def __call__(self, game):
+        # 随机游走：偶尔换方向或停下，按一定几率开火
+        if self.random.random() < self.change_chance:
+            self.direction = self.random.choice([None] + list(Direction))
+        return self.direction, self.random.random() < self.fire_chance
+
+
+class SequenceInput:
+    def __init__(self, steps, loop=True):
+        # steps 为 (方向或None, 是否发射) 的列表
+        self.steps = list(steps)
+        self.loop = loop
+        self.index = 0
+
+    def __call__(self, game):
+        if self.index >= len(self.steps):
+            if not self.loop or not self.steps:
+                return None, False
+            self.index = 0
+        step = self.steps[self.index]
+        self.index += 1
+        return step
+
+
+INPUTS = {
+    'idle': IdleInput,
+    'random': RandomInput,
+}
@@ -0,0 +1,236 @@
+"""
+坦克大战联机服务器
+服务器运行权威的游戏模拟：按TICK_RATE固定步长推进，客户端通过UDP发送输入，
+服务器每帧向每个客户端发送相对它确认过的快照的差量（格式见net_protocol），客户端只负责绘制。
+所有玩家合作对抗敌人；玩家被消灭后继续观战，所有玩家都被消灭时游戏结束，几秒后自动开始新的一局
+
+用法：python server.py [--host 0.0.0.0] [--port 7777] [--seed 1] [--world 8000x6000] [--levels 关卡包]
+运行时定期输出每帧耗时和每个客户端的带宽
+"""
+import argparse
+import asyncio
+import os
+import time
+
+# 必须在导入游戏模块之前设置，服务器不创建窗口、不初始化音频
+os.environ['TANK_HEADLESS'] = '1'
+
+from config import TICK_RATE, MAX_CATCH_UP_TICKS, GameState
+from profiler import percentile
+from net_protocol import (DEFAULT_PORT, HELLO, INPUT, BYE, INPUT_MESSAGE, NO_SNAPSHOT, SNAPSHOT_HISTORY,
+                          capture_snapshot, encode_snapshot, snapshot_message, split_message)
+from replay import decode_input
+from world import parse_world_size
+from 坦克大战 import TankGame
+
+CLIENT_TIMEOUT = 5.0  # 超过该秒数没有收到客户端的消息时视为断开
+RESTART_DELAY = 3 * TICK_RATE  # 游戏结束后等待的帧数，之后自动开始新的一局
+STATS_INTERVAL = 5.0  # 输出统计信息的间隔（秒）
+
+
+class RemotePlayer:
+    def __init__(self, address, player):
+        self.address = address
+        self.player = player  # 玩家坦克的实体ID，坦克被消灭后客户端继续观战
+        self.sequence = 0  # 已经收到的最新输入序号，更旧的输入包直接丢弃
+        self.direction = None
+        self.fire = False  # 发射请求保留到下一个逻辑帧，两帧之间按下的发射键不会丢失
+        self.fire_sequence = 0  # 已经处理的最新发射序号，客户端重发的同一次发射只处理一次
+        self.ack = None  # 客户端确认收到的最新快照编号
+        self.last_seen = time.monotonic()
+        self.bytes_sent = 0  # 本统计周期内发送的字节数
+        self.full_snapshots = 0  # 本统计周期内发送的完整快照数
+
+
+class ServerProtocol(asyncio.DatagramProtocol):
+    def __init__(self, server):
+        self.server = server
+
+    def connection_made(self, transport):
+        self.server.transport = transport
+
+    def datagram_received(self, data, address):
+        self.server.receive(data, address)
+
+
+class GameServer:
+    def __init__(self, seed=None, world_size=None, level_pack=None, tick_rate=TICK_RATE):
+        self.game = TankGame(headless=True, seed=seed, world_size=world_size)
+        if level_pack is not None:
+            self.game.use_level_pack(level_pack)
+        self.tick_rate = tick_rate
+        self.transport = None
+        self.clients = {}  # 地址 -> RemotePlayer，按加入顺序排列
+        self.frame = 0  # 快照编号，跨局递增
+        self.history = {}  # 快照编号 -> Snapshot，最近SNAPSHOT_HISTORY帧
+        self.restart_timer = 0
+        self.tick_times = []  # 本统计周期内每帧的耗时（秒）
+
+    # 消息处理
+    def receive(self, data, address):
+        if not data:
+            return
+        kind = data[0]
+        client = self.clients.get(address)
+        if kind == HELLO:
+            if client is None:
+                self.join(address)
+            return
+        if client is None:
+            return
+        client.last_seen = time.monotonic()
+        if kind == INPUT and len(data) >= INPUT_MESSAGE.size:
+            _, sequence, ack, code, fire_sequence = INPUT_MESSAGE.unpack_from(data)
+            if ack != NO_SNAPSHOT and (client.ack is None or ack > client.ack):
+                client.ack = ack
+            if sequence > client.sequence:
+                client.sequence = sequence
+                client.direction, fire = decode_input(code)
+                if fire and fire_sequence > client.fire_sequence:
+                    client.fire_sequence = fire_sequence
+                    client.fire = True
+        elif kind == BYE:
+            self.leave(address)
+
+    def join(self, address):
+        game = self.game
+        if not self.clients:
+            # 第一名玩家加入时开始新的一局
+            game.reset_game()
+            self.restart_timer = 0
+            player = game.player
+        else:
+            player = game.add_player()
+        self.clients[address] = RemotePlayer(address, player)
+        print(f"玩家加入: {address[0]}:{address[1]}（共{len(self.clients)}人）")
+
+    def leave(self, address):
+        client = self.clients.pop(address, None)
+        if client is None:
+            return
+        # 最后一名存活的玩家离开时保留坦克，由敌人结束这一局（没有客户端时服务器不推进游戏）
+        if client.player in self.game.players and len(self.game.players) > 1:
+            self.game.remove_player(client.player)
+        print(f"玩家离开: {address[0]}:{address[1]}（共{len(self.clients)}人）")
+
+    def restart(self):
+        # 开始新的一局，已连接的客户端按加入顺序重新分配坦克
+        game = self.game
+        game.reset_game()
+        self.restart_timer = 0
+        for n, client in enumerate(self.clients.values()):
+            client.player = game.player if n == 0 else game.add_player()
+
+    # 模拟
+    def step(self):
+        start = time.perf_counter()
+        game = self.game
+        if self.clients:
+            if game.state == GameState.GAME_OVER:
+                self.restart_timer += 1
+                if self.restart_timer >= RESTART_DELAY:
+                    self.restart()
+            inputs = {}
+            for client in self.clients.values():
+                inputs[client.player] = (client.direction, client.fire)
+                client.fire = False
+            direction, fire = inputs.pop(game.player, (None, False))
+            game.tick(direction, fire, others=inputs)
+        self.frame += 1
+        self.broadcast()
+        self.tick_times.append(time.perf_counter() - start)
+
+    def broadcast(self):
+        # 生成本帧的快照，按每个客户端确认过的快照编码差量；基准相同的客户端共用编码结果
+        if not self.clients:
+            return
+        snapshot = capture_snapshot(self.game, self.frame, self.history.get(self.frame - 1))
+        self.history[snapshot.frame] = snapshot
+        self.history.pop(snapshot.frame - SNAPSHOT_HISTORY, None)
+        encoded = {}
+        for client in self.clients.values():
+            baseline = self.history.get(client.ack) if client.ack is not None else None
+            key = None if baseline is None else baseline.frame
+            if key not in encoded:
+                encoded[key] = encode_snapshot(snapshot, baseline)
+            flags, body = encoded[key]
+            message = snapshot_message(client.player, flags, body, client.fire_sequence)
+            # 大世界的完整快照超过一个数据包的安全大小时分片发送
+            for packet in split_message(message, snapshot.frame):
+                self.transport.sendto(packet, client.address)
+                client.bytes_sent += len(packet)
+            if baseline is None:
+                client.full_snapshots += 1
+
+    def drop_idle_clients(self):
+        now = time.monotonic()
+        for address in [address for address, client in self.clients.items()
+                        if now - client.last_seen > CLIENT_TIMEOUT]:
+            print(f"客户端超时: {address[0]}:{address[1]}")
+            self.leave(address)
+
+    def report(self, elapsed):
+        # 输出本统计周期内的每帧耗时和每个客户端的带宽，然后清零
+        times = sorted(self.tick_times)
+        if times:
+            mean = sum(times) / len(times)
+            p95 = percentile(times, 0.95)
+            print(f"帧 {self.frame}  玩家 {len(self.clients)}  存活 {len(self.game.players)}  "
+                  f"每帧耗时 平均 {mean * 1000:.2f}ms  p95 {p95 * 1000:.2f}ms  最大 {times[-1] * 1000:.2f}ms  "
+                  f"({len(times) / elapsed:.1f} 帧/秒)")
+        for client in self.clients.values():
+            print(f"  {client.address[0]}:{client.address[1]}  {client.bytes_sent / elapsed / 1024:.1f} KB/s  "
+                  f"完整快照 {client.full_snapshots}")
+            client.bytes_sent = 0
+            client.full_snapshots = 0
+        self.tick_times = []
+
+    async def run(self, host, port, duration=None):
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.create_datagram_endpoint(lambda: ServerProtocol(self), local_addr=(host, port))
+        print(f"服务器已启动: {host}:{port}")
+        tick_time = 1.0 / self.tick_rate
+        next_tick = stats_start = loop.time()
+        end = None if duration is None else next_tick + duration
+        try:
+            while end is None or loop.time() < end:
+                self.step()
+                next_tick += tick_time
+                now = loop.time()
+                # 落后太多时丢弃剩余的时间，游戏暂时变慢而不是越追越慢
+                if now - next_tick > MAX_CATCH_UP_TICKS * tick_time:
+                    next_tick = now
+                if now - stats_start >= STATS_INTERVAL:
+                    self.drop_idle_clients()
+                    self.report(now - stats_start)
+                    stats_start = now
+                await asyncio.sleep(max(0.0, next_tick - now))
+        finally:
+            transport.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='坦克大战联机服务器')
+    parser.add_argument('--host', default='0.0.0.0', help='监听地址')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='监听端口（UDP）')
+    parser.add_argument('--seed', type=int, default=None, help='随机数种子')
+    parser.add_argument('--world', metavar='WxH', type=parse_world_size, default=None,
+                        help='世界大小（像素），例如8000x6000，默认与窗口相同')
+    parser.add_argument('--levels', metavar='FILE', default=None, help='使用关卡包中设计好的关卡代替随机地图')
+    parser.add_argument('--duration', type=float, default=None, help='运行指定秒数后退出（用于测试）')
+    args = parser.parse_args(argv)
+
+    level_pack = None
+    if args.levels:
+        from level_pack import LevelPack
+        level_pack = LevelPack(args.levels)
+    server = GameServer(args.seed, args.world, level_pack)
+    try:
+        asyncio.run(server.run(args.host, args.port, args.duration))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,91 @@
+"""
+坦克大战音效队列
+游戏逻辑中的音效请求先放入队列，每个逻辑帧结束时统一播放：
+同一帧内以及最近几帧内已经播放过的同名音效合并为一次，
+播放使用固定数量的混音通道，通道用完时抢占正在播放的优先级最低（同优先级时最早开始）的音效，
+正在播放的音效都比新音效重要时丢弃新音效
+"""
+import pygame
+
+SOUND_CHANNELS = 8  # 混音通道数量
+SOUND_MERGE_TICKS = 4  # 同名音效在这么多逻辑帧内只播放一次
+SOUND_PRIORITIES = {  # 数值越大越重要
+    'hit': 0,
+    'shoot': 1,
+    'explosion': 2,
+    'power_up': 3,
+    'level_up': 4,
+    'game_over': 5,
+}
+
+
+class SoundQueue:
+    def __init__(self, assets, channels=SOUND_CHANNELS, merge_ticks=SOUND_MERGE_TICKS):
+        self.assets = assets
+        self.channel_count = channels
+        self.merge_ticks = merge_ticks
+        self.pending = {}  # 音效名 -> 本帧请求次数
+        self.last_played = {}  # 音效名 -> 上次播放的逻辑帧
+        self.channels = None  # 第一次播放时创建通道
+        self.voices = []  # 每个通道正在播放的 (优先级, 开始的逻辑帧)
+        self.requested = 0
+        self.played = 0
+        self.merged = 0  # 与其他请求合并而没有单独播放的次数
+        self.dropped = 0  # 没有可抢占的通道而丢弃的次数
+        self.stolen = 0  # 抢占正在播放的音效的次数
+
+    def request(self, name):
+        # 音效没有加载（无界面模式、后台加载还未完成或文件不存在）时直接忽略
+        if name not in self.assets.sounds:
+            return
+        self.requested += 1
+        self.pending[name] = self.pending.get(name, 0) + 1
+
+    def flush(self, tick):
+        # 每个逻辑帧结束时调用，重要的音效先分配通道
+        if not self.pending:
+            return
+        for name in sorted(self.pending, key=lambda name: -SOUND_PRIORITIES.get(name, 0)):
+            count = self.pending[name]
+            last = self.last_played.get(name)
+            # 重新开始游戏或回放跳转后帧数会变小，这时不合并
+            if last is not None and 0 <= tick - last < self.merge_ticks:
+                self.merged += count
+                continue
+            self.merged += count - 1
+            if self._play(name, tick):
+                self.last_played[name] = tick
+        self.pending.clear()
+
+    def _play(self, name, tick):
+        if self.channels is None:
+            pygame.mixer.set_num_channels(self.channel_count)
+            self.channels = [pygame.mixer.Channel(i) for i in range(self.channel_count)]
+            self.voices = [None] * self.channel_count
+        priority = SOUND_PRIORITIES.get(name, 0)
+        for index, channel in enumerate(self.channels):
+            if not channel.get_busy():
+                break
+        else:
+            index = min(range(self.channel_count), key=self.voices.__getitem__)
+            if self.voices[index][0] > priority:
+                self.dropped += 1
+                return False
+            self.stolen += 1
+        try:
+            # 通道上正在播放的音效会被停止
+            self.channels[index].play(self.assets.sounds[name])
+        except Exception:
+            return False  # 忽略播放失败的情况
+        self.voices[index] = (priority, tick)
+        self.played += 1
+        return True
+
+    def stats(self):
+        return {
+            'requested': self.requested,
+            'played': self.played,
+            'merged': self.merged,
+            'dropped': self.dropped,
+            'stolen': self.stolen,
+        }
@@ -0,0 +1,246 @@
+"""
+坦克大战出生点索引
+维护每个生成区域中所有空闲格子（没有墙、没有坦克和道具占用）的集合，
+墙被摧毁、坦克或道具进入或离开格子时增量更新；
+生成敌人和道具时只需随机取一个下标（O(1)），没有空位时返回None，不再反复随机尝试
+
+空闲格子按地图区块分组保存，可以只在玩家附近的活动区块中选择
+
+集合的顺序会影响随机选择的结果，因此保存在录像关键帧中（capture/restore）
+"""
+import struct
+from array import array
+
+import numpy as np
+
+from ecs import PLAYER, ENEMY, POWER_UP
+from wall_grid import EMPTY
+
+BLOCKING_KINDS = (PLAYER, ENEMY, POWER_UP)  # 占用格子的实体类型
+COUNT = struct.Struct('<I')
+
+
+class FreeCells:
+    # 可以按下标随机取样的格子集合：格子保存在数组中，删除时用最后一个格子填补空位（O(1)）
+    def __init__(self, position, cells=()):
+        self.cells = []
+        # 格子在数组中的位置，不在集合中时为-1；互不相交的多个集合可以共用同一个列表
+        self.position = position
+        for cell in cells:
+            self.add(cell)
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __contains__(self, cell):
+        return self.position[cell] >= 0
+
+    def add(self, cell):
+        if self.position[cell] < 0:
+            self.position[cell] = len(self.cells)
+            self.cells.append(cell)
+
+    def discard(self, cell):
+        index = self.position[cell]
+        if index < 0:
+            return
+        last = self.cells.pop()
+        if last != cell:
+            self.cells[index] = last
+            self.position[last] = index
+        self.position[cell] = -1
+
+    def choice(self, rng):
+        if not self.cells:
+            return None
+        return self.cells[rng.randrange(len(self.cells))]
+
+
+class SpawnIndex:
+    def __init__(self, regions, entities, world):
+        # regions: 区域名 -> (起始列, 起始行, 结束列, 结束行)，结束值不包含
+        self.regions = regions
+        self.entities = entities
+        self.world = world
+        entities.add_listener(self._entity_changed)
+        self.grid = None
+        self.blockers = []  # 每个格子被墙、坦克和道具占用的次数
+        self.walled = bytearray()  # 每个格子上次更新时是否有墙
+        self.ranges = {}  # 占用格子的实体槽位 -> 它覆盖的格子范围
+        self.cell_regions = []  # 每个格子所属区域的空闲集合
+        self.free = {}  # 区域名 -> {区块编号: FreeCells}，区块按编号从小到大排列
+        self.suspended = False  # 为True时忽略墙和实体的变化（整体恢复快照期间，由restore统一重建）
+
+    def attach(self, grid):
+        # 绑定墙壁网格，网格对象更换时整体重建
+        if grid is self.grid:
+            return
+        self.grid = grid
+        grid.add_listener(self._wall_changed)
+        self.rebuild()
+
+    def rebuild(self):
+        # 按当前的墙和实体重新统计占用次数，每个区块中的空闲格子按行优先的顺序排列
+        grid = self.grid
+        world = self.world
+        cols = grid.cols
+        size = cols * grid.rows
+        self.walled = bytearray(kind != EMPTY for kind in grid.types)
+        self.blockers = list(self.walled)
+        self.cell_regions = [[] for _ in range(size)]
+        self.free = {}
+        self.ranges = {}
+        entities = self.entities
+        for kind in BLOCKING_KINDS:
+            for i in entities.query(kind):
+                self.ranges[i] = cell_range = grid.cell_range(entities.rects[i])
+                self._occupy(cell_range, 1)
+
+        for name, (col0, row0, col1, row1) in self.regions.items():
+            position = [-1] * size
+            chunks = {}
+            for row in range(row0, row1):
+                for col in range(col0, col1):
+                    chunk = world.chunk_of(col, row)
+                    free = chunks.get(chunk)
+                    if free is None:
+                        free = chunks[chunk] = FreeCells(position)
+                    cell = row * cols + col
+                    if not self.blockers[cell]:
+                        free.add(cell)
+                    self.cell_regions[cell].append(free)
+            self.free[name] = {chunk: chunks[chunk] for chunk in sorted(chunks)}
+
+    def _occupy(self, cell_range, delta):
+        col0, row0, col1, row1 = cell_range
+        cols = self.grid.cols
+        blockers = self.blockers
+        for row in range(row0, row1):
+            for cell in range(row * cols + col0, row * cols + col1):
+                blockers[cell] += delta
+                if delta > 0 and blockers[cell] == 1:
+                    for free in self.cell_regions[cell]:
+                        free.discard(cell)
+                elif delta < 0 and blockers[cell] == 0:
+                    for free in self.cell_regions[cell]:
+                        free.add(cell)
+
+    def _wall_changed(self, col, row):
+        if self.suspended:
+            return
+        if col is None:
+            self.rebuild()
+            return
+        cell = row * self.grid.cols + col
+        walled = self.grid.types[cell] != EMPTY
+        if walled != self.walled[cell]:
+            self.walled[cell] = walled
+            self._occupy((col, row, col + 1, row + 1), 1 if walled else -1)
+
+    def _entity_changed(self, i):
+        # 实体创建、移动或删除后调用，只在覆盖的格子范围变化时更新
+        if self.grid is None or self.suspended:
+            return
+        if i is None:
+            self.rebuild()
+            return
+        entities = self.entities
+        old = self.ranges.get(i)
+        new = None
+        if entities.kind[i] in BLOCKING_KINDS:
+            # 坦克每帧都会移动，先在原范围内快速判断，范围不变时直接返回
+            rect = entities.rects[i]
+            size = self.grid.cell_size
+            if old is not None and old == (rect.x // size, rect.y // size,
+                                           (rect.right - 1) // size + 1, (rect.bottom - 1) // size + 1):
+                return
+            new = self.grid.cell_range(rect)
+        if new == old:
+            return
+        if old is not None:
+            self._occupy(old, -1)
+            del self.ranges[i]
+        if new is not None:
+            self._occupy(new, 1)
+            self.ranges[i] = new
+
+    def is_free(self, col, row):
+        grid = self.grid
+        return grid.in_bounds(col, row) and not self.blockers[row * grid.cols + col]
+
+    def choice(self, region, rng, chunks=None):
+        # 在区域中随机选一个空闲格子 (列, 行)，chunks为候选区块编号（None表示整个区域），没有空位时返回None
+        free = self.free[region]
+        if chunks is None:
+            candidates = list(free.values())
+        else:
+            candidates = [free[chunk] for chunk in chunks if chunk in free]
+        total = sum(len(cells) for cells in candidates)
+        if not total:
+            return None
+        # 所有候选区块的空闲格子中等概率选择
+        index = rng.randrange(total)
+        for cells in candidates:
+            if index < len(cells):
+                cell = cells.cells[index]
+                return cell % self.grid.cols, cell // self.grid.cols
+            index -= len(cells)
+
+    def free_count(self, region, chunks=None):
+        free = self.free[region]
+        if chunks is None:
+            return sum(len(cells) for cells in free.values())
+        return sum(len(free[chunk]) for chunk in chunks if chunk in free)
+
+    # 快照：空闲格子集合的顺序
+    def capture(self):
+        # 打包成字节串：区块集合数量, 每个集合的格子数, 所有集合的格子（按区域和区块编号的顺序）
+        lists = [cells.cells for free in self.free.values() for cells in free.values()]
+        cells = array('I')
+        for chunk_cells in lists:
+            cells.extend(chunk_cells)
+        return COUNT.pack(len(lists)) + array('I', map(len, lists)).tobytes() + cells.tobytes()
+
+    def restore(self, data):
+        # 在墙壁网格和实体整体恢复之后调用（恢复期间把suspended设为True，不逐个处理变化），
+        # 按恢复后的墙和实体重新统计占用次数，空闲格子集合按保存的顺序恢复
+        grid = self.grid
+        entities = self.entities
+        walled = np.frombuffer(grid.types, dtype=np.uint8) != EMPTY
+        self.walled = bytearray(walled.tobytes())
+        # 实体覆盖的格子范围按与cell_range相同的方式批量计算，占用次数用二维差分数组累加
+        slots = [i for kind in BLOCKING_KINDS for i in entities.query(kind)]
+        rects = np.array([tuple(entities.rects[i]) for i in slots], dtype=np.int64).reshape(-1, 4)
+        size = grid.cell_size
+        col0 = np.maximum(rects[:, 0] // size, 0)
+        row0 = np.maximum(rects[:, 1] // size, 0)
+        col1 = np.minimum((rects[:, 0] + rects[:, 2] - 1) // size + 1, grid.cols)
+        row1 = np.minimum((rects[:, 1] + rects[:, 3] - 1) // size + 1, grid.rows)
+        cell_ranges = np.stack([col0, row0, col1, row1], axis=1)
+        cell_ranges[(rects[:, 2] <= 0) | (rects[:, 3] <= 0)] = 0
+        self.ranges = dict(zip(slots, map(tuple, cell_ranges.tolist())))
+        width = grid.cols + 1
+        length = (grid.rows + 1) * width
+        diff = (np.bincount(row0 * width + col0, minlength=length) - np.bincount(row0 * width + col1, minlength=length)
+                - np.bincount(row1 * width + col0, minlength=length) + np.bincount(row1 * width + col1, minlength=length))
+        diff = diff.reshape(grid.rows + 1, width)
+        occupied = diff.cumsum(axis=0).cumsum(axis=1)[:grid.rows, :grid.cols]
+        self.blockers = (walled + occupied.ravel()).tolist()
+
+        count, = COUNT.unpack_from(data)
+        sizes = np.frombuffer(data, dtype=np.uint32, count=count, offset=COUNT.size)
+        cells = np.frombuffer(data, dtype=np.uint32, offset=COUNT.size + sizes.nbytes)
+        offsets = [0] + np.cumsum(sizes).tolist()
+        k = 0
+        for free in self.free.values():
+            if not free:
+                continue
+            # 同一区域的集合共用一个位置列表，按保存的格子重新计算后原地替换
+            shared = next(iter(free.values())).position
+            position = np.full(len(self.blockers), -1, dtype=np.int64)
+            for free_cells in free.values():
+                chunk_cells = cells[offsets[k]:offsets[k + 1]]
+                k += 1
+                position[chunk_cells] = np.arange(len(chunk_cells))
+                free_cells.cells = chunk_cells.tolist()
+            shared[:] = position.tolist()
@@ -0,0 +1,160 @@
+"""
+坦克大战精灵图集
+启动时把每种 (颜色, 方向, 生命值条, 护盾) 的坦克、子弹、道具和每一帧爆炸预先绘制到一张图集上，
+之后每个实体每帧只需要一次blit，所有实体的blit合并为一次Surface.blits调用
+"""
+import pygame
+
+from config import *
+
+COLORKEY = (255, 0, 255)  # 透明色（游戏中不使用的洋红色）
+ATLAS_WIDTH = 1024
+
+TANK_PADDING = 5  # 炮管和生命值条伸出坦克主体的距离
+TANK_SPRITE_SIZE = BLOCK_SIZE + 2 * TANK_PADDING
+TANK_COLORS = (GREEN, RED)  # 启动时预先绘制的坦克颜色
+
+
+def draw_tank(surface, x, y, width, height, color, direction, health_width, shielded):
+    # 绘制坦克主体
+    pygame.draw.rect(surface, color, (x, y, width, height))
+
+    # 绘制坦克炮管
+    if direction == Direction.UP:
+        pygame.draw.rect(surface, color, (x + width // 2 - 2, y - 5, 4, 5))
+    elif direction == Direction.RIGHT:
+        pygame.draw.rect(surface, color, (x + width, y + height // 2 - 2, 5, 4))
+    elif direction == Direction.DOWN:
+        pygame.draw.rect(surface, color, (x + width // 2 - 2, y + height, 4, 5))
+    elif direction == Direction.LEFT:
+        pygame.draw.rect(surface, color, (x - 5, y + height // 2 - 2, 5, 4))
+
+    # 绘制生命值条
+    pygame.draw.rect(surface, RED, (x, y - 5, width, 3))
+    pygame.draw.rect(surface, GREEN, (x, y - 5, health_width, 3))
+
+    # 如果有护盾，绘制护盾效果
+    if shielded:
+        pygame.draw.rect(surface, BLUE, (x - 2, y - 2, width + 4, height + 4), 2)  # 绘制蓝色边框表示护盾
+
+
+def draw_power_up(surface, x, y, width, height, power_type):
+    if power_type == "health":
+        # 绘制生命值恢复道具
+        pygame.draw.rect(surface, GREEN, (x, y, width, height))
+        pygame.draw.rect(surface, RED, (x + 5, y + 5, width - 10, height - 10))
+    elif power_type == "speed":
+        # 绘制速度提升道具
+        pygame.draw.rect(surface, BLUE, (x, y, width, height))
+        pygame.draw.rect(surface, WHITE, (x + 5, y + 5, width - 10, height - 10))
+    elif power_type == "shield":
+        # 绘制护盾道具
+        pygame.draw.rect(surface, YELLOW, (x, y, width, height))
+        pygame.draw.circle(surface, BLUE, (x + width // 2, y + height // 2), width // 3)
+
+
+def draw_explosion(surface, x, y, frame, lifetime):
+    # 简单的爆炸动画
+    size = int(BLOCK_SIZE * (1 - frame / lifetime))
+    offset = (BLOCK_SIZE - size) // 2
+    pygame.draw.rect(surface, RED, (x + offset, y + offset, size, size))
+
+
+class SpriteAtlas:
+    def __init__(self):
+        self.areas = {}  # 精灵键 -> 图集中的区域
+        self.surface = None
+        self.extra = {}  # 启动后才出现的精灵（例如新颜色的坦克），单独保存
+        sprites = self._build_all()
+        self._pack(sprites)
+
+    def _new_sprite(self, width, height):
+        sprite = pygame.Surface((width, height))
+        sprite.fill(COLORKEY)
+        return sprite
+
+    def _tank_sprite(self, color, direction, health_width, shielded):
+        sprite = self._new_sprite(TANK_SPRITE_SIZE, TANK_SPRITE_SIZE)
+        draw_tank(sprite, TANK_PADDING, TANK_PADDING, BLOCK_SIZE, BLOCK_SIZE,
+                  color, Direction(direction), health_width, shielded)
+        return sprite
+
+    def _build_all(self):
+        sprites = {}
+        for color in TANK_COLORS:
+            for direction in range(len(Direction)):
+                for health_width in range(BLOCK_SIZE + 1):
+                    for shielded in (False, True):
+                        key = ('tank', color, direction, health_width, shielded)
+                        sprites[key] = self._tank_sprite(color, direction, health_width, shielded)
+        for is_player_bullet, color in ((True, YELLOW), (False, RED)):
+            sprite = pygame.Surface((BULLET_SIZE, BULLET_SIZE))
+            sprite.fill(color)
+            sprites[('bullet', is_player_bullet)] = sprite
+        for power_type in POWER_UP_TYPES:
+            sprite = self._new_sprite(BLOCK_SIZE, BLOCK_SIZE)
+            draw_power_up(sprite, 0, 0, BLOCK_SIZE, BLOCK_SIZE, power_type)
+            sprites[('power_up', power_type)] = sprite
+        for frame in range(EXPLOSION_LIFETIME + 1):
+            sprite = self._new_sprite(BLOCK_SIZE, BLOCK_SIZE)
+            draw_explosion(sprite, 0, 0, frame, EXPLOSION_LIFETIME)
+            sprites[('explosion', frame)] = sprite
+        return sprites
+
+    def _pack(self, sprites):
+        # 按行排列（同一行的精灵依次向右放置，放不下时换行）
+        x = y = row_height = 0
+        positions = {}
+        for key, sprite in sorted(sprites.items(), key=lambda item: -item[1].get_height()):
+            width, height = sprite.get_size()
+            if x + width > ATLAS_WIDTH:
+                x = 0
+                y += row_height
+                row_height = 0
+            positions[key] = (x, y)
+            x += width
+            row_height = max(row_height, height)
+        self.surface = self._new_sprite(ATLAS_WIDTH, y + row_height)
+        for key, sprite in sprites.items():
+            x, y = positions[key]
+            self.surface.blit(sprite, (x, y))
+            self.areas[key] = pygame.Rect((x, y), sprite.get_size())
+        self.surface = self._optimize(self.surface)
+
+    def _optimize(self, surface):
+        # 转换为显示格式并设置透明色，加快blit速度
+        # 不使用RLEACCEL：RLE编码的Surface按源区域blit时每次都要从头跳过编码数据，反而慢十几倍
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert()
+        surface.set_colorkey(COLORKEY)
+        return surface
+
+    def _lookup(self, key, build):
+        area = self.areas.get(key)
+        if area is not None:
+            return self.surface, area
+        sprite = self.extra.get(key)
+        if sprite is None:
+            sprite = self.extra[key] = self._optimize(build())
+        return sprite, sprite.get_rect()
+
+    # 以下方法返回可直接放入Surface.blits列表的 (源Surface, 目标位置, 源区域)
+    def tank(self, x, y, color, direction, health, shielded):
+        # x和y为坦克主体左上角，direction为Direction的值
+        health_width = max(0, min(BLOCK_SIZE, (BLOCK_SIZE * health) // 100))
+        key = ('tank', color, direction, health_width, shielded)
+        source, area = self._lookup(key, lambda: self._tank_sprite(color, direction, health_width, shielded))
+        return source, (x - TANK_PADDING, y - TANK_PADDING), area
+
+    def bullet(self, x, y, is_player_bullet):
+        return self.surface, (x, y), self.areas[('bullet', is_player_bullet)]
+
+    def power_up(self, x, y, power_type):
+        return self.surface, (x, y), self.areas[('power_up', power_type)]
+
+    def explosion(self, x, y, frame, lifetime):
+        frame = max(0, min(frame, lifetime))
+        if lifetime != EXPLOSION_LIFETIME:
+            # 非默认时长的爆炸按比例映射到预先绘制的帧
+            frame = frame * EXPLOSION_LIFETIME // lifetime
+        return self.surface, (int(x), int(y)), self.areas[('explosion', frame)]
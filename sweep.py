@@ -0,0 +1,59 @@
+"""
+坦克大战扫掠碰撞
+坦克沿坐标轴移动时，检查从当前位置到目标位置扫过的整个区域，返回第一次接触前能移动的距离，
+速度再快也不会穿过墙或其他坦克，被挡住时正好停在接触位置
+所有坐标和距离都是整数像素，距离的符号与移动方向相同
+"""
+
+
+def sweep_walls(grid, rect, dx, dy):
+    # 矩形沿(dx, dy)移动（只有一个不为0）时在墙壁网格中的可移动距离，返回 (距离, 碰到的格子或None)
+    size = grid.cell_size
+    if dx:
+        across = range(rect.top // size, (rect.bottom - 1) // size + 1)
+        if dx > 0:
+            cells = range(rect.right // size, (rect.right + dx - 1) // size + 1)
+        else:
+            cells = range((rect.left - 1) // size, (rect.left + dx) // size - 1, -1)
+    elif dy:
+        across = range(rect.left // size, (rect.right - 1) // size + 1)
+        if dy > 0:
+            cells = range(rect.bottom // size, (rect.bottom + dy - 1) // size + 1)
+        else:
+            cells = range((rect.top - 1) // size, (rect.top + dy) // size - 1, -1)
+    else:
+        return 0, None
+
+    for cell in cells:
+        for other in across:
+            col, row = (cell, other) if dx else (other, cell)
+            if grid.get(col, row):
+                if dx > 0:
+                    return col * size - rect.right, (col, row)
+                if dx < 0:
+                    return (col + 1) * size - rect.left, (col, row)
+                if dy > 0:
+                    return row * size - rect.bottom, (col, row)
+                return (row + 1) * size - rect.top, (col, row)
+    return dx or dy, None
+
+
+def sweep_rects(rect, dx, dy, rects):
+    # 矩形沿(dx, dy)移动时在其他矩形之间的可移动距离，返回 (距离, 最先碰到的矩形下标或None)
+    # 已经与矩形重叠的其他矩形不阻挡移动，重叠的坦克可以分开
+    distance = dx or dy
+    hit = None
+    for j, other in enumerate(rects):
+        if dx:
+            if not (other.top < rect.bottom and rect.top < other.bottom):
+                continue
+            gap = other.left - rect.right if dx > 0 else other.right - rect.left
+        else:
+            if not (other.left < rect.right and rect.left < other.right):
+                continue
+            gap = other.top - rect.bottom if dy > 0 else other.bottom - rect.top
+        # gap与移动方向相同且不超过移动距离时会接触
+        if distance > 0 and 0 <= gap < distance or distance < 0 and distance < gap <= 0:
+            distance = gap
+            hit = j
+    return distance, hit
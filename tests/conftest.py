@@ -0,0 +1,24 @@
+"""
+测试配置：项目根目录加入导入路径，pygame使用虚拟的显示和音频驱动，不创建真正的窗口；
+字体缓存写到每个测试自己的临时目录，不写入用户主目录
+"""
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+# 在导入assets之前设置，模块级的资源管理器不会使用 ~/.cache
+os.environ['TANK_FONT_CACHE'] = ''
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True)
+def font_cache(tmp_path, monkeypatch):
+    from assets import assets
+    path = str(tmp_path / 'fonts.json')
+    monkeypatch.setattr(assets, 'font_cache_path', path)
+    monkeypatch.setattr(assets, 'font_paths', None)
+    return path
@@ -0,0 +1,68 @@
+"""
+资源管理测试：字体缓存文件的位置、无界面模式不使用磁盘缓存、退出时停止后台音频线程
+"""
+import json
+import os
+
+import pygame
+
+from assets import AssetManager, default_font_cache_path
+
+
+def test_cache_path_env_override(monkeypatch, tmp_path):
+    path = str(tmp_path / 'custom.json')
+    monkeypatch.setenv('TANK_FONT_CACHE', path)
+    monkeypatch.setenv('TANK_HEADLESS', '1')
+    assert default_font_cache_path() == path
+    monkeypatch.setenv('TANK_FONT_CACHE', '')
+    assert default_font_cache_path() is None
+
+
+def test_cache_path_xdg(monkeypatch, tmp_path):
+    monkeypatch.delenv('TANK_FONT_CACHE', raising=False)
+    monkeypatch.delenv('TANK_HEADLESS', raising=False)
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path))
+    assert default_font_cache_path() == os.path.join(str(tmp_path), 'tank_battle', 'fonts.json')
+
+
+def test_headless_skips_disk_cache(monkeypatch, tmp_path):
+    monkeypatch.delenv('TANK_FONT_CACHE', raising=False)
+    monkeypatch.setenv('TANK_HEADLESS', '1')
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path))
+    manager = AssetManager()
+    assert manager.font_cache_path is None
+    pygame.font.init()
+    manager.font('simhei', 20)
+    assert os.listdir(tmp_path) == []
+
+
+def test_font_cache_written_and_reused(tmp_path):
+    path = str(tmp_path / 'sub' / 'fonts.json')
+    pygame.font.init()
+    manager = AssetManager(font_cache_path=path)
+    font = manager.font('simhei', 20)
+    assert manager.font('simhei', 20) is font
+    with open(path, encoding='utf-8') as f:
+        cached = json.load(f)
+    # 第二个管理器直接使用缓存中的路径，不再查找系统字体
+    other = AssetManager(font_cache_path=path)
+    assert other.font_path('simhei', False) == manager.font_path('simhei', False)
+    assert other.font_paths == manager.font_paths
+    assert cached
+
+
+def test_stop_audio_joins_loader():
+    manager = AssetManager(font_cache_path='', sound_dir='no-such-dir')
+    manager.start_audio()
+    manager.stop_audio()
+    assert not manager.loader.is_alive()
+    assert manager.loaded.is_set()
+
+
+def test_stop_before_load_skips_mixer():
+    manager = AssetManager(font_cache_path='', sound_dir='no-such-dir')
+    manager.stopping.set()
+    manager.start_audio()
+    manager.stop_audio()
+    assert not manager.audio_enabled
+    assert manager.sounds == {}
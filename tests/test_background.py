@@ -0,0 +1,72 @@
+"""
+静态背景层：只重绘变化格子的背景与整体重绘的结果逐像素相同，视野移动时按区块拼出相同的画面
+"""
+import random
+
+import pygame
+
+from background import BackgroundLayer
+from wall_grid import WallGrid
+
+VIEW_SIZE = (300, 240)
+
+
+def pixels(layer):
+    return pygame.image.tobytes(layer.surface, 'RGB')
+
+
+def fresh(grid, view=None, size=VIEW_SIZE):
+    layer = BackgroundLayer(size, chunk_size=4)
+    layer.attach(grid)
+    layer.refresh(view)
+    return layer
+
+
+def random_grid(rng, cols=30, rows=24, walls=200):
+    grid = WallGrid(cols, rows)
+    for _ in range(walls):
+        grid.add(rng.randrange(cols), rng.randrange(rows), rng.random() < 0.7)
+    return grid
+
+
+def test_dirty_cells_match_full_redraw():
+    rng = random.Random(1)
+    grid = random_grid(rng, cols=10, rows=8)
+    layer = fresh(grid)
+    for _ in range(40):
+        col, row = rng.randrange(grid.cols), rng.randrange(grid.rows)
+        if rng.random() < 0.5:
+            grid.remove(col, row)
+        else:
+            grid.add(col, row, True)
+        rects = layer.refresh()
+        # 删除空格子不会通知监听者，这时没有需要更新的区域
+        assert rects in ([], [pygame.Rect(col * grid.cell_size, row * grid.cell_size, grid.cell_size, grid.cell_size)])
+        assert pixels(layer) == pixels(fresh(grid))
+    # 没有变化时不需要更新屏幕
+    assert layer.refresh() == []
+
+
+def test_scrolling_view_matches_fresh_layer():
+    rng = random.Random(2)
+    grid = random_grid(rng)
+    layer = BackgroundLayer(VIEW_SIZE, chunk_size=4, cache_size=6)
+    layer.attach(grid)
+    for _ in range(30):
+        view = pygame.Rect(rng.randrange(600), rng.randrange(480), *VIEW_SIZE)
+        assert layer.refresh(view) is None
+        # 区块缓存中的墙壁也要随着变化更新
+        grid.remove(rng.randrange(grid.cols), rng.randrange(grid.rows))
+        layer.refresh(view)
+        assert pixels(layer) == pixels(fresh(grid, view))
+        assert len(layer.chunks) <= 6
+
+
+def test_grid_reload_redraws_everything():
+    rng = random.Random(3)
+    grid = random_grid(rng, cols=10, rows=8)
+    layer = fresh(grid)
+    other = random_grid(rng, cols=10, rows=8)
+    grid.load(bytes(other.types), other.health.tobytes())
+    assert layer.refresh() is None
+    assert pixels(layer) == pixels(fresh(other))
@@ -0,0 +1,39 @@
+"""
+批量模拟测试：只接受模拟时真正会读取的常量，覆盖值在模拟中生效，结束后恢复
+"""
+import pytest
+
+import config
+from batch import TUNABLES, apply_overrides, restore_overrides, run_game, validate_overrides
+from ecs import INDEX_MASK
+from 坦克大战 import TankGame
+
+
+def test_rejects_constants_baked_in_at_import():
+    for name in ('BLOCK_SIZE', 'BULLET_SIZE', 'EXPLOSION_LIFETIME', 'NO_SUCH_CONSTANT', 'Direction'):
+        with pytest.raises(ValueError):
+            validate_overrides([{name: 1}])
+    validate_overrides([{name: getattr(config, name) for name in TUNABLES}])
+
+
+def test_override_reaches_simulation():
+    saved = apply_overrides({'PLAYER_SPEED': 7, 'PLAYER_COOLDOWN': 11})
+    try:
+        game = TankGame(headless=True, seed=1)
+        game.reset_game()
+        i = game.player & INDEX_MASK
+        assert game.entities.speed[i] == 7
+        assert game.entities.cooldown_time[i] == 11
+    finally:
+        restore_overrides(saved)
+    game = TankGame(headless=True, seed=1)
+    game.reset_game()
+    assert game.entities.speed[game.player & INDEX_MASK] == config.PLAYER_SPEED
+
+
+def test_override_changes_game_result():
+    # 敌人一出生就不停开火，玩家比默认配置更早被击毁
+    default = run_game((0, {}, 3, 3000, 'idle'))
+    deadly = run_game((1, {'ENEMY_SHOOT_CHANCE': 1.0, 'BULLET_DAMAGE': 100}, 3, 3000, 'idle'))
+    assert deadly['game_over']
+    assert deadly['ticks'] < default['ticks']
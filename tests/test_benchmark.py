@@ -0,0 +1,45 @@
+"""
+基准测试：计时噪声不判为退化，明显变慢时报告；生成例程测量前后场景规模不变
+"""
+from benchmark import PHASES, Scenario, compare, summarize
+from ecs import ENEMY, POWER_UP
+
+
+def result(best_ms):
+    phases = {'update_bullets': summarize([[best_ms * 1.1, best_ms], [best_ms, best_ms * 2]])}
+    return {'results': [{'scenario': 'bullets', 'size': 100, 'phases': phases}], 'scaling': {}}
+
+
+def test_summarize_uses_the_best_repeat():
+    stats = summarize([[1.0, 2.0, 3.0], [0.5, 0.6, 9.0]])
+    assert stats['best_ms'] == 0.6
+    assert stats['median_ms'] == 1.5
+
+
+def test_compare_ignores_sub_millisecond_noise():
+    assert compare(result(0.156), result(0.122)) == []
+
+
+def test_compare_reports_slowdown():
+    regressions = compare(result(2.0), result(1.0))
+    assert len(regressions) == 1 and 'update_bullets' in regressions[0]
+
+
+def test_compare_reads_old_baselines():
+    baseline = result(1.0)
+    del baseline['results'][0]['phases']['update_bullets']['best_ms']
+    assert compare(result(1.0), baseline) == []
+
+
+def test_failed_spawn_removes_nothing():
+    # 没有空位时生成失败，测量生成例程不能删除场景中已有的敌人（场景中没有玩家子弹，敌人不会被消灭）
+    scenario = Scenario(enemies=10, bullets=0, obstacles=30, power_ups=0)
+    scenario.replenish()
+    game = scenario.game
+    game.spawn_enemies = lambda count: 0
+    game.spawn_power_up = lambda: None
+    scenario.replenish = lambda: None
+    samples = scenario.run(3)
+    assert set(samples) == set(PHASES)
+    assert game.entities.count(ENEMY) == 10
+    assert game.entities.count(POWER_UP) == 0
@@ -0,0 +1,103 @@
+"""
+宽相碰撞：网格查询和网格连接的结果与两两比较相同，子弹相撞按连续时间判断
+"""
+import random
+
+import numpy as np
+import pygame
+
+import bullet_store
+from broadphase import EntityGrid, box_pairs
+from bullet_store import BulletStore
+from config import Direction
+from ecs import EntityStore, ENEMY, PLAYER, POWER_UP, DIRECTIONS
+
+
+def random_boxes(rng, count, low=-100, high=700):
+    boxes = []
+    for _ in range(count):
+        x, y = rng.randint(low, high), rng.randint(low, high)
+        boxes.append((x, y, x + rng.randint(1, 120), y + rng.randint(1, 120)))
+    return np.array(boxes, dtype=np.int64).reshape(-1, 4)
+
+
+def test_box_pairs_matches_brute_force():
+    rng = random.Random(1)
+    for _ in range(50):
+        a = random_boxes(rng, rng.randint(0, 60))
+        b = random_boxes(rng, rng.randint(0, 60))
+        expected = [(i, j) for i in range(len(a)) for j in range(len(b))
+                    if a[i, 0] < b[j, 2] and b[j, 0] < a[i, 2] and a[i, 1] < b[j, 3] and b[j, 1] < a[i, 3]]
+        ia, ib = box_pairs(a, b)
+        assert list(zip(ia.tolist(), ib.tolist())) == expected
+
+
+def test_entity_grid_matches_brute_force():
+    rng = random.Random(2)
+    entities = EntityStore()
+    entities.world_width = entities.world_height = 1000
+    grid = EntityGrid(entities, (PLAYER, ENEMY))
+    for step in range(2000):
+        action = rng.random()
+        tanks = entities.query(ENEMY) + entities.query(PLAYER)
+        if action < 0.2 or not tanks:
+            kind = rng.choice((PLAYER, ENEMY, POWER_UP))
+            x, y = rng.randint(0, 960), rng.randint(0, 960)
+            if kind == POWER_UP:
+                entities.create_power_up(x, y, 'health')
+            else:
+                entities.create_tank(x, y, rng.choice(DIRECTIONS), rng.randint(1, 50), kind)
+        elif action < 0.3:
+            entities.remove(rng.choice(tanks))
+        else:
+            entities.move(rng.choice(tanks), rng.choice(DIRECTIONS))
+        if step % 20 == 0:
+            rect = pygame.Rect(rng.randint(-50, 1000), rng.randint(-50, 1000), rng.randint(1, 200), rng.randint(1, 200))
+            tanks = entities.query(ENEMY) + entities.query(PLAYER)
+            assert sorted(grid.query(rect)) == sorted(i for i in tanks if rect.colliderect(entities.rects[i]))
+
+    # 整体恢复后重新建立网格
+    other = EntityStore()
+    other.world_width = other.world_height = 1000
+    restored = EntityGrid(other, (PLAYER, ENEMY))
+    other.restore(entities.capture())
+    assert restored.ranges == grid.ranges
+
+
+def test_tank_hits_broadphase_matches_matrix(monkeypatch):
+    rng = random.Random(3)
+    for _ in range(100):
+        bullets = BulletStore()
+        for _ in range(rng.randint(32, 300)):
+            bullets.spawn(rng.uniform(0, 600), rng.uniform(0, 400), rng.choice(list(Direction)),
+                          rng.choice([5, 12, 40]), rng.random() < 0.5)
+        bullets.advance()
+        rects = [pygame.Rect(rng.randint(0, 600), rng.randint(0, 400), 40, 40) for _ in range(rng.randint(16, 60))]
+        for is_player_bullet in (True, False):
+            monkeypatch.setattr(bullet_store, 'BROADPHASE_MIN', 16)
+            joined = bullets.tank_hits(rects, is_player_bullet)
+            monkeypatch.setattr(bullet_store, 'BROADPHASE_MIN', 10 ** 9)
+            assert sorted(joined) == sorted(bullets.tank_hits(rects, is_player_bullet))
+
+
+def bullet_hits(*shots):
+    bullets = BulletStore()
+    for x, y, direction, is_player_bullet in shots:
+        bullets.spawn(x, y, direction, 5, is_player_bullet)
+    bullets.advance()
+    return bullets.bullet_hits()
+
+
+def test_bullet_hits():
+    # 迎面交错穿过（只比较帧末位置会漏掉）
+    assert bullet_hits((100, 100, Direction.RIGHT, True), (106, 100, Direction.LEFT, False)) == [(0, 1)]
+    # 错开一行、同向同速或同一方的子弹不相撞
+    assert bullet_hits((100, 100, Direction.RIGHT, True), (106, 104, Direction.LEFT, False)) == []
+    assert bullet_hits((100, 100, Direction.RIGHT, True), (120, 100, Direction.RIGHT, False)) == []
+    assert bullet_hits((100, 100, Direction.RIGHT, True), (106, 100, Direction.LEFT, True)) == []
+    # 十字交叉时两颗子弹必须同时经过交点
+    assert bullet_hits((100, 100, Direction.RIGHT, True), (103, 90, Direction.DOWN, False)) == []
+    assert bullet_hits((100, 100, Direction.RIGHT, True), (106, 97, Direction.DOWN, False)) == [(0, 1)]
+    # 每颗子弹只抵消先相遇的一颗
+    assert bullet_hits((100, 100, Direction.RIGHT, True), (112, 100, Direction.LEFT, False),
+                       (106, 100, Direction.LEFT, False)) == [(0, 2)]
@@ -0,0 +1,69 @@
+"""
+子弹存储：发射、移动、剔除和压缩后的数组内容与逐颗子弹的模型相同
+"""
+import random
+
+from bullet_store import BulletStore, DIRECTION_VECTORS, PLAYER_BULLET
+from config import Direction
+
+
+def contents(bullets):
+    # 编号 -> (x, y, dx, dy, 是否玩家子弹)，只包含存活的子弹
+    n = bullets.count
+    return {serial: (x, y, dx, dy, owner == PLAYER_BULLET)
+            for serial, x, y, dx, dy, owner, alive in zip(
+                bullets.serial[:n].tolist(), bullets.x[:n].tolist(), bullets.y[:n].tolist(),
+                bullets.dx[:n].tolist(), bullets.dy[:n].tolist(), bullets.owner[:n].tolist(),
+                bullets.alive[:n].tolist()) if alive}
+
+
+def test_matches_model():
+    rng = random.Random(1)
+    bullets = BulletStore(capacity=4)
+    model = {}
+    width, height = 400, 300
+    for _ in range(300):
+        for _ in range(rng.randint(0, 6)):
+            direction = rng.choice(list(Direction))
+            x, y, speed, mine = rng.uniform(0, width), rng.uniform(0, height), rng.randint(1, 20), rng.random() < 0.5
+            bullets.spawn(x, y, direction, speed, mine)
+            vx, vy = DIRECTION_VECTORS[direction]
+            model[bullets.next_serial - 1] = (x, y, vx * speed, vy * speed, mine)
+        bullets.advance()
+        model = {serial: (x + dx, y + dy, dx, dy, mine) for serial, (x, y, dx, dy, mine) in model.items()}
+        live = [i for i in range(bullets.count) if bullets.alive[i]]
+        for i in rng.sample(live, len(live) // 5):
+            bullets.kill(i)
+            del model[int(bullets.serial[i])]
+        bullets.cull(width, height)
+        model = {serial: shot for serial, shot in model.items()
+                 if 0 <= shot[0] <= width and 0 <= shot[1] <= height}
+        bullets.compact()
+        # 压缩后存活的子弹连续排列在数组前部，发射顺序不变
+        assert bullets.alive[:bullets.count].all()
+        assert bullets.serial[:bullets.count].tolist() == sorted(model)
+        assert contents(bullets) == model
+    assert bullets.misses > 0
+    assert len(bullets) == len(model)
+
+
+def test_capture_restore():
+    rng = random.Random(2)
+    bullets = BulletStore()
+    for _ in range(600):
+        bullets.spawn(rng.uniform(0, 400), rng.uniform(0, 300), rng.choice(list(Direction)), 5, rng.random() < 0.5)
+    bullets.kill(3)
+    data = bullets.capture()
+    other = BulletStore(capacity=8)
+    other.restore(data)
+    assert contents(other) == contents(bullets)
+    assert other.next_serial == bullets.next_serial
+    assert other.capture() == data
+
+
+def test_clear():
+    bullets = BulletStore()
+    bullets.spawn(10, 10, Direction.UP, 5, True)
+    bullets.clear()
+    assert len(bullets) == 0
+    assert bullets.items() == []
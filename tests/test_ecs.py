@@ -0,0 +1,75 @@
+"""
+实体存储：槽位复用后旧的实体ID失效，查询按创建顺序，快照恢复后与原来的存储相同
+"""
+import random
+
+from config import Direction
+from ecs import ENEMY, EXPLOSION, INDEX_MASK, PLAYER, POWER_UP, EntityStore
+
+
+def test_generation_invalidates_old_ids():
+    entities = EntityStore(capacity=2)
+    first = entities.create_tank(0, 0, Direction.UP, 2)
+    slot = entities.index(first)
+    entities.destroy(first)
+    assert entities.index(first) is None
+
+    # 同一槽位被新实体复用，旧ID仍然无效
+    second = entities.create_explosion(5, 5)
+    assert second & INDEX_MASK == slot
+    assert second != first
+    assert entities.index(first) is None
+    assert entities.index(second) == slot
+    entities.destroy(first)  # 删除已失效的ID不影响新实体
+    assert entities.count(EXPLOSION) == 1
+
+
+def test_query_order_and_counts():
+    rng = random.Random(1)
+    entities = EntityStore(capacity=2)
+    alive = []
+    for _ in range(500):
+        if alive and rng.random() < 0.4:
+            eid = alive.pop(rng.randrange(len(alive)))
+            entities.destroy(eid)
+        else:
+            kind = rng.choice((PLAYER, ENEMY))
+            alive.append(entities.create_tank(rng.randint(0, 500), rng.randint(0, 500), Direction.LEFT, 2, kind))
+        for kind in (PLAYER, ENEMY):
+            expected = [entities.index(eid) for eid in alive if entities.kind[entities.index(eid)] == kind]
+            assert entities.query(kind) == expected
+            assert entities.count(kind) == len(expected)
+
+
+def test_listeners():
+    entities = EntityStore()
+    calls = []
+    entities.add_listener(calls.append)
+    eid = entities.create_power_up(10, 20, 'shield')
+    i = entities.index(eid)
+    entities.set_position(i, 30, 40)
+    entities.remove(i)
+    entities.restore(entities.capture())
+    assert calls == [i, i, i, None]
+
+
+def test_capture_restore():
+    rng = random.Random(2)
+    entities = EntityStore()
+    ids = [entities.create_tank(rng.randint(0, 500), rng.randint(0, 500), Direction.DOWN, 3) for _ in range(40)]
+    ids += [entities.create_power_up(rng.randint(0, 500), rng.randint(0, 500), 'health') for _ in range(5)]
+    for eid in ids[::3]:
+        entities.destroy(eid)
+    entities.create_explosion(1, 2)
+    data = entities.capture()
+
+    other = EntityStore(capacity=4)
+    other.restore(data)
+    assert other.capture() == data
+    for kind in (ENEMY, POWER_UP, EXPLOSION):
+        assert other.query(kind) == entities.query(kind)
+    for eid in ids:
+        assert other.index(eid) == entities.index(eid)
+        if entities.index(eid) is not None:
+            i = entities.index(eid)
+            assert other.rects[i] == entities.rects[i]
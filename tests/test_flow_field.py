@@ -0,0 +1,57 @@
+"""
+流场寻路：摧毁墙后的局部更新与整体重算得到相同的步数和方向，搜索范围外的格子无法到达
+"""
+import random
+
+from flow_field import UNREACHABLE, FlowField
+from wall_grid import WallGrid
+
+
+def random_grid(rng, cols=25, rows=19, walls=160):
+    grid = WallGrid(cols, rows)
+    for _ in range(walls):
+        grid.add(rng.randrange(cols), rng.randrange(rows), rng.random() < 0.7)
+    return grid
+
+
+def rebuilt(grid, root, bounds=None):
+    flow = FlowField()
+    flow.attach(grid)
+    flow.update(*root, bounds=bounds)
+    return flow
+
+
+def test_incremental_update_matches_rebuild():
+    rng = random.Random(4)
+    grid = random_grid(rng)
+    root = (12, 9)
+    grid.remove(*root)
+    flow = rebuilt(grid, root)
+    bricks = [(i % grid.cols, i // grid.cols) for i, kind in enumerate(grid.types) if kind]
+    rng.shuffle(bricks)
+    for col, row in bricks[:60]:
+        grid.remove(col, row)
+        flow.update(*root)
+        full = rebuilt(grid, root)
+        assert flow.distance == full.distance
+        for cell in range(grid.cols * grid.rows):
+            col, row = cell % grid.cols, cell // grid.cols
+            assert flow.direction_at(col, row) == full.direction_at(col, row)
+    assert flow.rebuilds == 1 and flow.patches == 60
+
+
+def test_bounds_limit_the_search():
+    grid = WallGrid(20, 20)
+    flow = rebuilt(grid, (5, 5), bounds=(0, 0, 10, 10))
+    assert flow.distance_at(9, 9) == 8
+    assert flow.distance_at(10, 5) == UNREACHABLE
+    assert flow.direction_at(6, 5) is not None
+    assert flow.direction_at(15, 15) is None
+
+
+def test_several_roots_use_nearest_player():
+    grid = WallGrid(20, 1)
+    flow = FlowField()
+    flow.attach(grid)
+    flow.update(0, 0, others=((19, 0),))
+    assert [flow.distance_at(col, 0) for col in (0, 5, 10, 14, 19)] == [0, 5, 9, 5, 0]
@@ -0,0 +1,99 @@
+"""
+游戏主循环的冒烟测试：从菜单启动，与直接运行 python 坦克大战.py 相同；逻辑帧按固定时间步长推进
+"""
+from types import SimpleNamespace
+
+import pygame
+import pytest
+
+import 坦克大战
+from config import MAX_CATCH_UP_TICKS, TICK_RATE, GameState
+from replay import ReplayPlayer, ReplayRecorder
+from 坦克大战 import TankGame
+
+
+class StopLoop(Exception):
+    pass
+
+
+def run_frames(game, keys, frames):
+    # 运行game.run()的主循环，第n帧按下keys[n]，运行frames帧后停止
+    count = 0
+    handle_events = game.handle_events
+
+    def scripted_events():
+        nonlocal count
+        count += 1
+        if count > frames:
+            raise StopLoop
+        if count in keys:
+            pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=keys[count], mod=0, unicode='', scancode=0))
+        handle_events()
+
+    game.handle_events = scripted_events
+    with pytest.raises(StopLoop):
+        game.run()
+
+
+@pytest.fixture
+def windowed_game():
+    pygame.display.init()
+    pygame.font.init()
+    return TankGame(headless=False, seed=1)
+
+
+def test_run_from_menu(windowed_game):
+    # 停留在菜单时主循环也会推进逻辑帧，这时还没有玩家
+    run_frames(windowed_game, {}, 5)
+    assert windowed_game.state == GameState.MENU
+    assert windowed_game.ticks > 0
+
+
+def test_start_pause_and_resume_from_menu(windowed_game):
+    game = windowed_game
+    run_frames(game, {5: pygame.K_SPACE, 20: pygame.K_p, 25: pygame.K_p}, 40)
+    assert game.state in (GameState.PLAYING, GameState.GAME_OVER)
+    assert game.player is not None
+    assert game.ticks > 0
+
+
+def test_record_from_menu(windowed_game):
+    # 附加了录像记录器时菜单中的逻辑帧不录制，开始游戏后录制的录像可以完整校验
+    game = windowed_game
+    game.recorder = ReplayRecorder(keyframe_interval=10)
+    run_frames(game, {5: pygame.K_SPACE}, 40)
+    replay = game.recorder.replay
+    assert len(replay) == game.ticks > 0
+    assert len(replay.keyframes) > 1
+    assert ReplayPlayer(replay).verify() == []
+
+
+def test_tick_before_reset():
+    # 菜单中还没有玩家时推进逻辑帧
+    game = TankGame(headless=True, seed=1)
+    game.tick()
+    assert game.state == GameState.MENU
+
+
+def test_fixed_timestep_catch_up(windowed_game, monkeypatch):
+    # 每个渲染帧按经过的时间推进逻辑帧，不足一帧的时间留到下一帧，落后太多时只补MAX_CATCH_UP_TICKS帧
+    game = windowed_game
+    game.reset_game()
+    elapsed_ticks = [2.5, 0.6, 100, 0.95, 0.1]  # 每个渲染帧经过的时间（以逻辑帧为单位）
+    times = [0.0]
+    for elapsed in elapsed_ticks:
+        times.append(times[-1] + elapsed / TICK_RATE)
+
+    def perf_counter():
+        if not times:
+            raise StopLoop
+        return times.pop(0)
+
+    monkeypatch.setattr(坦克大战, 'time', SimpleNamespace(perf_counter=perf_counter))
+    game.clock = SimpleNamespace(tick=lambda fps: 0, get_fps=lambda: 0.0)
+    ticks = []
+    game.handle_events = lambda: ticks.append(game.ticks)
+    with pytest.raises(StopLoop):
+        game.run()
+    ticks.append(game.ticks)
+    assert [b - a for a, b in zip(ticks, ticks[1:])] == [2, 1, MAX_CATCH_UP_TICKS, 0, 1]
@@ -0,0 +1,75 @@
+"""
+游戏状态快照：保存后原地恢复得到相同的状态，恢复后继续模拟与原来的游戏完全一致
+"""
+import pytest
+
+from game_state import StateError, load_state, save_state
+from scripted_input import RandomInput
+from 坦克大战 import TankGame
+
+WORLD = (1600, 1200)
+
+
+def play(game, ticks, input_source):
+    for _ in range(ticks):
+        direction, fire = input_source(game)
+        game.tick(direction, fire)
+
+
+def started_game(seed=3, players=2):
+    game = TankGame(headless=True, seed=seed, world_size=WORLD)
+    game.reset_game()
+    for _ in range(players - 1):
+        game.add_player()
+    return game
+
+
+def test_round_trip():
+    game = started_game()
+    play(game, 400, RandomInput(1))
+    data = save_state(game)
+    other = TankGame(headless=True, seed=99, world_size=WORLD)
+    other.reset_game()
+    load_state(other, data)
+    assert save_state(other) == data
+
+
+def test_restore_into_the_same_game():
+    game = started_game()
+    play(game, 300, RandomInput(1))
+    data = save_state(game)
+    play(game, 300, RandomInput(2))
+    assert save_state(game) != data
+    load_state(game, data)
+    assert save_state(game) == data
+
+
+def test_continuation_is_deterministic():
+    game = started_game()
+    play(game, 300, RandomInput(1))
+    data = save_state(game)
+    play(game, 500, RandomInput(2))
+    expected = save_state(game)
+
+    other = TankGame(headless=True, world_size=WORLD)
+    other.reset_game()
+    load_state(other, data)
+    play(other, 500, RandomInput(2))
+    assert save_state(other) == expected
+
+
+def test_world_size_mismatch():
+    data = save_state(started_game())
+    other = TankGame(headless=True, world_size=(800, 600))
+    other.reset_game()
+    with pytest.raises(StateError):
+        load_state(other, data)
+
+
+def test_damaged_data():
+    game = started_game()
+    data = save_state(game)
+    with pytest.raises(StateError):
+        load_state(game, data[:-1])
+    with pytest.raises(StateError):
+        load_state(game, b'XXXX' + data[4:])
@@ -0,0 +1,29 @@
+"""
+无界面模拟：同一种子的结果完全相同，游戏结束时停止或自动重新开始，脚本化输入按顺序重复
+"""
+from config import Direction
+from headless import run_headless
+from scripted_input import IdleInput, RandomInput, SequenceInput
+
+RESULT_KEYS = ('ticks', 'games', 'score', 'level', 'game_over', 'pools')
+
+
+def test_same_seed_same_result():
+    first = run_headless(2000, RandomInput(7), seed=7)
+    second = run_headless(2000, RandomInput(7), seed=7)
+    assert [first[key] for key in RESULT_KEYS] == [second[key] for key in RESULT_KEYS]
+
+
+def test_stops_or_restarts_on_game_over():
+    stopped = run_headless(3000, IdleInput(), seed=3)
+    assert stopped['game_over'] and stopped['ticks'] < 3000 and stopped['games'] == 1
+    restarted = run_headless(3000, IdleInput(), restart_on_game_over=True, seed=3)
+    assert restarted['ticks'] == 3000 and restarted['games'] > 1
+
+
+def test_sequence_input():
+    steps = [(Direction.UP, False), (None, True)]
+    looping = SequenceInput(steps)
+    assert [looping(None) for _ in range(5)] == steps * 2 + steps[:1]
+    once = SequenceInput(steps, loop=False)
+    assert [once(None) for _ in range(3)] == steps + [(None, False)]
@@ -0,0 +1,85 @@
+"""
+关卡包：文本关卡写入关卡包后按索引读回的内容不变，损坏的文件和尺寸不符的关卡被拒绝
+"""
+import pytest
+
+from level_pack import ENEMY_SPAWN, PLAYER_SPAWN, Level, LevelPack, LevelPackError, parse_text, write_pack
+from wall_grid import BRICK, EMPTY, STEEL, WallGrid
+from 坦克大战 import TankGame
+
+TEXT = '''\
+; 两个小关卡
+name: 第一关
+enemies: 3
+E..#
+.@@.
+...P
+---
+name: 第二关
+##..
+E..P
+'''
+
+
+def full_level(name, cols, rows):
+    return Level(name, cols, rows, bytes([BRICK]) * (cols * rows), [(PLAYER_SPAWN, cols // 2, rows - 1)])
+
+
+def test_round_trip(tmp_path):
+    levels = parse_text(TEXT)
+    assert [level.name for level in levels] == ['第一关', '第二关']
+    first = levels[0]
+    assert (first.cols, first.rows, first.enemies) == (4, 3, 3)
+    assert first.tiles[3] == BRICK and first.tiles[5] == STEEL and first.tiles[0] == EMPTY
+    assert first.player_spawn == (3, 2) and first.enemy_spawns == [(0, 0)]
+
+    path = tmp_path / 'levels.tklv'
+    write_pack(path, levels)
+    with LevelPack(path) as pack:
+        assert len(pack) == 2
+        # 倒序读取：每一关按索引直接定位
+        for n in reversed(range(len(pack))):
+            level = pack.level(n)
+            assert (level.name, level.cols, level.rows, level.tiles, level.spawns, level.enemies) == (
+                levels[n].name, levels[n].cols, levels[n].rows, levels[n].tiles,
+                [tuple(spawn) for spawn in levels[n].spawns], levels[n].enemies)
+        with pytest.raises(IndexError):
+            pack.level(2)
+
+
+def test_rejects_bad_input(tmp_path):
+    with pytest.raises(LevelPackError):
+        parse_text('..#\n.#\n')
+    with pytest.raises(LevelPackError):
+        parse_text('..x\n')
+    with pytest.raises(LevelPackError):
+        Level('坏', 3, 3, bytes(8))
+    path = tmp_path / 'bad.tklv'
+    path.write_bytes(b'NOPE' + bytes(10))
+    with pytest.raises(LevelPackError):
+        LevelPack(path)
+
+
+def test_rejects_level_of_wrong_size(tmp_path):
+    grid = WallGrid()
+    path = tmp_path / 'levels.tklv'
+    write_pack(path, [full_level('合适', grid.cols, grid.rows), full_level('太小', grid.cols - 1, grid.rows)])
+    game = TankGame(headless=True, seed=1)
+    with LevelPack(path) as pack:
+        with pytest.raises(ValueError, match='太小'):
+            game.use_level_pack(pack)
+    assert game.level_pack is None
+
+
+def test_game_loads_level_tiles(tmp_path):
+    grid = WallGrid()
+    path = tmp_path / 'levels.tklv'
+    tiles = bytes([STEEL]) + bytes(grid.cols * grid.rows - 1)
+    level = Level('空地', grid.cols, grid.rows, tiles, [(PLAYER_SPAWN, 2, 2), (ENEMY_SPAWN, 5, 1)], enemies=1)
+    write_pack(path, [level])
+    game = TankGame(headless=True, seed=1)
+    with LevelPack(path) as pack:
+        game.use_level_pack(pack)
+        game.reset_game()
+        assert bytes(game.walls.types) == level.tiles
+        assert len(game.walls) == 1
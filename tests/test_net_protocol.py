@@ -0,0 +1,165 @@
+"""
+联机协议：差量快照按任意已确认的基准编码后，客户端还原出与服务器相同的快照；大消息分片后能重新拼回；
+丢失的输入包不会丢掉发射请求，重发的发射请求只处理一次
+"""
+import random
+
+from config import GameState
+from net_protocol import (MAX_DATAGRAM, FragmentBuffer, capture_snapshot, decode_snapshot, encode_snapshot,
+                          snapshot_message, split_message)
+from bullet_store import pixel_coords
+from client import NetClient
+from server import GameServer
+from scripted_input import RandomInput
+from 坦克大战 import TankGame
+
+
+def same_snapshot(a, b):
+    return (a.frame == b.frame and a.info == b.info and a.entities == b.entities and a.walls == b.walls
+            and a.bullets.keys() == b.bullets.keys())
+
+
+def test_delta_round_trip():
+    game = TankGame(headless=True, seed=3)
+    game.reset_game()
+    players = [game.player] + [game.add_player() for _ in range(3)]
+    inputs = {eid: RandomInput(n) for n, eid in enumerate(players)}
+    rng = random.Random(1)
+    history = {}
+    received = {}
+    previous = None
+    for frame in range(1, 1500):
+        if game.state == GameState.GAME_OVER:
+            break
+        commands = {eid: inputs[eid](game) for eid in game.players}
+        direction, fire = commands.pop(game.player, (None, False))
+        game.tick(direction, fire, others=commands)
+        snapshot = previous = history[frame] = capture_snapshot(game, frame, previous)
+
+        # 基准为客户端最近收到的某个快照，偶尔没有基准（完整快照）
+        baseline = None
+        if received and rng.random() < 0.95:
+            baseline = history[rng.choice(sorted(received)[-5:])]
+        flags, body = encode_snapshot(snapshot, baseline)
+        result = decode_snapshot(snapshot_message(7, flags, body, frame), received)
+        assert result is not None
+        player, fire_ack, _, decoded = result
+        assert player == 7 and fire_ack == frame
+        assert same_snapshot(decoded, snapshot)
+        received[frame] = decoded
+
+        # 客户端按快照编号推算的子弹位置与服务器相同
+        bullets = game.bullets
+        alive = bullets.alive[:bullets.count]
+        expected = sorted(zip(pixel_coords(bullets.x[:bullets.count][alive]).tolist(),
+                              pixel_coords(bullets.y[:bullets.count][alive]).tolist()))
+        assert sorted((x, y) for x, y, _ in decoded.bullet_positions()) == expected
+    assert frame > 500
+
+
+def test_missing_baseline():
+    game = TankGame(headless=True, seed=3)
+    game.reset_game()
+    first = capture_snapshot(game, 1)
+    game.tick()
+    second = capture_snapshot(game, 2, first)
+    flags, body = encode_snapshot(second, first)
+    assert decode_snapshot(snapshot_message(0, flags, body), {}) is None
+
+
+def test_fragments():
+    game = TankGame(headless=True, seed=3, world_size=(8000, 6000))
+    game.reset_game()
+    snapshot = capture_snapshot(game, 5)
+    message = snapshot_message(0, *encode_snapshot(snapshot))
+    packets = split_message(message, snapshot.frame)
+    assert len(packets) > 1
+    assert max(map(len, packets)) <= MAX_DATAGRAM
+
+    # 乱序到达也能拼回，收齐之前返回None
+    random.Random(2).shuffle(packets)
+    buffer = FragmentBuffer()
+    results = [buffer.add(packet) for packet in packets]
+    assert results[:-1] == [None] * (len(packets) - 1)
+    assert results[-1] == message
+    _, _, _, decoded = decode_snapshot(results[-1], {})
+    assert same_snapshot(decoded, snapshot)
+
+    # 丢失一个分片时整个快照作废
+    buffer = FragmentBuffer()
+    assert all(buffer.add(packet) is None for packet in packets[1:])
+
+
+def test_small_message_is_not_split():
+    message = b'\x03' + bytes(MAX_DATAGRAM - 1)
+    assert split_message(message, 1) == [message]
+
+
+class Link:
+    # 代替UDP套接字，记录发出的数据包，由测试决定送达还是丢弃
+    def __init__(self):
+        self.packets = []
+
+    def sendto(self, data, address=None):
+        self.packets.append(data)
+
+    def take(self):
+        packets, self.packets = self.packets, []
+        return packets
+
+
+def test_fire_survives_lost_input():
+    server = GameServer(seed=1)
+    server.transport = to_client = Link()
+    client = NetClient()
+    client.transport = to_server = Link()
+    address = ('127.0.0.1', 5000)
+    client.hello()
+    for packet in to_server.take():
+        server.receive(packet, address)
+    remote = server.clients[address]
+    # 记录服务器处理的发射请求（冷却中的请求也算，这样重复处理能被发现）
+    shots = []
+    player_shoot = server.game.player_shoot
+
+    def counted_shoot():
+        shots.append(server.frame)
+        return player_shoot()
+
+    server.game.player_shoot = counted_shoot
+
+    # 带发射位的输入包丢失，下一个输入包仍然带着发射请求
+    client.send_input(None, True)
+    to_server.take()
+    client.send_input(None, False)
+    packets = to_server.take()
+    for packet in packets + packets:
+        server.receive(packet, address)
+    assert remote.fire
+    server.step()
+    assert len(shots) == 1
+
+    # 确认还没有到达客户端，之后的输入包继续带着同一个发射请求，服务器不再重复处理
+    client.send_input(None, False)
+    for packet in to_server.take():
+        server.receive(packet, address)
+    server.step()
+    assert len(shots) == 1
+
+    # 服务器在快照中确认后客户端不再重发
+    for packet in to_client.take():
+        client.datagram_received(packet, address)
+    assert client.fire_sequence == 0
+    client.send_input(None, False)
+    for packet in to_server.take():
+        server.receive(packet, address)
+    assert not remote.fire
+    server.step()
+    assert len(shots) == 1
+
+    # 再次按下发射键是新的发射请求
+    client.send_input(None, True)
+    for packet in to_server.take():
+        server.receive(packet, address)
+    server.step()
+    assert len(shots) == 2
@@ -0,0 +1,39 @@
+"""
+对象池：稳定运行时实体槽位和子弹数组只复用、不扩容；复用的槽位不残留上一个实体的组件
+"""
+from config import Direction, GameState
+from ecs import EXPLOSION, POWER_UP, EntityStore
+from scripted_input import RandomInput
+from 坦克大战 import TankGame
+
+
+def test_steady_state_does_not_grow():
+    game = TankGame(headless=True, seed=4)
+    game.reset_game()
+    input_source = RandomInput(4)
+    for _ in range(6000):
+        if game.state == GameState.GAME_OVER:
+            game.reset_game()
+        game.tick(*input_source(game))
+    stats = game.pool_stats()
+    assert stats['entities']['hits'] > 0 and stats['bullets']['hits'] > 0
+    assert stats['entities']['misses'] == 0 and stats['bullets']['misses'] == 0
+
+
+def test_reused_slot_starts_clean():
+    # 只有一个槽位：三个实体依次复用同一个槽位，预先分配的容量足够时不扩容
+    entities = EntityStore(capacity=1)
+    tank = entities.create_tank(10, 10, Direction.LEFT, 3)
+    i = entities.index(tank)
+    entities.shield[i] = 50
+    entities.cooldown[i] = 9
+    entities.destroy(tank)
+    power_up = entities.create_power_up(20, 20, 'shield')
+    assert entities.index(power_up) == i
+    assert (entities.shield[i], entities.cooldown[i], entities.speed[i]) == (0, 0, 0)
+    assert entities.lifetime[i] > 0 and entities.visible[i]
+    entities.destroy(power_up)
+    explosion = entities.create_explosion(5, 5)
+    assert entities.index(explosion) == i and entities.visible[i] == 0
+    assert entities.count(POWER_UP) == 0 and entities.count(EXPLOSION) == 1
+    assert entities.stats() == {'hits': 3, 'misses': 0, 'free': 0}
@@ -0,0 +1,57 @@
+"""
+帧性能分析器：关闭时不计时，开启后各阶段按帧累计，跟踪文件是合法的trace_event JSON
+"""
+import json
+
+from profiler import NULL_SECTION, FrameProfiler, percentile
+from 坦克大战 import TankGame
+
+
+def test_disabled_profiler_records_nothing():
+    profiler = FrameProfiler()
+    assert profiler.section('update_bullets') is NULL_SECTION
+    profiler.begin_frame()
+    profiler.end_frame({'敌人': 3})
+    assert profiler.stats()['frames'] == 0
+
+
+def test_sections_accumulate_per_frame():
+    profiler = FrameProfiler(history=3)
+    profiler.toggle_overlay()
+    for frame in range(5):
+        profiler.begin_frame()
+        # 同一阶段在一帧内多次进入时耗时累加为一个样本
+        profiler.record('update_enemies', 0, 1000)
+        profiler.record('update_enemies', 0, 2000)
+        profiler.end_frame()
+    stats = profiler.stats()
+    assert stats['frames'] == 3
+    assert list(profiler.section_times['update_enemies']) == [3000] * 3
+    assert stats['sections']['update_enemies'] == (0.003, 0.003)
+    profiler.toggle_overlay()
+    assert not profiler.enabled and profiler.stats()['frames'] == 0
+
+
+def test_percentile():
+    values = list(range(100))
+    assert percentile(values, 0.5) == 50
+    assert percentile(values, 0.99) == 99
+    assert percentile([], 0.5) == 0.0
+
+
+def test_trace_from_game_ticks(tmp_path):
+    game = TankGame(headless=True, seed=1)
+    game.reset_game()
+    game.profiler.start_trace()
+    for _ in range(10):
+        game.profiler.begin_frame()
+        game.tick()
+        game.profiler.end_frame({'敌人': 1})
+    path = tmp_path / 'trace.json'
+    game.profiler.save_trace(path)
+    with open(path, encoding='utf-8') as f:
+        events = json.load(f)['traceEvents']
+    frames = [event for event in events if event['name'] == 'frame']
+    assert len(frames) == 10
+    assert {'update_enemies', 'update_bullets'} <= {event['name'] for event in events if event.get('tid') == 1}
+    assert all(event['dur'] >= 0 for event in events if event['ph'] == 'X')
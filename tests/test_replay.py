@@ -0,0 +1,64 @@
+"""
+录像：输入编码、文件格式往返，以及按关键帧校验和跳转
+"""
+import pytest
+
+from config import Direction
+from game_state import save_state
+from headless import run_headless
+from replay import (Replay, ReplayError, ReplayPlayer, ReplayRecorder, decode_input, encode_input,
+                    rle_decode, rle_encode)
+from scripted_input import RandomInput
+from 坦克大战 import TankGame
+
+
+def record(ticks=900, seed=5, keyframe_interval=200):
+    recorder = ReplayRecorder(keyframe_interval=keyframe_interval)
+    run_headless(ticks, RandomInput(seed), restart_on_game_over=False, seed=seed, recorder=recorder)
+    return recorder.replay
+
+
+def test_input_round_trip():
+    for direction in [None] + list(Direction):
+        for fire in (False, True):
+            assert decode_input(encode_input(direction, fire)) == (direction, fire)
+
+
+def test_rle_round_trip():
+    data = bytearray([0] * 300 + [5, 5, 1] + [7] * 256)
+    assert rle_decode(rle_encode(data)) == data
+
+
+def test_file_round_trip():
+    replay = record()
+    loaded = Replay.from_bytes(replay.to_bytes())
+    assert loaded.seed == replay.seed
+    assert loaded.inputs == replay.inputs
+    assert loaded.keyframes == replay.keyframes
+    assert loaded.keyframe_interval == replay.keyframe_interval
+
+
+def test_bad_file():
+    with pytest.raises(ReplayError):
+        Replay.from_bytes(b'XXXX' + bytes(40))
+    data = bytearray(record(100).to_bytes())
+    data[4] ^= 0xFF  # 版本号
+    with pytest.raises(ReplayError):
+        Replay.from_bytes(bytes(data))
+
+
+def test_verify():
+    replay = Replay.from_bytes(record().to_bytes())
+    assert len(replay.keyframes) > 1
+    assert ReplayPlayer(replay).verify() == []
+
+
+def test_seek_matches_linear_playback():
+    replay = record()
+    linear = ReplayPlayer(replay)
+    linear.fast_forward(650)
+    player = ReplayPlayer(replay, TankGame(headless=True, world_size=replay.world_size()))
+    player.seek(len(replay))
+    player.seek(650)
+    assert player.position == 650
+    assert save_state(player.game) == save_state(linear.game)
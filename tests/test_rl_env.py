@@ -0,0 +1,55 @@
+"""
+强化学习环境：动作编码可逆，观测原地更新且只读、内容与游戏状态一致，向量化环境与逐个运行的环境结果相同
+"""
+import numpy as np
+import pytest
+
+from config import Direction
+from ecs import ENEMY
+from rl_env import (ACTION_COUNT, ENEMY_CHANNEL, PLAYER_CHANNEL, WALLS, TankEnv, VectorTankEnv, decode_action,
+                    encode_action)
+
+
+def test_action_codes_round_trip():
+    for action in range(ACTION_COUNT):
+        assert encode_action(*decode_action(action)) == action
+    assert decode_action(7) == (Direction.RIGHT, True)
+    assert decode_action((None, True)) == (None, True)
+
+
+def test_observation_is_updated_in_place():
+    env = TankEnv(seed=1)
+    observation = env.reset()
+    assert not observation.flags.writeable
+    with pytest.raises(ValueError):
+        observation[0, 0, 0] = 1
+    for _ in range(50):
+        same, reward, done, info = env.step(6)
+        assert same is observation
+    game = env.game
+    assert np.array_equal(observation[WALLS].ravel(), np.frombuffer(game.walls.types, dtype=np.uint8))
+    assert observation[PLAYER_CHANNEL].sum() == 1
+    assert observation[ENEMY_CHANNEL].sum() == game.entities.count(ENEMY)
+    assert info['ticks'] == game.ticks
+
+
+def test_vector_env_matches_single_envs():
+    actions = [np.random.default_rng(n).integers(ACTION_COUNT, size=300) for n in range(3)]
+    vector = VectorTankEnv(3, seed=10, max_steps=120)
+    vector.reset()
+    singles = [TankEnv(seed=10 + n, max_steps=120) for n in range(3)]
+    for env in singles:
+        env.reset()
+    finished = 0
+    for t in range(300):
+        observations, rewards, dones, infos = vector.step([actions[n][t] for n in range(3)])
+        for n, env in enumerate(singles):
+            observation, reward, done, info = env.step(actions[n][t])
+            if done:
+                assert np.array_equal(infos[n]['final_observation'], observation)
+                env.reset()
+            assert np.array_equal(observations[n], env.observation)
+            assert (rewards[n], dones[n]) == (np.float32(reward), done)
+            finished += done
+    # 每局最多120步，300步内每个环境至少结束并自动重新开始过两次
+    assert finished >= 6
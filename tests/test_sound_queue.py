@@ -0,0 +1,68 @@
+"""
+音效队列：同名音效在合并窗口内只播放一次，通道用完时抢占不重要的音效，更重要的音效不会被打断
+"""
+from types import SimpleNamespace
+
+from sound_queue import SoundQueue
+
+
+class FakeChannel:
+    # 代替pygame.mixer.Channel，播放后一直处于忙碌状态
+    def __init__(self):
+        self.busy = False
+        self.sound = None
+
+    def get_busy(self):
+        return self.busy
+
+    def play(self, sound):
+        self.busy = True
+        self.sound = sound
+
+
+def make_queue(channels=2, merge_ticks=4):
+    names = ('hit', 'shoot', 'explosion', 'game_over')
+    queue = SoundQueue(SimpleNamespace(sounds={name: name for name in names}), channels, merge_ticks)
+    queue.channels = [FakeChannel() for _ in range(channels)]
+    queue.voices = [None] * channels
+    return queue
+
+
+def test_requests_merge_within_window():
+    queue = make_queue(channels=8)
+    for _ in range(3):
+        queue.request('hit')
+    queue.request('missing')  # 没有加载的音效直接忽略
+    queue.flush(0)
+    queue.request('hit')
+    queue.flush(3)  # 仍在合并窗口内
+    queue.request('hit')
+    queue.flush(4)
+    assert queue.stats() == {'requested': 5, 'played': 2, 'merged': 3, 'dropped': 0, 'stolen': 0}
+    # 重新开始游戏后帧数变小，不合并
+    queue.request('hit')
+    queue.flush(0)
+    assert queue.played == 3
+
+
+def test_voice_stealing_prefers_low_priority():
+    queue = make_queue(channels=2)
+    queue.request('hit')
+    queue.request('shoot')
+    queue.flush(0)
+    assert queue.played == 2 and queue.stolen == 0
+    # 通道用完：爆炸抢占优先级最低的击中音效
+    queue.request('explosion')
+    queue.flush(1)
+    assert queue.stolen == 1
+    assert sorted(channel.sound for channel in queue.channels) == ['explosion', 'shoot']
+    # 正在播放的音效都比击中音效重要，新的击中音效被丢弃
+    queue.request('hit')
+    queue.flush(10)
+    assert queue.dropped == 1
+    # 同一帧内重要的音效先分配通道
+    queue.request('hit')
+    queue.request('game_over')
+    queue.flush(20)
+    assert 'game_over' in [channel.sound for channel in queue.channels]
+    assert queue.stats() == {'requested': 6, 'played': 4, 'merged': 0, 'dropped': 2, 'stolen': 2}
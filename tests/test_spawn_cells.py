@@ -0,0 +1,71 @@
+"""
+出生点索引：没有空位时返回None，墙壁和实体变化后空闲集合与重建结果一致，快照恢复后位置表与格子顺序对应
+"""
+import random
+
+from scripted_input import RandomInput
+from spawn_cells import SpawnIndex
+from wall_grid import WallGrid
+from 坦克大战 import TankGame
+
+
+def played_game(seed=1, ticks=400):
+    game = TankGame(headless=True, seed=seed)
+    game.reset_game()
+    input_source = RandomInput(seed)
+    for _ in range(ticks):
+        game.tick(*input_source(game))
+    return game
+
+
+def check_positions(index):
+    for free in index.free.values():
+        position = next(iter(free.values())).position
+        expected = [-1] * len(position)
+        for cells in free.values():
+            for i, cell in enumerate(cells.cells):
+                expected[cell] = i
+        assert position == expected
+
+
+def test_full_region_returns_none():
+    game = TankGame(headless=True, seed=1)
+    game.reset_game()
+    grid = WallGrid(game.walls.cols, game.walls.rows)
+    index = SpawnIndex({'corner': (0, 0, 2, 2)}, game.entities, game.world)
+    index.attach(grid)
+    rng = random.Random(0)
+    grid.add(0, 0)
+    grid.add(1, 0)
+    grid.add(0, 1)
+    assert index.choice('corner', rng) == (1, 1)
+    grid.add(1, 1, True)
+    assert index.free_count('corner') == 0
+    assert index.choice('corner', rng) is None
+    grid.hit(1, 1, 1000)
+    assert index.choice('corner', rng) == (1, 1)
+
+
+def test_incremental_updates_match_rebuild():
+    index = played_game().spawn_cells
+    incremental = {name: {chunk: sorted(cells.cells) for chunk, cells in free.items()}
+                   for name, free in index.free.items()}
+    blockers = list(index.blockers)
+    check_positions(index)
+    index.rebuild()
+    assert index.blockers == blockers
+    assert incremental == {name: {chunk: sorted(cells.cells) for chunk, cells in free.items()}
+                           for name, free in index.free.items()}
+
+
+def test_restore_rebuilds_position_map():
+    index = played_game().spawn_cells
+    data = index.capture()
+    order = {name: {chunk: list(cells.cells) for chunk, cells in free.items()} for name, free in index.free.items()}
+    # 重建后格子按行优先排列，与保存的顺序不同；恢复后顺序和位置表都回到保存时的状态
+    index.rebuild()
+    index.restore(data)
+    assert order == {name: {chunk: list(cells.cells) for chunk, cells in free.items()}
+                     for name, free in index.free.items()}
+    check_positions(index)
+    assert index.capture() == data
@@ -0,0 +1,58 @@
+"""
+精灵图集：从图集blit的坦克、道具和爆炸与直接绘制的画面逐像素相同，图集中的精灵互不重叠
+"""
+import pygame
+import pytest
+
+from config import BLACK, BLOCK_SIZE, BLUE, EXPLOSION_LIFETIME, GREEN, POWER_UP_TYPES, RED, Direction
+from sprites import SpriteAtlas, draw_explosion, draw_power_up, draw_tank
+
+TARGET_SIZE = (80, 80)
+X, Y = 20, 25
+
+
+@pytest.fixture(scope='module')
+def atlas():
+    return SpriteAtlas()
+
+
+def blitted(entry):
+    target = pygame.Surface(TARGET_SIZE)
+    target.fill(BLACK)
+    target.blits([entry], doreturn=False)
+    return pygame.image.tobytes(target, 'RGB')
+
+
+def drawn(draw, *args):
+    target = pygame.Surface(TARGET_SIZE)
+    target.fill(BLACK)
+    draw(target, X, Y, *args)
+    return pygame.image.tobytes(target, 'RGB')
+
+
+def test_tank_sprites_match_direct_drawing(atlas):
+    for color in (GREEN, RED, BLUE):  # 蓝色不在预先绘制的颜色中，第一次使用时单独绘制
+        for direction in Direction:
+            for health, shielded in ((100, False), (37, True), (0, False)):
+                health_width = BLOCK_SIZE * health // 100
+                assert blitted(atlas.tank(X, Y, color, direction.value, health, shielded)) == drawn(
+                    draw_tank, BLOCK_SIZE, BLOCK_SIZE, color, direction, health_width, shielded)
+    assert {key[1] for key in atlas.extra} == {BLUE}
+    assert len(atlas.extra) == 4 * 3
+
+
+def test_power_ups_and_explosions_match(atlas):
+    for power_type in POWER_UP_TYPES:
+        assert blitted(atlas.power_up(X, Y, power_type)) == drawn(
+            draw_power_up, BLOCK_SIZE, BLOCK_SIZE, power_type)
+    for frame in range(EXPLOSION_LIFETIME):
+        assert blitted(atlas.explosion(X, Y, frame, EXPLOSION_LIFETIME)) == drawn(
+            draw_explosion, frame, EXPLOSION_LIFETIME)
+
+
+def test_atlas_areas_do_not_overlap(atlas):
+    areas = list(atlas.areas.values())
+    bounds = atlas.surface.get_rect()
+    for n, area in enumerate(areas):
+        assert bounds.contains(area)
+        assert area.collidelist(areas[n + 1:]) == -1
@@ -0,0 +1,79 @@
+"""
+扫掠碰撞：一次算出的可移动距离与逐像素移动检查的结果相同，子弹的批量扫掠与逐颗扫掠相同
+"""
+import random
+
+import numpy as np
+import pygame
+
+import bullet_store
+from bullet_store import BulletStore
+from config import Direction
+from sweep import sweep_rects, sweep_walls
+from wall_grid import WallGrid
+
+STEPS = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+
+
+def random_grid(rng, cols=20, rows=15, walls=60):
+    grid = WallGrid(cols, rows)
+    for _ in range(walls):
+        grid.add(rng.randrange(cols), rng.randrange(rows), rng.random() < 0.5)
+    return grid
+
+
+def stepped_distance(rect, step, distance, blocked):
+    # 逐像素移动，返回碰到障碍之前移动的距离（带符号）
+    for k in range(1, distance + 1):
+        if blocked(rect.move(step[0] * k, step[1] * k)):
+            return (k - 1) * (step[0] or step[1])
+    return distance * (step[0] or step[1])
+
+
+def test_sweep_walls_matches_stepping():
+    rng = random.Random(1)
+    grid = random_grid(rng)
+    size = grid.cell_size
+    checked = 0
+    while checked < 1000:
+        rect = pygame.Rect(rng.randint(0, grid.cols * size - 40), rng.randint(0, grid.rows * size - 40), 40, 40)
+        if grid.collides(rect):
+            continue
+        step = rng.choice(STEPS)
+        distance = rng.randint(1, 200)
+        moved, _ = sweep_walls(grid, rect, step[0] * distance, step[1] * distance)
+        assert moved == stepped_distance(rect, step, distance, grid.collides)
+        checked += 1
+
+
+def test_sweep_rects_matches_stepping():
+    rng = random.Random(2)
+    for _ in range(1000):
+        rect = pygame.Rect(rng.randint(100, 300), rng.randint(100, 300), 40, 40)
+        others = [pygame.Rect(rng.randint(0, 400), rng.randint(0, 400), 40, 40) for _ in range(rng.randint(0, 8))]
+        step = rng.choice(STEPS)
+        distance = rng.randint(1, 150)
+        moved, _ = sweep_rects(rect, step[0] * distance, step[1] * distance, others)
+        # 起点已经重叠的矩形不阻挡移动
+        blockers = [other for other in others if not rect.colliderect(other)]
+        assert moved == stepped_distance(rect, step, distance, lambda r: r.collidelist(blockers) >= 0)
+
+
+def test_bullet_wall_sweep_batch_matches_scalar(monkeypatch):
+    rng = random.Random(3)
+    grid = random_grid(rng, walls=80)
+    size = grid.cell_size
+    spawns = [(rng.uniform(0, grid.cols * size), rng.uniform(0, grid.rows * size), rng.choice(list(Direction)),
+               rng.choice([5, 30, 90]), rng.random() < 0.5) for _ in range(400)]
+    results = []
+    for batch_min in (1, 10 ** 9):
+        monkeypatch.setattr(bullet_store, 'BATCH_MIN', batch_min)
+        bullets = BulletStore()
+        for spawn in spawns:
+            bullets.spawn(*spawn)
+        bullets.advance()
+        hits = bullets.wall_hits(grid)
+        results.append((sorted(hits), bullets.x[:bullets.count].copy(), bullets.y[:bullets.count].copy()))
+    (batch_hits, batch_x, batch_y), (scalar_hits, scalar_x, scalar_y) = results
+    assert batch_hits and batch_hits == scalar_hits
+    assert np.array_equal(batch_x, scalar_x) and np.array_equal(batch_y, scalar_y)
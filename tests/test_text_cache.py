@@ -0,0 +1,49 @@
+"""
+文字渲染缓存：命中时返回同一个Surface，超过容量时淘汰最久未使用的文字
+"""
+import pygame
+
+from config import WHITE, YELLOW
+from text_cache import TextCache, get_font
+
+
+class CountingFont:
+    # 记录render调用次数的字体
+    def __init__(self):
+        self.rendered = []
+
+    def render(self, text, antialias, color):
+        self.rendered.append(text)
+        return pygame.Surface((len(text) + 1, 10))
+
+
+def test_lru_eviction():
+    font = CountingFont()
+    cache = TextCache(maxsize=2)
+    a = cache.render(font, 'a', WHITE)
+    cache.render(font, 'b', WHITE)
+    assert cache.render(font, 'a', WHITE) is a  # a变成最近使用的
+    cache.render(font, 'c', WHITE)  # 淘汰b
+    assert len(cache) == 2
+    assert cache.render(font, 'a', WHITE) is a
+    cache.render(font, 'b', WHITE)
+    assert font.rendered == ['a', 'b', 'c', 'b']
+    assert (cache.hits, cache.misses) == (2, 4)
+
+
+def test_color_is_part_of_key():
+    font = CountingFont()
+    cache = TextCache()
+    assert cache.render(font, '分数', WHITE) is not cache.render(font, '分数', YELLOW)
+    cache.clear()
+    assert len(cache) == 0
+    cache.render(font, '分数', WHITE)
+    assert font.rendered == ['分数', '分数', '分数']
+
+
+def test_get_font_is_shared():
+    # 同一字体和字号只创建一次
+    pygame.font.init()
+    font = get_font('simhei', 24)
+    assert get_font('simhei', 24) is font
+    assert TextCache().render(font, 'Score', WHITE).get_width() > 0
@@ -0,0 +1,131 @@
+"""
+墙壁网格：格子类型、生命值和数量随添加、击中、删除和整体替换保持一致，矩形查询与逐格检查相同
+"""
+import random
+
+import pygame
+
+from wall_grid import BRICK, EMPTY, STEEL, WALL_HEALTH, WallGrid
+
+
+def random_grid(rng, cols=23, rows=17, walls=120):
+    grid = WallGrid(cols, rows)
+    for _ in range(walls):
+        grid.add(rng.randrange(cols), rng.randrange(rows), rng.random() < 0.7)
+    return grid
+
+
+def test_add_hit_remove():
+    grid = WallGrid(10, 8)
+    grid.add(2, 3, True)
+    grid.add(4, 5, False)
+    grid.add(4, 5, False)
+    grid.add(-1, 0)  # 网格外的格子被忽略
+    assert len(grid) == 2
+    assert grid.get(2, 3) == BRICK and grid.health[3 * 10 + 2] == WALL_HEALTH
+    assert grid.get(4, 5) == STEEL
+    assert grid.get(50, 50) == EMPTY
+
+    # 不可破坏墙击中后不变，可破坏墙生命值耗尽时被清除
+    assert not grid.hit(4, 5, WALL_HEALTH)
+    assert grid.get(4, 5) == STEEL
+    assert not grid.hit(2, 3, WALL_HEALTH - 1)
+    assert grid.hit(2, 3, 1)
+    assert grid.get(2, 3) == EMPTY
+    assert len(grid) == 1
+
+    grid.remove(4, 5)
+    grid.remove(4, 5)
+    assert len(grid) == 0
+
+
+def test_listeners():
+    grid = WallGrid(10, 8)
+    changes = []
+    grid.add_listener(lambda col, row: changes.append((col, row)))
+    grid.add(1, 2, True)
+    grid.hit(1, 2, WALL_HEALTH)
+    grid.load_types(bytes(10 * 8))
+    assert changes == [(1, 2), (1, 2), (None, None)]
+
+
+def test_load_types():
+    rng = random.Random(1)
+    source = random_grid(rng)
+    grid = WallGrid(source.cols, source.rows)
+    grid.load_types(bytes(source.types))
+    assert grid.types == source.types
+    assert len(grid) == len(source)
+    for i, kind in enumerate(grid.types):
+        assert grid.health[i] == (WALL_HEALTH if kind == BRICK else 0)
+
+
+def test_load_keeps_existing_references():
+    # 恢复快照后，之前取得的数组引用和视图看到的是新内容
+    rng = random.Random(2)
+    source = random_grid(rng)
+    brick = source.types.index(BRICK)
+    source.hit(brick % source.cols, brick // source.cols, 25)
+    grid = WallGrid(source.cols, source.rows)
+    health = grid.health
+    view = memoryview(grid.health)
+    grid.load(bytes(source.types), source.health.tobytes())
+    assert grid.health is health
+    assert health == source.health
+    assert view.tolist() == source.health.tolist()
+
+
+def test_first_wall_matches_cell_scan():
+    rng = random.Random(2)
+    grid = random_grid(rng)
+    size = grid.cell_size
+    for _ in range(500):
+        rect = pygame.Rect(rng.randint(-60, grid.cols * size), rng.randint(-60, grid.rows * size),
+                           rng.randint(1, 120), rng.randint(1, 120))
+        expected = None
+        for row in range(grid.rows):
+            for col in range(grid.cols):
+                if grid.get(col, row) and rect.colliderect(pygame.Rect(col * size, row * size, size, size)):
+                    expected = (col, row)
+                    break
+            if expected is not None:
+                break
+        assert grid.first_wall(rect) == expected
+
+
+def check_masks(grid):
+    for row in range(grid.rows):
+        assert grid.row_masks[row] == sum(1 << col for col in range(grid.cols) if grid.get(col, row))
+    for col in range(grid.cols):
+        assert grid.col_masks[col] == sum(1 << row for row in range(grid.rows) if grid.get(col, row))
+
+
+def test_masks_follow_changes():
+    rng = random.Random(3)
+    grid = random_grid(rng)
+    check_masks(grid)
+    for _ in range(300):
+        col, row = rng.randrange(grid.cols), rng.randrange(grid.rows)
+        if rng.random() < 0.5:
+            grid.add(col, row, rng.random() < 0.5)
+        else:
+            grid.hit(col, row, rng.choice((25, WALL_HEALTH)))
+    check_masks(grid)
+    other = WallGrid(grid.cols, grid.rows)
+    other.load(bytes(grid.types), grid.health.tobytes())
+    check_masks(other)
+
+
+def test_row_and_column_clear_match_cell_scan():
+    rng = random.Random(4)
+    grid = random_grid(rng)
+    for _ in range(2000):
+        row, a, b = rng.randrange(grid.rows), rng.randrange(grid.cols), rng.randrange(grid.cols)
+        expected = all(not grid.get(col, row) for col in range(min(a, b) + 1, max(a, b)))
+        assert grid.row_clear(row, a, b) == expected
+        col, a, b = rng.randrange(grid.cols), rng.randrange(grid.rows), rng.randrange(grid.rows)
+        expected = all(not grid.get(col, row) for row in range(min(a, b) + 1, max(a, b)))
+        assert grid.column_clear(col, a, b) == expected
+    # 网格外的行和列没有墙
+    assert grid.row_clear(-1, 0, grid.cols - 1)
+    assert grid.column_clear(grid.cols, 0, grid.rows - 1)
@@ -0,0 +1,71 @@
+"""
+世界分块：默认大小的世界整个处于活动区域；按区块分组的出生点索引和限定范围的流场与不分块时的结果相同；
+大世界中只有玩家附近的区块处于活动状态
+"""
+import argparse
+
+import pytest
+
+from flow_field import FlowField
+from scripted_input import RandomInput
+from spawn_cells import SpawnIndex
+from world import World, parse_world_size
+from 坦克大战 import TankGame
+
+
+def free_cells(index):
+    return {name: sorted(cell for cells in free.values() for cell in cells.cells) for name, free in index.free.items()}
+
+
+def test_default_world_is_fully_active():
+    game = TankGame(headless=True, seed=1)
+    game.reset_game()
+    game.tick()
+    world = game.world
+    assert world.chunk_cols * world.chunk_rows > 1
+    assert game.active_cells == (0, 0, world.cols, world.rows)
+    assert game.active_chunks == list(range(world.chunk_cols * world.chunk_rows))
+    assert game.flow.bounds is None
+
+
+def test_chunked_world_matches_unchunked():
+    # 同一局游戏中，按区块维护的结构与只有一个区块的参照结构同步更新，结果应当相同
+    game = TankGame(headless=True, seed=2)
+    game.reset_game()
+    single = World(game.world.width, game.world.height, chunk_size=10 ** 6)
+    assert single.chunk_cols == single.chunk_rows == 1
+    reference = SpawnIndex(single.spawn_regions(), game.entities, single)
+    reference.attach(game.walls)
+    flow = FlowField()
+    flow.attach(game.walls)
+    input_source = RandomInput(2)
+    for tick in range(1500):
+        game.tick(*input_source(game))
+        if tick % 50 == 0:
+            assert free_cells(game.spawn_cells) == free_cells(reference)
+            assert game.spawn_cells.blockers == reference.blockers
+            roots = game.flow.roots
+            flow.update(*roots[0], others=roots[1:])
+            assert flow.distance == game.flow.distance
+
+
+def test_large_world_limits_active_area():
+    game = TankGame(headless=True, seed=3, world_size=(4000, 3000))
+    game.reset_game()
+    game.tick()
+    world = game.world
+    col0, row0, col1, row1 = game.active_cells
+    assert (col1 - col0) * (row1 - row0) < world.cols * world.rows
+    player = game.entities.rects[game.entities.index(game.player)]
+    assert game.active_rect.contains(player)
+    # 每个活动区块的格子都在活动的格子范围内
+    for chunk in game.active_chunks:
+        cx, cy = chunk % world.chunk_cols, chunk // world.chunk_cols
+        assert col0 <= cx * world.chunk_size < col1 and row0 <= cy * world.chunk_size < row1
+
+
+def test_parse_world_size():
+    assert parse_world_size('8000X6000') == (8000, 6000)
+    for text in ('8000', '100x100', 'axb'):
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse_world_size(text)
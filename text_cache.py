@@ -0,0 +1,43 @@
+"""
+坦克大战文字渲染缓存
+字体由资源管理器解析（字体文件路径缓存在磁盘上，启动时不再扫描系统字体列表）；
+渲染好的文字Surface按 (字体, 文字, 颜色) 缓存，超过容量时淘汰最久未使用的
+"""
+from collections import OrderedDict
+
+from assets import assets
+
+TEXT_CACHE_SIZE = 256  # 最多缓存的文字Surface数量
+
+
+def get_font(name, size, bold=False):
+    # name可以是单个字体名，也可以是按优先级排列的字体名元组
+    return assets.font(name, size, bold)
+
+
+class TextCache:
+    def __init__(self, maxsize=TEXT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.surfaces)
+
+    def render(self, font, text, color, antialias=True):
+        key = (font, text, color, antialias)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+        self.misses += 1
+        surface = font.render(text, antialias, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.maxsize:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def clear(self):
+        self.surfaces.clear()
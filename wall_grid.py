@@ -0,0 +1,177 @@
+"""
+坦克大战墙壁网格
+按BLOCK_SIZE把地图划分成格子，每个格子用紧凑数组保存墙的类型和生命值，
+碰撞检测只查询矩形覆盖的几个格子，不再遍历整个墙壁列表
+"""
+from array import array
+
+import numpy as np
+
+from config import BLOCK_SIZE, WORLD_WIDTH, WORLD_HEIGHT
+
+# 格子类型
+EMPTY = 0
+BRICK = 1  # 可破坏墙
+STEEL = 2  # 不可破坏墙
+
+WALL_HEALTH = 100  # 可破坏墙的生命值
+
+
+class WallGrid:
+    def __init__(self, cols=None, rows=None, cell_size=BLOCK_SIZE):
+        self.cell_size = cell_size
+        # 向上取整，保证网格覆盖整个世界
+        self.cols = cols if cols is not None else -(-WORLD_WIDTH // cell_size)
+        self.rows = rows if rows is not None else -(-WORLD_HEIGHT // cell_size)
+        size = self.cols * self.rows
+        self.types = bytearray(size)  # 每个格子的墙类型
+        self.health = array('h', bytes(2 * size))  # 每个格子的墙生命值
+        self.count = 0  # 墙的数量
+        # 每行、每列的墙占用位掩码（第i位表示该行第i列/该列第i行有墙），用于视线判断
+        self.row_masks = [0] * self.rows
+        self.col_masks = [0] * self.cols
+        # 墙壁变化的监听者，调用方式为 listener(列, 行)；整个网格被替换时列和行都是None
+        self.listeners = []
+
+    def __len__(self):
+        return self.count
+
+    def in_bounds(self, col, row):
+        return 0 <= col < self.cols and 0 <= row < self.rows
+
+    def cell_at(self, x, y):
+        # 像素坐标所在的格子
+        return int(x) // self.cell_size, int(y) // self.cell_size
+
+    def cell_position(self, col, row):
+        # 格子左上角的像素坐标
+        return col * self.cell_size, row * self.cell_size
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def _notify(self, col, row):
+        for listener in self.listeners:
+            listener(col, row)
+
+    def get(self, col, row):
+        # 网格外视为空地
+        if not self.in_bounds(col, row):
+            return EMPTY
+        return self.types[row * self.cols + col]
+
+    def add(self, col, row, is_breakable=False):
+        if not self.in_bounds(col, row):
+            return
+        i = row * self.cols + col
+        if self.types[i] == EMPTY:
+            self.count += 1
+            self.row_masks[row] |= 1 << col
+            self.col_masks[col] |= 1 << row
+        self.types[i] = BRICK if is_breakable else STEEL
+        self.health[i] = WALL_HEALTH if is_breakable else 0
+        self._notify(col, row)
+
+    def remove(self, col, row):
+        if not self.in_bounds(col, row):
+            return
+        i = row * self.cols + col
+        if self.types[i] != EMPTY:
+            self.types[i] = EMPTY
+            self.health[i] = 0
+            self.count -= 1
+            self.row_masks[row] &= ~(1 << col)
+            self.col_masks[col] &= ~(1 << row)
+            self._notify(col, row)
+
+    def load(self, types, health):
+        # 整体替换网格内容（原地修改数组，已有的数组视图和引用保持有效）
+        self.types[:] = types
+        loaded = array('h')
+        loaded.frombytes(health)
+        self.health[:] = loaded
+        self.count = len(self.types) - self.types.count(EMPTY)
+        # 位掩码按行和按列一次打包（位顺序与add相同，第i位对应第i列/行）
+        walled = np.frombuffer(self.types, dtype=np.uint8).reshape(self.rows, self.cols) != EMPTY
+        self.row_masks = [int.from_bytes(bits, 'little')
+                          for bits in np.packbits(walled, axis=1, bitorder='little').tolist()]
+        self.col_masks = [int.from_bytes(bits, 'little')
+                          for bits in np.packbits(walled.T, axis=1, bitorder='little').tolist()]
+        self._notify(None, None)
+
+    def load_types(self, types):
+        # 按格子类型整体替换网格内容（例如关卡包中的关卡），可破坏墙的生命值为满值
+        health = array('h', (WALL_HEALTH if kind == BRICK else 0 for kind in types))
+        self.load(types, health.tobytes())
+
+    def hit(self, col, row, damage):
+        # 击中墙壁，返回墙是否被摧毁（被摧毁的墙直接从网格中清除）
+        i = row * self.cols + col
+        if self.types[i] != BRICK:
+            return False
+        self.health[i] = max(0, self.health[i] - damage)
+        if self.health[i] <= 0:
+            self.remove(col, row)
+            return True
+        return False
+
+    def cell_range(self, rect):
+        # 矩形覆盖的格子范围 (起始列, 起始行, 结束列, 结束行)，已裁剪到网格内，结束值不包含
+        if rect.width <= 0 or rect.height <= 0:
+            return 0, 0, 0, 0
+        size = self.cell_size
+        col0 = max(rect.left // size, 0)
+        row0 = max(rect.top // size, 0)
+        col1 = min((rect.right - 1) // size + 1, self.cols)
+        row1 = min((rect.bottom - 1) // size + 1, self.rows)
+        return col0, row0, col1, row1
+
+    def cells_overlapping(self, rect):
+        # 矩形覆盖的所有格子
+        col0, row0, col1, row1 = self.cell_range(rect)
+        for row in range(row0, row1):
+            for col in range(col0, col1):
+                yield col, row
+
+    def first_wall(self, rect):
+        # 返回矩形碰到的第一个有墙的格子，没有则返回None
+        col0, row0, col1, row1 = self.cell_range(rect)
+        types = self.types
+        for row in range(row0, row1):
+            base = row * self.cols
+            for col in range(col0, col1):
+                if types[base + col]:
+                    return col, row
+        return None
+
+    def collides(self, rect):
+        return self.first_wall(rect) is not None
+
+    @staticmethod
+    def _span_clear(mask, a, b):
+        # 位掩码中a和b之间（不含两端）是否没有墙
+        if a > b:
+            a, b = b, a
+        if b - a <= 1:
+            return True
+        return not mask & ((1 << b) - (1 << (a + 1)))
+
+    def row_clear(self, row, col0, col1):
+        # 同一行中两列之间是否没有墙
+        if not 0 <= row < self.rows:
+            return True
+        return self._span_clear(self.row_masks[row], col0, col1)
+
+    def column_clear(self, col, row0, row1):
+        # 同一列中两行之间是否没有墙
+        if not 0 <= col < self.cols:
+            return True
+        return self._span_clear(self.col_masks[col], row0, row1)
+
+    def walls(self):
+        # 遍历所有墙壁 (列, 行, 类型)
+        types = self.types
+        cols = self.cols
+        for i, kind in enumerate(types):
+            if kind:
+                yield i % cols, i // cols, kind
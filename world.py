@@ -0,0 +1,114 @@
+"""
+坦克大战世界与摄像机
+世界（地图）大小与窗口大小分开：地图按CHUNK_SIZE x CHUNK_SIZE个格子划分成区块，
+摄像机跟随玩家，绘制时只处理可见的区块和实体；
+模拟只在玩家周围的活动区块中进行（视野范围再向外扩展ACTIVE_CHUNK_MARGIN个区块），
+远处的敌人暂停行动，流场也只在活动区域内计算，地图再大每帧的开销也不会增加
+
+默认的世界大小与窗口相同，这时整个地图都在视野和活动区域内
+"""
+import argparse
+
+import pygame
+
+from config import *
+from wall_grid import WallGrid
+
+
+def parse_world_size(text):
+    # 命令行参数：WxH，例如8000x6000
+    try:
+        width, height = (int(part) for part in text.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'世界大小格式应为 宽x高，例如8000x6000: {text}')
+    if width < SCREEN_WIDTH or height < SCREEN_HEIGHT:
+        raise argparse.ArgumentTypeError(f'世界不能小于窗口大小 {SCREEN_WIDTH}x{SCREEN_HEIGHT}')
+    return width, height
+
+
+class World:
+    def __init__(self, width=None, height=None, cell_size=BLOCK_SIZE, chunk_size=CHUNK_SIZE):
+        self.width = width if width is not None else WORLD_WIDTH
+        self.height = height if height is not None else WORLD_HEIGHT
+        self.cell_size = cell_size
+        # 向上取整，保证网格覆盖整个世界
+        self.cols = -(-self.width // cell_size)
+        self.rows = -(-self.height // cell_size)
+        self.chunk_size = chunk_size  # 区块边长（格子数）
+        self.chunk_cols = -(-self.cols // chunk_size)
+        self.chunk_rows = -(-self.rows // chunk_size)
+
+    def create_grid(self):
+        return WallGrid(self.cols, self.rows, self.cell_size)
+
+    def spawn_regions(self):
+        # 敌人和道具的生成区域 (起始列, 起始行, 结束列, 结束行)，结束值不包含：敌人只在地图上半部分生成；
+        # 地图比窗口高时敌人在整个地图中生成（实际只在玩家附近的活动区块中选择）
+        cols = self.width // self.cell_size
+        rows = self.height // self.cell_size
+        enemy_rows = rows // 2 + 1 if self.height <= SCREEN_HEIGHT else rows - 1
+        return {
+            'enemy': (1, 1, cols - 1, enemy_rows),
+            'power_up': (1, 1, cols - 1, rows - 1),
+        }
+
+    def obstacle_count(self):
+        # 随机地图的障碍物数量按面积缩放，默认世界大小时为MAP_OBSTACLE_COUNT
+        return MAP_OBSTACLE_COUNT * self.width * self.height // (SCREEN_WIDTH * SCREEN_HEIGHT)
+
+    def view_rect(self, x, y):
+        # 以(x, y)为中心、窗口大小的视野矩形，限制在世界范围内（世界比窗口小时居中）
+        view = pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
+        view.center = (int(x), int(y))
+        return view.clamp(pygame.Rect(0, 0, self.width, self.height))
+
+    def chunk_range(self, rect, margin=0):
+        # 矩形覆盖的区块范围 (起始列, 起始行, 结束列, 结束行)，向外扩展margin个区块，结束值不包含
+        size = self.chunk_size * self.cell_size
+        cx0 = max(rect.left // size - margin, 0)
+        cy0 = max(rect.top // size - margin, 0)
+        cx1 = min((rect.right - 1) // size + 1 + margin, self.chunk_cols)
+        cy1 = min((rect.bottom - 1) // size + 1 + margin, self.chunk_rows)
+        return cx0, cy0, cx1, cy1
+
+    def chunk_cells(self, chunk_range):
+        # 区块范围对应的格子范围 (起始列, 起始行, 结束列, 结束行)
+        cx0, cy0, cx1, cy1 = chunk_range
+        size = self.chunk_size
+        return cx0 * size, cy0 * size, min(cx1 * size, self.cols), min(cy1 * size, self.rows)
+
+    def chunk_ids(self, chunk_range):
+        # 区块范围内所有区块的编号（按行优先）
+        cx0, cy0, cx1, cy1 = chunk_range
+        return [cy * self.chunk_cols + cx for cy in range(cy0, cy1) for cx in range(cx0, cx1)]
+
+    def cell_rect(self, cell_range):
+        # 格子范围对应的像素矩形
+        col0, row0, col1, row1 = cell_range
+        size = self.cell_size
+        return pygame.Rect(col0 * size, row0 * size, (col1 - col0) * size, (row1 - row0) * size)
+
+    def chunk_of(self, col, row):
+        return (row // self.chunk_size) * self.chunk_cols + col // self.chunk_size
+
+    def active_range(self, x, y):
+        # 玩家在(x, y)时的活动区块范围，只由游戏状态决定，与渲染无关，保证录像可以复现
+        return self.chunk_range(self.view_rect(x, y), ACTIVE_CHUNK_MARGIN)
+
+
+class Camera:
+    def __init__(self, world):
+        self.world = world
+        self.rect = pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)  # 视野在世界中的位置
+
+    def follow(self, x, y):
+        # 以(x, y)为中心移动视野，返回视野是否移动
+        view = self.world.view_rect(x, y)
+        if view.topleft == self.rect.topleft:
+            return False
+        self.rect = view
+        return True
+
+    @property
+    def offset(self):
+        return self.rect.x, self.rect.y
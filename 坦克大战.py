@@ -5,453 +5,316 @@ import time
 import os
 from pygame.locals import *
 from config import *  # 导入配置文件中的常量
+from wall_grid import EMPTY
+from background import BackgroundLayer
+from bullet_store import BulletStore
+from profiler import FrameProfiler
+from text_cache import TextCache, get_font
+from assets import assets
+from sound_queue import SoundQueue
+from sprites import SpriteAtlas
+from flow_field import FlowField
+from sweep import sweep_walls, sweep_rects
+from spawn_cells import SpawnIndex
+from broadphase import EntityGrid
+from world import World, Camera, parse_world_size
+from ecs import EntityStore, PLAYER, ENEMY, EXPLOSION, POWER_UP, DIRECTIONS, TANK_COLORS
 
-# 初始化pygame
-pygame.init()
+# 无界面模式（环境变量TANK_HEADLESS=1）：不创建窗口，不初始化字体和音频
+HEADLESS = os.environ.get('TANK_HEADLESS') == '1'
+if HEADLESS:
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
 
-# 尝试初始化音频系统，如果失败则禁用音频
-try:
-    pygame.mixer.init()
-    audio_enabled = True
-    print("音频系统初始化成功")
-except:
-    audio_enabled = False
-    print("警告：音频系统初始化失败，游戏将在无声模式下运行")
+# 初始化pygame（只初始化窗口和字体，音频在菜单显示后由后台线程初始化和加载）
+if not HEADLESS:
+    pygame.display.init()
+    pygame.font.init()
 
-# 加载音效
-def load_sound(filename):
-    if not audio_enabled:
-        return None
-        
-    # 检查sounds文件夹是否存在，如果不存在则创建
-    if not os.path.exists('sounds'):
-        try:
-            os.makedirs('sounds')
-            print("创建sounds文件夹")
-        except:
-            print("无法创建sounds文件夹")
-            return None
-    
-    sound_path = os.path.join('sounds', filename)
-    # 检查音效文件是否存在
-    if not os.path.exists(sound_path):
-        print(f"警告：音效文件不存在: {sound_path}")
-        return None
-        
-    try:
-        sound = pygame.mixer.Sound(sound_path)
-        return sound
-    except:
-        print(f"警告：无法加载音效: {sound_path}")
-        return None
-
-# 加载背景音乐
-def load_music(filename):
-    if not audio_enabled:
-        return False
-        
-    # 检查sounds文件夹是否存在
-    if not os.path.exists('sounds'):
-        print("警告：sounds文件夹不存在，无法加载背景音乐")
-        return False
-    
-    music_path = os.path.join('sounds', filename)
-    # 检查音乐文件是否存在
-    if not os.path.exists(music_path):
-        print(f"警告：背景音乐文件不存在: {music_path}")
-        return False
-        
-    try:
-        pygame.mixer.music.load(music_path)
-        return True
-    except:
-        print(f"警告：无法加载背景音乐: {music_path}")
-        return False
-
-# 游戏音效
-sounds = {
-    'shoot': load_sound('shoot.wav'),
-    'explosion': load_sound('explosion.wav'),
-    'hit': load_sound('hit.wav'),
-    'power_up': load_sound('power_up.wav'),
-    'game_over': load_sound('game_over.wav'),
-    'level_up': load_sound('level_up.wav')
-}
-
-# 播放音效的函数
-def play_sound(sound_name):
-    if not audio_enabled:
-        return
-        
-    if sound_name in sounds and sounds[sound_name]:
-        try:
-            sounds[sound_name].play()
-        except:
-            pass  # 忽略播放失败的情况
-
-# 尝试加载背景音乐
-background_music_loaded = load_music('background.mp3')
-
-# 游戏对象基类
-class GameObject:
-    def __init__(self, x, y, width, height):
-        self.x = x
-        self.y = y
-        self.width = width
-        self.height = height
-        self.rect = pygame.Rect(x, y, width, height)
-    
-    def update(self):
-        self.rect.x = self.x
-        self.rect.y = self.y
-    
-    def draw(self, screen):
-        pass
-
-# 坦克类
-class Tank(GameObject):
-    def __init__(self, x, y, direction, speed, color, is_player=False):
-        super().__init__(x, y, BLOCK_SIZE, BLOCK_SIZE)
-        self.direction = direction
-        self.speed = speed
-        self.base_speed = speed  # 保存基础速度
-        self.color = color
-        self.is_player = is_player
-        self.health = 100
-        self.cooldown = 0
-        self.cooldown_time = PLAYER_COOLDOWN if is_player else PLAYER_COOLDOWN * 2  # 发射子弹的冷却时间
-        self.shield = 0  # 护盾持续时间
-        self.speed_boost = 0  # 速度提升持续时间
-    
-    def update(self):
-        # 更新冷却时间
-        if self.cooldown > 0:
-            self.cooldown -= 1
-        
-        # 更新护盾持续时间
-        if self.shield > 0:
-            self.shield -= 1
-        
-        # 更新速度提升持续时间
-        if self.speed_boost > 0:
-            self.speed_boost -= 1
-            if self.speed_boost <= 0:
-                self.speed = self.base_speed  # 恢复基础速度
-        
-        # 更新位置
-        super().update()
-    
-    def apply_power_up(self, power_type):
-        # 播放道具音效
-        play_sound('power_up')
-        
-        if power_type == "health":
-            self.health = min(100, self.health + HEALTH_RESTORE_AMOUNT)
-        elif power_type == "speed":
-            self.speed_boost = SPEED_BOOST_DURATION
-            self.speed = self.base_speed * SPEED_BOOST_MULTIPLIER
-        elif power_type == "shield":
-            self.shield = SHIELD_DURATION
-    
-    def move(self, direction=None):
-        if direction is not None:
-            self.direction = direction
-        
-        # 根据方向移动
-        if self.direction == Direction.UP:
-            self.y -= self.speed
-        elif self.direction == Direction.RIGHT:
-            self.x += self.speed
-        elif self.direction == Direction.DOWN:
-            self.y += self.speed
-        elif self.direction == Direction.LEFT:
-            self.x -= self.speed
-        
-        # 边界检查
-        if self.x < 0:
-            self.x = 0
-        elif self.x > SCREEN_WIDTH - self.width:
-            self.x = SCREEN_WIDTH - self.width
-        if self.y < 0:
-            self.y = 0
-        elif self.y > SCREEN_HEIGHT - self.height:
-            self.y = SCREEN_HEIGHT - self.height
-        
-        # 更新矩形位置
-        self.update()
-    
-    def shoot(self):
-        if self.cooldown <= 0:
-            self.cooldown = self.cooldown_time
-            # 根据坦克方向确定子弹的初始位置
-            if self.direction == Direction.UP:
-                bullet_x = self.x + self.width // 2 - 2
-                bullet_y = self.y - 5
-            elif self.direction == Direction.RIGHT:
-                bullet_x = self.x + self.width
-                bullet_y = self.y + self.height // 2 - 2
-            elif self.direction == Direction.DOWN:
-                bullet_x = self.x + self.width // 2 - 2
-                bullet_y = self.y + self.height
-            else:  # LEFT
-                bullet_x = self.x - 5
-                bullet_y = self.y + self.height // 2 - 2
-            
-            # 播放射击音效
-            play_sound('shoot')
-            
-            return Bullet(bullet_x, bullet_y, self.direction, BULLET_SPEED, self.is_player)
-        return None
-    
-    def draw(self, screen):
-        # 绘制坦克主体
-        pygame.draw.rect(screen, self.color, self.rect)
-        
-        # 绘制坦克炮管
-        if self.direction == Direction.UP:
-            pygame.draw.rect(screen, self.color, (self.x + self.width // 2 - 2, self.y - 5, 4, 5))
-        elif self.direction == Direction.RIGHT:
-            pygame.draw.rect(screen, self.color, (self.x + self.width, self.y + self.height // 2 - 2, 5, 4))
-        elif self.direction == Direction.DOWN:
-            pygame.draw.rect(screen, self.color, (self.x + self.width // 2 - 2, self.y + self.height, 4, 5))
-        elif self.direction == Direction.LEFT:
-            pygame.draw.rect(screen, self.color, (self.x - 5, self.y + self.height // 2 - 2, 5, 4))
-        
-        # 绘制生命值条
-        health_width = (self.width * self.health) // 100
-        pygame.draw.rect(screen, RED, (self.x, self.y - 5, self.width, 3))
-        pygame.draw.rect(screen, GREEN, (self.x, self.y - 5, health_width, 3))
-        
-        # 如果有护盾，绘制护盾效果
-        if self.shield > 0:
-            shield_rect = pygame.Rect(self.x - 2, self.y - 2, self.width + 4, self.height + 4)
-            pygame.draw.rect(screen, BLUE, shield_rect, 2)  # 绘制蓝色边框表示护盾
-
-# 子弹类
-class Bullet(GameObject):
-    def __init__(self, x, y, direction, speed, is_player_bullet):
-        super().__init__(x, y, 4, 4)
-        self.direction = direction
-        self.speed = speed
-        self.is_player_bullet = is_player_bullet
-    
-    def update(self):
-        # 根据方向移动
-        if self.direction == Direction.UP:
-            self.y -= self.speed
-        elif self.direction == Direction.RIGHT:
-            self.x += self.speed
-        elif self.direction == Direction.DOWN:
-            self.y += self.speed
-        elif self.direction == Direction.LEFT:
-            self.x -= self.speed
-        
-        # 更新矩形位置
-        super().update()
-    
-    def is_out_of_bounds(self):
-        return (self.x < 0 or self.x > SCREEN_WIDTH or
-                self.y < 0 or self.y > SCREEN_HEIGHT)
-    
-    def draw(self, screen):
-        if self.is_player_bullet:
-            pygame.draw.rect(screen, YELLOW, self.rect)
-        else:
-            pygame.draw.rect(screen, RED, self.rect)
-
-# 墙壁类
-class Wall(GameObject):
-    def __init__(self, x, y, is_breakable=False):
-        super().__init__(x, y, BLOCK_SIZE, BLOCK_SIZE)
-        self.is_breakable = is_breakable
-        self.health = 100 if is_breakable else float('inf')
-    
-    def hit(self, damage=BULLET_DAMAGE):
-        if self.is_breakable:
-            self.health -= damage
-            return self.health <= 0
-        return False
-    
-    def draw(self, screen):
-        if self.is_breakable:
-            color = GRAY  # 灰色可破坏墙
-        else:
-            color = DARK_GRAY  # 深灰色不可破坏墙
-        pygame.draw.rect(screen, color, self.rect)
-
-# 爆炸效果类
-class Explosion(GameObject):
-    def __init__(self, x, y):
-        super().__init__(x, y, BLOCK_SIZE, BLOCK_SIZE)
-        self.lifetime = EXPLOSION_LIFETIME
-        self.current_frame = 0
-    
-    def update(self):
-        self.current_frame += 1
-        return self.current_frame >= self.lifetime
-    
-    def draw(self, screen):
-        # 简单的爆炸动画
-        size = int(BLOCK_SIZE * (1 - self.current_frame / self.lifetime))
-        x_offset = (BLOCK_SIZE - size) // 2
-        y_offset = (BLOCK_SIZE - size) // 2
-        pygame.draw.rect(screen, RED, (self.x + x_offset, self.y + y_offset, size, size))
-
-# 道具类
-class PowerUp(GameObject):
-    def __init__(self, x, y, power_type):
-        super().__init__(x, y, BLOCK_SIZE, BLOCK_SIZE)
-        self.type = power_type
-        self.lifetime = POWER_UP_LIFETIME
-        self.flash_timer = 0
-        self.visible = True
-    
-    def update(self):
-        super().update()
-        self.lifetime -= 1
-        
-        # 闪烁效果，每10帧切换一次可见性
-        self.flash_timer += 1
-        if self.flash_timer >= POWER_UP_FLASH_INTERVAL:
-            self.flash_timer = 0
-            self.visible = not self.visible
-        
-        # 返回是否应该移除道具
-        return self.lifetime <= 0
-    
-    def draw(self, screen):
-        if not self.visible:
-            return
-            
-        if self.type == "health":
-            # 绘制生命值恢复道具
-            pygame.draw.rect(screen, GREEN, self.rect)
-            pygame.draw.rect(screen, RED, (self.x + 5, self.y + 5, self.width - 10, self.height - 10))
-        elif self.type == "speed":
-            # 绘制速度提升道具
-            pygame.draw.rect(screen, BLUE, self.rect)
-            pygame.draw.rect(screen, WHITE, (self.x + 5, self.y + 5, self.width - 10, self.height - 10))
-        elif self.type == "shield":
-            # 绘制护盾道具
-            pygame.draw.rect(screen, YELLOW, self.rect)
-            pygame.draw.circle(screen, BLUE, (self.x + self.width // 2, self.y + self.height // 2), self.width // 3)
+# 窗口需要重绘的事件
+EXPOSE_EVENTS = (VIDEOEXPOSE, getattr(pygame, 'WINDOWEXPOSED', VIDEOEXPOSE))
 
 # 游戏主类
 class TankGame:
-    def __init__(self):
-        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-        pygame.display.set_caption('坦克大战')
-        self.clock = pygame.time.Clock()
-        self.font = pygame.font.SysFont('Microsoft YaHei', 36)
-        # 为游戏结束文字使用更大更醒目的字体
-        try:
-            self.game_over_font = pygame.font.SysFont('SimHei', 48, bold=True)
-        except:
-            # 如果无法加载SimHei字体，则使用其他中文字体
-            try:
-                self.game_over_font = pygame.font.SysFont('Microsoft YaHei', 48, bold=True)
-            except:
-                # 如果所有中文字体都无法加载，使用系统默认字体
-                self.game_over_font = pygame.font.SysFont(None, 48, bold=True)
+    def __init__(self, headless=HEADLESS, seed=None, render_mode=RENDER_MODE, world_size=None):
+        self.headless = headless
+        # 世界大小（world_size为(宽, 高)，省略时使用配置中的大小），摄像机跟随玩家
+        self.world = World(*(world_size or ()))
+        self.camera = Camera(self.world)
+        # 每局游戏使用独立的随机数生成器，保证同一种子可以完整复现
+        # seed为None时每局种子随机，否则按seed生成确定的种子序列
+        self.seed_source = random.Random(seed)
+        self.seed = None
+        self.rng = random.Random()
+        self.recorder = None  # 录像记录器（replay.ReplayRecorder）
+        self.profiler = FrameProfiler()  # 帧性能分析器，F3键显示
+        # 预先绘制的墙壁背景层和上一帧绘制过的区域（局部更新显示）
+        self.background = None if headless else BackgroundLayer((SCREEN_WIDTH, SCREEN_HEIGHT))
+        self.dirty_rects = []
+        self.full_redraw = True
+        # 文字渲染缓存，以及只构建一次的菜单画面和暂停/结束遮罩
+        self.text_cache = TextCache()
+        self.menu_surface = None
+        self.message_overlays = {}
+        self.paused_drawn = False
+        self.trace_path = None  # 退出时保存性能跟踪的文件
+        self.music_started = False  # 背景音乐在后台加载完成后才开始播放
+        self.sound_queue = SoundQueue(assets)  # 每个逻辑帧的音效请求合并后统一播放
+        
+        if headless:
+            # 无界面模式下不创建窗口和字体，也不限制帧率
+            self.screen = None
+            self.clock = None
+            self.font = None
+            self.game_over_font = None
+            self.atlas = None
+        else:
+            self.screen = self.create_window(render_mode)
+            pygame.display.set_caption('坦克大战')
+            self.clock = pygame.time.Clock()
+            # capped模式按FPS限制渲染帧率，其他模式不限制（vsync模式由显示器刷新率决定）
+            self.max_fps = FPS if render_mode == 'capped' else 0
+            # 字体在进程内只解析一次
+            self.font = get_font('Microsoft YaHei', 36)
+            # 为游戏结束文字使用更大更醒目的字体，SimHei不可用时依次尝试其他中文字体和系统默认字体
+            self.game_over_font = get_font(('SimHei', 'Microsoft YaHei'), 48, bold=True)
+            # 坦克、子弹、道具和爆炸的精灵在启动时预先绘制到图集中
+            self.atlas = SpriteAtlas()
+            # 音效和背景音乐在后台加载，不阻塞菜单显示
+            assets.start_audio()
         
         # 初始化游戏状态
         self.state = GameState.MENU
         
         # 初始化游戏变量
-        self.player = None
-        self.enemies = []
-        self.bullets = []
-        self.walls = []
-        self.explosions = []
-        self.power_ups = []
+        self.entities = EntityStore()  # 坦克、爆炸和道具的组件数组
+        self.entities.world_width = self.world.width
+        self.entities.world_height = self.world.height
+        self.player = None  # 玩家坦克的实体ID（多名玩家时为第一名存活的玩家，摄像机跟随）
+        self.players = []  # 所有存活玩家坦克的实体ID（联机模式下有多名玩家）
+        self.bullets = BulletStore()  # 所有子弹保存在NumPy数组中
+        self.walls = self.world.create_grid()  # 墙壁网格
+        self.flow = FlowField()  # 敌人共用的追击流场
+        # 可以生成敌人和道具的空闲格子
+        self.spawn_cells = SpawnIndex(self.world.spawn_regions(), self.entities, self.world)
+        # 坦克和道具的均匀网格，移动碰撞和拾取道具只检查附近的格子
+        self.tank_grid = EntityGrid(self.entities, (PLAYER, ENEMY))
+        self.power_up_grid = EntityGrid(self.entities, (POWER_UP,))
+        # 玩家周围的活动区域：区块范围、区块编号、格子范围和像素矩形，只有其中的敌人会行动
+        self.active_range = None
+        self.active_chunks = None
+        self.active_cells = None
+        self.active_rect = None
+        self.level_pack = None  # 关卡包（level_pack.LevelPack），为None时使用随机地图
         self.power_up_timer = 0
         self.score = 0
         self.level = 1
         self.game_over = False
         self.enemy_spawn_timer = 0
-        
-        # 播放背景音乐
-        if audio_enabled and background_music_loaded:
-            try:
-                pygame.mixer.music.set_volume(0.5)  # 设置音量
-                pygame.mixer.music.play(-1)  # -1表示循环播放
-            except:
-                print("警告：无法播放背景音乐")
+        self.fire_requested = False  # 本帧是否按下了发射键
+        self.ticks = 0  # 已经推进的逻辑帧数
+        self.previous = None  # 上一逻辑帧的实体位置 (x, y, 创建序号)，渲染时在两个逻辑帧之间插值
+    
+    @property
+    def music_enabled(self):
+        # 只有在有窗口且音乐加载成功时才控制背景音乐
+        return not self.headless and assets.music_loaded
     
-    def reset_game(self):
+    def start_music(self):
+        # 每帧检查一次，背景音乐加载完成后开始播放（游戏结束时等重新开始再播放）
+        if self.music_started or not self.music_enabled or self.state == GameState.GAME_OVER:
+            return
+        self.music_started = True
+        try:
+            pygame.mixer.music.play(-1)  # -1表示循环播放
+            if self.state == GameState.PAUSED:
+                pygame.mixer.music.pause()
+        except:
+            print("警告：无法播放背景音乐")
+    
+    def reset_game(self, seed=None):
+        # 重新设置本局的随机数种子
+        if seed is None:
+            seed = self.seed_source.getrandbits(32)
+        self.seed = seed
+        self.rng.seed(seed)
+        
         # 初始化游戏状态
-        self.player = Tank(SCREEN_WIDTH // 2, SCREEN_HEIGHT - 2 * BLOCK_SIZE, Direction.UP, PLAYER_SPEED, GREEN, True)
-        self.enemies = []
-        self.bullets = []
-        self.walls = []
-        self.explosions = []
-        self.power_ups = []
+        self.entities.clear()  # 实体数组跨局复用
+        self.player = self.entities.create_tank(self.world.width // 2, self.world.height - 2 * BLOCK_SIZE,
+                                                Direction.UP, PLAYER_SPEED, PLAYER)
+        self.players = [self.player]
+        self.update_active_area()
+        self.bullets.clear()  # 子弹数组跨局复用
+        self.walls = self.world.create_grid()  # 墙壁网格
+        self.spawn_cells.attach(self.walls)
         self.power_up_timer = 0
         self.score = 0
         self.level = 1
         self.game_over = False
         self.enemy_spawn_timer = 0
+        self.fire_requested = False
+        self.ticks = 0
+        self.previous = None
         self.state = GameState.PLAYING
         
         # 确保背景音乐正在播放
-        if audio_enabled and background_music_loaded:
+        if self.music_enabled:
+            self.music_started = True
             try:
                 if not pygame.mixer.music.get_busy():
                     pygame.mixer.music.play(-1)
             except:
                 print("警告：无法播放背景音乐")
         
-        # 创建初始敌人
-        self.spawn_enemies(3)
+        if self.level_pack is None:
+            # 创建初始敌人
+            self.spawn_enemies(3)
+            
+            # 创建地图
+            self.create_map()
+        else:
+            # 加载关卡包的第一关
+            self.start_level(3)
         
-        # 创建地图
-        self.create_map()
+        # 开始录制新的一局
+        if self.recorder is not None:
+            self.recorder.start(self)
     
-    def create_map(self):
-        # 创建边界墙
-        for x in range(0, SCREEN_WIDTH, BLOCK_SIZE):
-            self.walls.append(Wall(x, 0))
-            self.walls.append(Wall(x, SCREEN_HEIGHT - BLOCK_SIZE))
+    def create_map(self, obstacle_count=None):
+        # 创建边界墙（最后一列和最后一行对齐到网格）
+        for col in range(self.walls.cols):
+            self.walls.add(col, 0)
+            self.walls.add(col, self.walls.rows - 1)
         
-        for y in range(BLOCK_SIZE, SCREEN_HEIGHT - BLOCK_SIZE, BLOCK_SIZE):
-            self.walls.append(Wall(0, y))
-            self.walls.append(Wall(SCREEN_WIDTH - BLOCK_SIZE, y))
+        for row in range(1, self.walls.rows - 1):
+            self.walls.add(0, row)
+            self.walls.add(self.walls.cols - 1, row)
         
-        # 创建随机障碍物
-        for _ in range(30):
-            x = random.randint(1, (SCREEN_WIDTH // BLOCK_SIZE) - 2) * BLOCK_SIZE
-            y = random.randint(1, (SCREEN_HEIGHT // BLOCK_SIZE) - 4) * BLOCK_SIZE
+        # 创建随机障碍物（数量按地图面积缩放）
+        if obstacle_count is None:
+            obstacle_count = self.world.obstacle_count()
+        player_x = self.entities.get(self.player, 'x')
+        player_y = self.entities.get(self.player, 'y')
+        for _ in range(obstacle_count):
+            x = self.rng.randint(1, (self.world.width // BLOCK_SIZE) - 2) * BLOCK_SIZE
+            y = self.rng.randint(1, (self.world.height // BLOCK_SIZE) - 4) * BLOCK_SIZE
             
             # 确保不会在玩家坦克位置创建墙
-            if abs(x - self.player.x) > BLOCK_SIZE * 2 or abs(y - self.player.y) > BLOCK_SIZE * 2:
-                is_breakable = random.random() < WALL_BREAKABLE_CHANCE
-                self.walls.append(Wall(x, y, is_breakable))
+            if abs(x - player_x) > BLOCK_SIZE * 2 or abs(y - player_y) > BLOCK_SIZE * 2:
+                is_breakable = self.rng.random() < WALL_BREAKABLE_CHANCE
+                self.walls.add(x // BLOCK_SIZE, y // BLOCK_SIZE, is_breakable)
+    
+    def use_level_pack(self, pack):
+        # 使用关卡包中的关卡代替随机地图，所有关卡的尺寸必须与墙壁网格相同
+        for n in range(len(pack)):
+            level = pack.level(n)
+            if (level.cols, level.rows) != (self.walls.cols, self.walls.rows):
+                raise ValueError(f'第{n + 1}关 {level.name} 的尺寸为{level.cols}x{level.rows}，'
+                                 f'地图应为{self.walls.cols}x{self.walls.rows}')
+        self.level_pack = pack
+    
+    def current_level(self):
+        # 当前等级对应的关卡，关卡用完后从第一关重新开始
+        return self.level_pack.level((self.level - 1) % len(self.level_pack))
+    
+    def start_level(self, default_enemies):
+        # 加载当前等级的关卡：替换地图，清除子弹和道具，玩家回到出生点
+        level = self.current_level()
+        self.walls.load_types(level.tiles)
+        self.bullets.clear()
+        entities = self.entities
+        for i in list(entities.query(POWER_UP)):
+            entities.remove(i)
+        if level.player_spawn is not None:
+            entities.set_position(entities.index(self.player), *self.walls.cell_position(*level.player_spawn))
+            # 其他玩家放到出生点附近的空闲格子
+            for eid in self.players[1:]:
+                cell = self.free_cell_near(*level.player_spawn)
+                if cell is not None:
+                    entities.set_position(entities.index(eid), *self.walls.cell_position(*cell))
+            self.update_active_area()
+        self.previous = None
+        self.spawn_enemies(level.enemies or default_enemies)
     
     def spawn_enemies(self, count):
-        for _ in range(count):
-            # 随机位置生成敌人
-            while True:
-                x = random.randint(1, (SCREEN_WIDTH // BLOCK_SIZE) - 2) * BLOCK_SIZE
-                y = random.randint(1, (SCREEN_HEIGHT // BLOCK_SIZE) // 2) * BLOCK_SIZE
-                
-                # 确保不会与其他物体重叠
-                rect = pygame.Rect(x, y, BLOCK_SIZE, BLOCK_SIZE)
-                if not any(wall.rect.colliderect(rect) for wall in self.walls) and \
-                   not any(enemy.rect.colliderect(rect) for enemy in self.enemies):
-                    break
+        # 在空闲格子中生成敌人，返回实际生成的数量（地图上没有空位时少于count）
+        spawns = self.current_level().enemy_spawns if self.level_pack is not None else []
+        for spawned in range(count):
+            # 关卡设置了敌人出生点时在空闲的出生点生成，否则在敌人生成区域中随机选一个空闲格子
+            free = [cell for cell in spawns if self.spawn_cells.is_free(*cell)]
+            cell = self.rng.choice(free) if free else self.spawn_choice('enemy')
+            if cell is None:
+                return spawned
             
-            direction = random.choice(list(Direction))
-            self.enemies.append(Tank(x, y, direction, 1, RED))
+            x, y = self.walls.cell_position(*cell)
+            direction = self.rng.choice(DIRECTIONS)
+            self.entities.create_tank(x, y, direction, 1, ENEMY)
+        return count
+    
+    def add_player(self):
+        # 加入一名玩家（联机模式），坦克放在第一名玩家出生点附近的空闲格子，返回实体ID
+        walls = self.walls
+        col, row = walls.cell_at(self.world.width // 2, self.world.height - 2 * BLOCK_SIZE)
+        cell = self.free_cell_near(col, row) or (col, row)
+        eid = self.entities.create_tank(*walls.cell_position(*cell), Direction.UP, PLAYER_SPEED, PLAYER)
+        self.players.append(eid)
+        self.update_active_area()
+        return eid
+    
+    def remove_player(self, eid):
+        # 玩家离开或被消灭（还有其他玩家时），删除坦克，摄像机改为跟随下一名玩家
+        i = self.entities.index(eid)
+        if i is not None:
+            self.entities.remove(i)
+        if eid in self.players:
+            self.players.remove(eid)
+        if self.players:
+            self.player = self.players[0]
+            self.update_active_area()
+    
+    def free_cell_near(self, col, row):
+        # 离(col, row)最近的空闲格子（按曼哈顿距离逐圈查找），没有时返回None
+        spawn_cells = self.spawn_cells
+        for distance in range(max(self.walls.cols, self.walls.rows)):
+            for dc in range(-distance, distance + 1):
+                dr = distance - abs(dc)
+                for cell in ((col + dc, row - dr), (col + dc, row + dr)):
+                    if spawn_cells.is_free(*cell):
+                        return cell
+        return None
+    
+    def update_active_area(self):
+        # 按玩家位置更新活动区域（多名玩家时取所有玩家活动区块的并集），玩家进入新的区块时才重新计算
+        world = self.world
+        entities = self.entities
+        ranges = [world.active_range(*entities.rects[entities.index(eid)].center) for eid in self.players]
+        active_range = (min(r[0] for r in ranges), min(r[1] for r in ranges),
+                        max(r[2] for r in ranges), max(r[3] for r in ranges))
+        if active_range == self.active_range:
+            return
+        self.active_range = active_range
+        self.active_chunks = world.chunk_ids(active_range)
+        self.active_cells = world.chunk_cells(active_range)
+        self.active_rect = world.cell_rect(self.active_cells)
+    
+    def spawn_choice(self, region):
+        # 优先在活动区块中选择空闲格子，活动区块中没有空位时在整个区域中选择
+        cell = self.spawn_cells.choice(region, self.rng, self.active_chunks)
+        if cell is None:
+            cell = self.spawn_cells.choice(region, self.rng)
+        return cell
     
     def handle_events(self):
         for event in pygame.event.get():
             if event.type == QUIT:
-                pygame.quit()
-                sys.exit()
+                self.quit()
+            elif event.type in EXPOSE_EVENTS:
+                # 窗口被遮挡后重新显示时需要整屏重绘
+                self.full_redraw = True
             elif event.type == KEYDOWN:
                 if event.key == K_ESCAPE:
-                    pygame.quit()
-                    sys.exit()
+                    self.quit()
                 elif event.key == K_r and self.state == GameState.GAME_OVER:
                     print("R键被按下，重置游戏")
                     self.reset_game()
@@ -459,302 +322,514 @@ class TankGame:
                     if self.state == GameState.MENU:
                         self.reset_game()  # 从菜单开始游戏
                     elif self.state == GameState.PLAYING:
-                        bullet = self.player.shoot()
-                        if bullet:
-                            self.bullets.append(bullet)
+                        # 在下一次逻辑更新时发射子弹
+                        self.fire_requested = True
+                elif event.key == K_F3:  # 显示/隐藏性能分析叠加层
+                    self.profiler.toggle_overlay()
                 elif event.key == K_p:  # 添加暂停/继续功能
                     if self.state == GameState.PLAYING:
                         self.state = GameState.PAUSED
+                        self.full_redraw = True
                         # 暂停背景音乐
-                        if audio_enabled and background_music_loaded:
+                        if self.music_enabled:
                             try:
                                 pygame.mixer.music.pause()
                             except:
                                 pass
                     elif self.state == GameState.PAUSED:
                         self.state = GameState.PLAYING
+                        self.full_redraw = True
                         # 恢复背景音乐
-                        if audio_enabled and background_music_loaded:
+                        if self.music_enabled:
                             try:
                                 pygame.mixer.music.unpause()
                             except:
                                 pass
     
-    def handle_player_movement(self):
-        if self.state != GameState.PLAYING:
-            return
-        
+    def create_window(self, render_mode):
+        if render_mode == 'vsync':
+            # 垂直同步需要使用SDL渲染器（SCALED），显卡或驱动不支持时退回普通窗口
+            try:
+                return pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SCALED, vsync=1)
+            except pygame.error:
+                print("警告：无法开启垂直同步，使用普通窗口")
+        return pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    
+    def quit(self):
+        # 退出前保存录像和性能跟踪
+        if self.recorder is not None:
+            self.recorder.save()
+        if self.trace_path is not None:
+            self.profiler.save_trace(self.trace_path)
+        # 后台音频加载线程结束后再关闭pygame
+        assets.stop_audio()
+        pygame.quit()
+        sys.exit()
+    
+    def get_keyboard_direction(self):
+        # 读取方向键状态，没有按下方向键时返回None
         keys = pygame.key.get_pressed()
-        moved = False
-        
-        # 保存当前位置
-        old_x, old_y = self.player.x, self.player.y
-        
         if keys[K_UP]:
-            self.player.direction = Direction.UP
-            self.player.move()
-            moved = True
+            return Direction.UP
         elif keys[K_RIGHT]:
-            self.player.direction = Direction.RIGHT
-            self.player.move()
-            moved = True
+            return Direction.RIGHT
         elif keys[K_DOWN]:
-            self.player.direction = Direction.DOWN
-            self.player.move()
-            moved = True
+            return Direction.DOWN
         elif keys[K_LEFT]:
-            self.player.direction = Direction.LEFT
-            self.player.move()
-            moved = True
-        
-        # 检查碰撞
-        if moved:
-            for wall in self.walls:
-                if self.player.rect.colliderect(wall.rect):
-                    # 发生碰撞，恢复位置
-                    self.player.x, self.player.y = old_x, old_y
-                    self.player.update()
-                    break
-            
-            for enemy in self.enemies:
-                if self.player.rect.colliderect(enemy.rect):
-                    # 发生碰撞，恢复位置
-                    self.player.x, self.player.y = old_x, old_y
-                    self.player.update()
-                    break
+            return Direction.LEFT
+        return None
+    
+    def player_shoot(self):
+        self.tank_shoot(self.entities.index(self.player))
+    
+    def tank_shoot(self, i):
+        # 坦克向子弹存储中发射一颗子弹，返回是否发射成功
+        entities = self.entities
+        if entities.cooldown[i] > 0:
+            return False
+        entities.cooldown[i] = entities.cooldown_time[i]
+        # 根据坦克方向确定子弹的初始位置
+        bullet_x, bullet_y = entities.muzzle(i)
+        
+        # 播放射击音效
+        self.sound_queue.request('shoot')
+        
+        self.bullets.spawn(bullet_x, bullet_y, DIRECTIONS[entities.direction[i]], BULLET_SPEED,
+                           entities.kind[i] == PLAYER)
+        return True
+    
+    def apply_power_up(self, i, power_type):
+        # 播放道具音效
+        self.sound_queue.request('power_up')
+        
+        entities = self.entities
+        if power_type == "health":
+            entities.health[i] = min(100, entities.health[i] + HEALTH_RESTORE_AMOUNT)
+        elif power_type == "speed":
+            entities.speed_boost[i] = SPEED_BOOST_DURATION
+            entities.speed[i] = entities.base_speed[i] * SPEED_BOOST_MULTIPLIER
+        elif power_type == "shield":
+            entities.shield[i] = SHIELD_DURATION
+    
+    def update_tank_timers(self):
+        # 冷却、护盾和速度提升计时器每帧对所有坦克批量减一
+        self.entities.tick_tank_timers()
+    
+    def move_tank(self, i, direction=None):
+        # 坦克沿当前方向扫掠移动，碰到墙或其他坦克时停在接触位置，返回是否被挡住
+        entities = self.entities
+        rect = entities.rects[i]
+        start = rect.copy()
+        entities.move(i, direction)
+        dx = rect.x - start.x
+        dy = rect.y - start.y
+        if not dx and not dy:
+            return False
+        distance = dx or dy
+        # 先用扫过的整个区域粗查，只有区域内有墙或坦克时才逐个计算接触距离
+        swept = start.union(rect)
+        allowed = distance
+        if self.walls.collides(swept):
+            allowed, _ = sweep_walls(self.walls, start, dx, dy)
+        near = [entities.rects[j] for j in self.tank_grid.query(swept) if j != i]
+        if near:
+            allowed = min(allowed, sweep_rects(start, dx, dy, near)[0], key=abs)
+        if allowed == distance:
+            return False
+        if dx:
+            entities.set_position(i, start.x + allowed, entities.y[i])
+        else:
+            entities.set_position(i, entities.x[i], start.y + allowed)
+        return True
+    
+    def handle_player_movement(self, direction=None, eid=None):
+        # eid为要移动的玩家，省略时为第一名玩家
+        if self.state != GameState.PLAYING or direction is None:
+            return
+        
+        entities = self.entities
+        # 敌人和其他玩家都是障碍
+        self.move_tank(entities.index(self.player if eid is None else eid), direction)
+    
+    def chase_direction(self, enemy):
+        # 按流场得到敌人追击玩家的方向，无法到达玩家时返回None
+        entities = self.entities
+        x, y = entities.x[enemy], entities.y[enemy]
+        col, row = self.walls.cell_at(x + BLOCK_SIZE // 2, y + BLOCK_SIZE // 2)
+        direction = self.flow.direction_at(col, row)
+        if direction is None:
+            return None
+        # 先对齐到所在格子再转向，避免坦克蹭着墙角前进
+        cell_x, cell_y = self.walls.cell_position(col, row)
+        if direction in (Direction.UP, Direction.DOWN) and x != cell_x:
+            return Direction.RIGHT if x < cell_x else Direction.LEFT
+        if direction in (Direction.LEFT, Direction.RIGHT) and y != cell_y:
+            return Direction.DOWN if y < cell_y else Direction.UP
+        return direction
+    
+    def player_rects(self):
+        # 所有存活玩家的矩形，顺序与self.players相同
+        entities = self.entities
+        return [entities.rects[entities.index(eid)] for eid in self.players]
+    
+    def line_of_fire(self, enemy, player_rect):
+        # 玩家与敌人在同一行或同一列且中间没有墙时，返回敌人朝向玩家的方向，否则返回None
+        # 只比较两个格子之间的行/列墙壁位掩码，不逐格检查
+        rect = self.entities.rects[enemy]
+        walls = self.walls
+        col, row = walls.cell_at(rect.centerx, rect.centery)
+        player_col, player_row = walls.cell_at(player_rect.centerx, player_rect.centery)
+        if row == player_row and walls.row_clear(row, col, player_col):
+            return Direction.RIGHT if player_rect.centerx > rect.centerx else Direction.LEFT
+        if col == player_col and walls.column_clear(col, row, player_row):
+            return Direction.DOWN if player_rect.centery > rect.centery else Direction.UP
+        return None
     
     def update_enemies(self):
         if self.state != GameState.PLAYING:
             return
+        
+        entities = self.entities
+        rects = entities.rects
+        player_rects = self.player_rects()
+        
+        # 流场只在玩家换了格子或墙被摧毁时更新，所有敌人共用；只在活动区域内搜索
+        # 多名玩家时流场从所有玩家同时开始搜索，敌人追击离自己最近的玩家
+        self.flow.attach(self.walls)
+        cells = [self.walls.cell_at(*rect.center) for rect in player_rects]
+        self.flow.update(*cells[0], bounds=self.active_cells, others=cells[1:])
+        
+        enemies = entities.query(ENEMY)
+        # 活动区域外的敌人暂停行动
+        active = self.active_rect
+        for enemy in enemies:
+            if not active.collidepoint(rects[enemy].center):
+                continue
+            if entities.wander[enemy] > 0:
+                # 随机行驶中，保持当前方向
+                entities.wander[enemy] -= 1
+            elif self.rng.random() < ENEMY_DIRECTION_CHANGE_CHANCE:
+                # 随机改变方向
+                entities.direction[enemy] = self.rng.choice(DIRECTIONS).value
+                entities.wander[enemy] = ENEMY_WANDER_TIME
+            else:
+                # 沿流场追击玩家
+                direction = self.chase_direction(enemy)
+                if direction is not None:
+                    entities.direction[enemy] = direction.value
             
-        for enemy in self.enemies:
-            # 保存当前位置
-            old_x, old_y = enemy.x, enemy.y
-            
-            # 随机改变方向和移动
-            if random.random() < ENEMY_DIRECTION_CHANGE_CHANCE:
-                enemy.direction = random.choice(list(Direction))
-            
-            enemy.move()
-            
-            # 检查碰撞
-            collision = False
-            for wall in self.walls:
-                if enemy.rect.colliderect(wall.rect):
-                    collision = True
-                    break
-            
-            for other_enemy in self.enemies:
-                if enemy != other_enemy and enemy.rect.colliderect(other_enemy.rect):
-                    collision = True
-                    break
-            
-            if enemy.rect.colliderect(self.player.rect):
-                collision = True
-            
-            if collision:
-                # 发生碰撞，恢复位置并随机选择新方向
-                enemy.x, enemy.y = old_x, old_y
-                enemy.update()
-                enemy.direction = random.choice(list(Direction))
+            # 扫掠移动，碰到墙、其他敌人或玩家时停在接触位置
+            if self.move_tank(enemy):
+                # 被挡住时随机选择新方向，随机行驶一段时间后再继续追击
+                entities.direction[enemy] = self.rng.choice(DIRECTIONS).value
+                entities.wander[enemy] = ENEMY_WANDER_TIME
             
-            # 随机发射子弹
-            if random.random() < ENEMY_SHOOT_CHANCE:
-                bullet = enemy.shoot()
-                if bullet:
-                    self.bullets.append(bullet)
+            if ENEMY_AIMED_FIRE:
+                # 玩家在射界内时转向玩家开火（多名玩家时取第一个在射界内的玩家）
+                for player_rect in player_rects:
+                    direction = self.line_of_fire(enemy, player_rect)
+                    if direction is not None:
+                        break
+                if (direction is not None and entities.cooldown[enemy] == 0
+                        and self.rng.random() < ENEMY_AIM_CHANCE):
+                    entities.direction[enemy] = direction.value
+                    self.tank_shoot(enemy)
+            elif self.rng.random() < ENEMY_SHOOT_CHANCE:
+                # 随机发射子弹
+                self.tank_shoot(enemy)
     
     def update_bullets(self):
         if self.state != GameState.PLAYING:
             return
             
-        # 更新所有子弹
-        i = 0
-        while i < len(self.bullets):
-            bullet = self.bullets[i]
-            bullet.update()
+        bullets = self.bullets
+        
+        if len(bullets) == 0:
+            return
+        
+        # 批量移动所有子弹
+        bullets.advance()
+        
+        # 沿移动路径检查子弹与墙壁的碰撞，碰到墙的子弹停在接触位置；
+        # 先处理坦克碰撞，在碰到墙之前先打中坦克的子弹不再打墙
+        wall_hits = bullets.wall_hits(self.walls)
+        
+        # 玩家子弹和敌人子弹相撞时互相抵消
+        if BULLET_COLLISION:
+            for i, j in bullets.bullet_hits():
+                bullets.kill(i)
+                bullets.kill(j)
+        
+        # 检查玩家子弹与敌人的碰撞
+        level_up = False
+        entities = self.entities
+        enemies = entities.query(ENEMY)
+        # 保存实体ID：敌人被消灭后槽位可能被同一帧新生成的敌人复用
+        enemy_ids = [entities.entity_id(enemy) for enemy in enemies]
+        for i, j in bullets.tank_hits([entities.rects[enemy] for enemy in enemies], True):
+            enemy = entities.index(enemy_ids[j])
+            # 敌人可能已被同一帧的其他子弹消灭
+            if enemy is None:
+                continue
+            entities.health[enemy] -= BULLET_DAMAGE
+            self.add_explosion(bullets.x[i], bullets.y[i])
+            bullets.kill(i)
+            # 播放击中音效
+            self.sound_queue.request('hit')
             
-            # 检查是否出界
-            if bullet.is_out_of_bounds():
-                self.bullets.pop(i)
+            if entities.health[enemy] <= 0:
+                self.add_explosion(entities.x[enemy], entities.y[enemy])
+                entities.remove(enemy)
+                self.score += 100
+                # 播放爆炸音效
+                self.sound_queue.request('explosion')
+                
+                # 如果所有敌人都被消灭，进入下一关
+                if entities.count(ENEMY) == 0:
+                    self.level += 1
+                    if self.level_pack is None:
+                        self.spawn_enemies(min(3 + self.level, 10))
+                    else:
+                        # 本帧的子弹处理完后再切换到下一关的地图
+                        level_up = True
+                    # 播放升级音效
+                    self.sound_queue.request('level_up')
+        
+        # 检查敌人子弹与玩家的碰撞
+        players = list(self.players)
+        for i, j in bullets.tank_hits(self.player_rects(), False):
+            player = entities.index(players[j])
+            # 玩家可能已被同一帧的其他子弹消灭
+            if player is None:
                 continue
+            # 如果玩家有护盾，不扣血但护盾减少
+            if entities.shield[player] > 0:
+                entities.shield[player] = max(0, entities.shield[player] - 100)  # 护盾减少
+            else:
+                entities.health[player] -= BULLET_DAMAGE
             
-            # 检查子弹与墙壁的碰撞
-            wall_hit = False
-            for j, wall in enumerate(self.walls):
-                if bullet.rect.colliderect(wall.rect):
-                    wall_hit = True
-                    # 播放击中音效
-                    play_sound('hit')
-                    # 如果墙是可破坏的，检查是否被摧毁
-                    if wall.hit(BULLET_DAMAGE):
-                        self.explosions.append(Explosion(wall.x, wall.y))
-                        self.walls.pop(j)
-                        # 播放爆炸音效
-                        play_sound('explosion')
-                    break
+            self.add_explosion(bullets.x[i], bullets.y[i])
+            bullets.kill(i)
+            # 播放击中音效
+            self.sound_queue.request('hit')
             
-            if wall_hit:
-                self.bullets.pop(i)
+            if entities.health[player] <= 0 and len(self.players) > 1:
+                # 还有其他玩家存活时只消灭这名玩家
+                self.add_explosion(entities.x[player], entities.y[player])
+                self.remove_player(players[j])
+                self.sound_queue.request('explosion')
+            elif entities.health[player] <= 0 and self.state != GameState.GAME_OVER:
+                self.add_explosion(entities.x[player], entities.y[player])
+                self.state = GameState.GAME_OVER
+                self.game_over = True
+                # 播放游戏结束音效
+                self.sound_queue.request('game_over')
+                # 停止背景音乐
+                if self.music_enabled:
+                    try:
+                        pygame.mixer.music.stop()
+                    except:
+                        pass
+        
+        # 检查子弹与墙壁的碰撞
+        for i, col, row in wall_hits:
+            # 子弹已经打中坦克，或者同一帧内墙已被前面的子弹摧毁
+            if not bullets.alive[i] or self.walls.get(col, row) == EMPTY:
                 continue
-            
-            # 检查子弹与坦克的碰撞
-            if bullet.is_player_bullet:  # 玩家子弹
-                for j, enemy in enumerate(self.enemies):
-                    if bullet.rect.colliderect(enemy.rect):
-                        enemy.health -= BULLET_DAMAGE
-                        self.explosions.append(Explosion(bullet.x, bullet.y))
-                        self.bullets.pop(i)
-                        # 播放击中音效
-                        play_sound('hit')
-                        
-                        if enemy.health <= 0:
-                            self.explosions.append(Explosion(enemy.x, enemy.y))
-                            self.enemies.pop(j)
-                            self.score += 100
-                            # 播放爆炸音效
-                            play_sound('explosion')
-                            
-                            # 如果所有敌人都被消灭，进入下一关
-                            if len(self.enemies) == 0:
-                                self.level += 1
-                                self.spawn_enemies(min(3 + self.level, 10))
-                                # 播放升级音效
-                                play_sound('level_up')
-                        break
-                else:
-                    i += 1
-            else:  # 敌人子弹
-                if bullet.rect.colliderect(self.player.rect):
-                    # 如果玩家有护盾，不扣血但护盾减少
-                    if self.player.shield > 0:
-                        self.player.shield = max(0, self.player.shield - 100)  # 护盾减少
-                    else:
-                        self.player.health -= BULLET_DAMAGE
-                    
-                    self.explosions.append(Explosion(bullet.x, bullet.y))
-                    self.bullets.pop(i)
-                    # 播放击中音效
-                    play_sound('hit')
-                    
-                    if self.player.health <= 0:
-                        self.explosions.append(Explosion(self.player.x, self.player.y))
-                        self.state = GameState.GAME_OVER
-                        self.game_over = True
-                        # 播放游戏结束音效
-                        play_sound('game_over')
-                        # 停止背景音乐
-                        if audio_enabled and background_music_loaded:
-                            try:
-                                pygame.mixer.music.stop()
-                            except:
-                                pass
-                else:
-                    i += 1
+            # 播放击中音效
+            self.sound_queue.request('hit')
+            # 如果墙是可破坏的，检查是否被摧毁（网格中的墙会被直接清除）
+            if self.walls.hit(col, row, BULLET_DAMAGE):
+                self.add_explosion(*self.walls.cell_position(col, row))
+                # 播放爆炸音效
+                self.sound_queue.request('explosion')
+            bullets.kill(i)
+        
+        # 剔除出界的子弹，每帧压缩一次子弹数组
+        bullets.cull(self.world.width, self.world.height)
+        bullets.compact()
+        
+        if level_up:
+            self.start_level(min(3 + self.level, 10))
+    
+    def add_explosion(self, x, y):
+        return self.entities.create_explosion(x, y)
     
     def update_explosions(self):
-        # 更新所有爆炸效果
-        i = 0
-        while i < len(self.explosions):
-            if self.explosions[i].update():
-                self.explosions.pop(i)
-            else:
-                i += 1
+        # 批量推进所有爆炸效果，播放完的爆炸直接删除
+        self.entities.tick_explosions()
     
-    def draw(self):
+    def draw(self, alpha=1.0):
+        # alpha：渲染时刻在上一逻辑帧和当前逻辑帧之间的位置（0~1），用于插值移动中的坦克和子弹
         if self.state == GameState.MENU:
             self.draw_menu()
+            # 离开菜单后的第一帧需要整屏重绘
+            self.full_redraw = True
             return
             
-        # 绘制背景
-        self.screen.fill(BLACK)
+        profiler = self.profiler
+        screen = self.screen
+        background = self.background
+        
+        # 暂停画面静止不变，绘制一次之后不再重绘
+        if self.state == GameState.PAUSED and self.paused_drawn and not self.full_redraw and not profiler.overlay:
+            return
         
-        # 绘制墙壁
-        for wall in self.walls:
-            wall.draw(self.screen)
+        # 只有游戏进行中坦克和子弹才会移动，其他状态直接使用当前位置
+        if self.state != GameState.PLAYING or self.previous is None:
+            alpha = 1.0
         
-        # 绘制道具
-        for power_up in self.power_ups:
-            power_up.draw(self.screen)
+        # 摄像机以玩家（插值后的位置）为中心
+        entities = self.entities
+        player = entities.index(self.player)
+        player_x, player_y = self.draw_position(player, alpha) if alpha < 1 else entities.rects[player].topleft
+        camera = self.camera
+        camera.follow(player_x + BLOCK_SIZE // 2, player_y + BLOCK_SIZE // 2)
+        view = camera.rect
+        offset_x, offset_y = camera.offset
         
-        # 绘制子弹
-        for bullet in self.bullets:
-            bullet.draw(self.screen)
+        # 更新背景层中变化的墙壁格子，视野移动时用可见区块重新拼出背景
+        with profiler.section('draw.walls'):
+            background.attach(self.walls)
+            changed_cells = background.refresh(view)
+            if changed_cells is None:
+                self.full_redraw = True
         
-        # 绘制坦克
-        self.player.draw(self.screen)
-        for enemy in self.enemies:
-            enemy.draw(self.screen)
+        # 绘制背景：整屏重绘，或者只用背景层擦除上一帧实体所在的区域和变化的格子
+        # 暂停和游戏结束画面有半透明遮罩，需要整屏重绘
+        full_redraw = self.full_redraw or self.state != GameState.PLAYING
+        if full_redraw:
+            erased = []
+            screen.blit(background.surface, (0, 0))
+        else:
+            erased = self.dirty_rects + changed_cells
+            for rect in erased:
+                screen.blit(background.surface, rect, rect)
         
-        # 绘制爆炸效果
-        for explosion in self.explosions:
-            explosion.draw(self.screen)
+        # 按原来的绘制顺序（道具、子弹、玩家、敌人、爆炸）收集精灵，一次blits全部绘制
+        # 只绘制视野中的实体，坐标换算到屏幕上
+        with profiler.section('draw.entities'):
+            atlas = self.atlas
+            rects = entities.rects
+            # 插值和精灵边缘可能超出实体矩形，放宽一格判断是否可见
+            visible = view.inflate(2 * BLOCK_SIZE, 2 * BLOCK_SIZE)
+            # 闪烁中不可见的道具不需要绘制，上一帧的图像会通过dirty_rects擦除
+            sprites = [atlas.power_up(rects[i].x - offset_x, rects[i].y - offset_y, POWER_UP_TYPES[entities.variant[i]])
+                       for i in entities.query(POWER_UP) if entities.visible[i] and visible.colliderect(rects[i])]
+            # 子弹（黄色玩家子弹，红色敌人子弹）
+            sprites.extend(atlas.bullet(x, y, is_player_bullet)
+                           for x, y, is_player_bullet in self.bullets.items(alpha, view))
+            tanks = ([entities.index(eid) for eid in self.players] +
+                     [i for i in entities.query(ENEMY) if visible.colliderect(rects[i])])
+            positions = ([(rects[i].x, rects[i].y) for i in tanks] if alpha >= 1 else
+                         [self.draw_position(i, alpha) for i in tanks])
+            sprites.extend(atlas.tank(x - offset_x, y - offset_y, TANK_COLORS[entities.kind[i]], entities.direction[i],
+                                      entities.health[i], entities.shield[i] > 0)
+                           for i, (x, y) in zip(tanks, positions))
+            sprites.extend(atlas.explosion(entities.x[i] - offset_x, entities.y[i] - offset_y,
+                                           entities.frame[i], entities.lifetime[i])
+                           for i in entities.query(EXPLOSION)
+                           if visible.collidepoint(entities.x[i], entities.y[i]))
+            dirty = screen.blits(sprites)
         
         # 绘制分数和等级
-        score_text = self.font.render(f'分数: {self.score}', True, WHITE)
-        level_text = self.font.render(f'等级: {self.level}', True, WHITE)
-        self.screen.blit(score_text, (10, 10))
-        self.screen.blit(level_text, (10, 50))
-        
-        # 如果游戏暂停，显示暂停信息
-        if self.state == GameState.PAUSED:
-            # 创建半透明背景
-            overlay = pygame.Surface((SCREEN_WIDTH, 100))
-            overlay.set_alpha(180)  # 设置透明度
-            overlay.fill(BLACK)
-            overlay_rect = overlay.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2))
-            self.screen.blit(overlay, overlay_rect)
-            
+        with profiler.section('draw.hud'):
+            # 分数和等级很少变化，基本都能命中缓存
+            score_text = self.text_cache.render(self.font, f'分数: {self.score}', WHITE)
+            level_text = self.text_cache.render(self.font, f'等级: {self.level}', WHITE)
+            dirty.append(screen.blit(score_text, (10, 10)))
+            dirty.append(screen.blit(level_text, (10, 50)))
+        
+        # 如果游戏暂停或结束，显示预先构建好的提示信息
+        if self.state in (GameState.PAUSED, GameState.GAME_OVER):
+            screen.blits(self.get_message_overlay(self.state))
+        
+        # 性能分析叠加层
+        if profiler.overlay:
+            sounds = self.sound_queue.stats()
+            counts = dict(self.entity_counts(), 音效合并=sounds['merged'], 音效丢弃=sounds['dropped'])
+            dirty.append(profiler.draw_overlay(screen, counts, self.clock.get_fps()))
+        
+        # 更新显示：只推送本帧和上一帧绘制过的区域，区域太多时整屏刷新
+        with profiler.section('draw.flip'):
+            if full_redraw or len(dirty) + len(erased) > MAX_DIRTY_RECTS:
+                pygame.display.flip()
+            else:
+                pygame.display.update(erased + dirty)
+        self.dirty_rects = dirty
+        self.full_redraw = False
+        self.paused_drawn = self.state == GameState.PAUSED
+    
+    def get_message_overlay(self, state):
+        # 暂停/游戏结束的半透明背景和文字只构建一次，返回可直接传给blits的列表
+        overlay = self.message_overlays.get(state)
+        if overlay is not None:
+            return overlay
+        
+        if state == GameState.PAUSED:
             # 使用醒目的字体和颜色
-            paused_text = self.game_over_font.render('游戏暂停', True, YELLOW)
-            continue_text = self.font.render('按P键继续', True, WHITE)
-            
-            # 设置文本位置
-            paused_rect = paused_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 20))
-            continue_rect = continue_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 20))
-            
-            # 绘制文本
-            self.screen.blit(paused_text, paused_rect)
-            self.screen.blit(continue_text, continue_rect)
-        
-        # 如果游戏结束，显示游戏结束信息
-        elif self.state == GameState.GAME_OVER:
-            # 创建半透明背景
-            overlay = pygame.Surface((SCREEN_WIDTH, 100))
-            overlay.set_alpha(180)  # 设置透明度
-            overlay.fill(BLACK)
-            overlay_rect = overlay.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2))
-            self.screen.blit(overlay, overlay_rect)
-            
+            title_text = self.game_over_font.render('游戏暂停', True, YELLOW)
+            hint_text = self.font.render('按P键继续', True, WHITE)
+        else:
             # 使用更醒目的字体和颜色
-            game_over_text = self.game_over_font.render('游戏结束!', True, RED)
-            restart_text = self.font.render('按R键重新开始', True, YELLOW)
-            
-            # 设置文本位置
-            game_over_rect = game_over_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 20))
-            restart_rect = restart_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 20))
-            
-            # 绘制文本
-            self.screen.blit(game_over_text, game_over_rect)
-            self.screen.blit(restart_text, restart_rect)
+            title_text = self.game_over_font.render('游戏结束!', True, RED)
+            hint_text = self.font.render('按R键重新开始', True, YELLOW)
+        
+        # 创建半透明背景
+        background = pygame.Surface((SCREEN_WIDTH, 100))
+        background.set_alpha(180)  # 设置透明度
+        background.fill(BLACK)
+        background_rect = background.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2))
+        
+        # 设置文本位置
+        title_rect = title_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 20))
+        hint_rect = hint_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 20))
+        
+        overlay = [(background, background_rect), (title_text, title_rect), (hint_text, hint_rect)]
+        self.message_overlays[state] = overlay
+        return overlay
+    
+    def entity_counts(self):
+        return {
+            '敌人': self.entities.count(ENEMY),
+            '子弹': len(self.bullets),
+            '墙': len(self.walls),
+            '爆炸': self.entities.count(EXPLOSION),
+            '道具': self.entities.count(POWER_UP),
+        }
+    
+    def pool_stats(self):
+        # 实体槽位和子弹数组的复用(hits)和扩容(misses)次数，稳定运行时misses应基本不再增加
+        return {
+            'entities': self.entities.stats(),
+            'bullets': self.bullets.stats(),
+        }
+    
+    def draw_menu(self):
+        # 菜单画面是静态的，只构建一次
+        if self.menu_surface is None:
+            self.menu_surface = self.build_menu()
+        self.screen.blit(self.menu_surface, (0, 0))
         
         # 更新显示
         pygame.display.flip()
     
-    def draw_menu(self):
+    def build_menu(self):
+        menu = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        
         # 绘制菜单背景
-        self.screen.fill(BLACK)
+        menu.fill(BLACK)
         
         # 绘制游戏标题
-        title_font = pygame.font.SysFont('SimHei', 64, bold=True)
+        title_font = get_font('SimHei', 64, bold=True)
         title_text = title_font.render('坦克大战', True, YELLOW)
         title_rect = title_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 4))
-        self.screen.blit(title_text, title_rect)
+        menu.blit(title_text, title_rect)
         
         # 绘制开始游戏提示
         start_text = self.font.render('按空格键开始游戏', True, WHITE)
         start_rect = start_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2))
-        self.screen.blit(start_text, start_rect)
+        menu.blit(start_text, start_rect)
         
         # 绘制操作说明
         controls_text1 = self.font.render('方向键: 移动坦克', True, GREEN)
@@ -767,65 +842,140 @@ class TankGame:
         controls_rect3 = controls_text3.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 140))
         controls_rect4 = controls_text4.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 180))
         
-        self.screen.blit(controls_text1, controls_rect1)
-        self.screen.blit(controls_text2, controls_rect2)
-        self.screen.blit(controls_text3, controls_rect3)
-        self.screen.blit(controls_text4, controls_rect4)
+        menu.blit(controls_text1, controls_rect1)
+        menu.blit(controls_text2, controls_rect2)
+        menu.blit(controls_text3, controls_rect3)
+        menu.blit(controls_text4, controls_rect4)
+        return menu
+    
+    def save_positions(self):
+        # 推进逻辑帧之前保存实体位置，渲染时在上一逻辑帧和当前逻辑帧之间插值
+        entities = self.entities
+        self.previous = (entities.x[:], entities.y[:], entities.serial[:])
+    
+    def draw_position(self, i, alpha):
+        # 坦克在两个逻辑帧之间的插值位置；上一逻辑帧之后新建的实体直接使用当前位置
+        entities = self.entities
+        rect = entities.rects[i]
+        previous_x, previous_y, previous_serial = self.previous
+        if i >= len(previous_serial) or previous_serial[i] != entities.serial[i]:
+            return rect.x, rect.y
+        x = previous_x[i] + (entities.x[i] - previous_x[i]) * alpha
+        y = previous_y[i] + (entities.y[i] - previous_y[i]) * alpha
+        return int(x + 0.5), int(y + 0.5)
+    
+    def tick(self, direction=None, fire=False, others=None):
+        # 推进一帧游戏逻辑，输入由调用者提供（键盘、脚本、回放或联机服务器）
+        # others：其他玩家的输入 {实体ID: (方向, 是否发射)}，只有联机模式使用
+        profiler = self.profiler
+        # 活动区域只在游戏进行中使用（菜单中还没有玩家）
+        if self.state == GameState.PLAYING:
+            self.update_active_area()
+        others = [(eid, others[eid]) for eid in self.players[1:] if eid in others] if others else []
         
-        # 更新显示
-        pygame.display.flip()
+        if self.state == GameState.PLAYING:
+            # 坦克计时器
+            with profiler.section('update_tank_timers'):
+                self.update_tank_timers()
+            
+            if fire:
+                self.player_shoot()
+            for eid, (_, other_fire) in others:
+                if other_fire:
+                    self.tank_shoot(self.entities.index(eid))
+        
+        # 处理玩家移动
+        with profiler.section('handle_player_movement'):
+            self.handle_player_movement(direction)
+            for eid, (other_direction, _) in others:
+                self.handle_player_movement(other_direction, eid)
+        
+        if self.state == GameState.PLAYING:
+            # 更新敌人
+            with profiler.section('update_enemies'):
+                self.update_enemies()
+            
+            # 更新子弹
+            with profiler.section('update_bullets'):
+                self.update_bullets()
+            
+            # 更新道具
+            with profiler.section('update_power_ups'):
+                self.update_power_ups()
+            
+            # 生成新敌人
+            self.enemy_spawn_timer += 1
+            if self.enemy_spawn_timer >= ENEMY_SPAWN_TIME and self.entities.count(ENEMY) < 5 + self.level:
+                with profiler.section('spawn_enemies'):
+                    self.spawn_enemies(1)
+                self.enemy_spawn_timer = 0
+        
+        # 更新爆炸效果
+        with profiler.section('update_explosions'):
+            self.update_explosions()
+        self.sound_queue.flush(self.ticks)
+        self.ticks += 1
     
     def run(self):
+        # 固定时间步长：游戏逻辑按TICK_RATE匀速推进，渲染帧率由渲染模式决定，
+        # 渲染变慢时每帧补推进多个逻辑帧，游戏速度不受渲染帧率影响
+        profiler = self.profiler
+        tick_time = 1.0 / TICK_RATE
+        accumulator = 0.0
+        last_time = time.perf_counter()
         while True:
-            self.clock.tick(FPS)  # 使用配置文件中的FPS
+            self.clock.tick(self.max_fps)
+            # 帧时间从等待结束后开始计算，只统计实际工作的耗时
+            profiler.begin_frame()
+            now = time.perf_counter()
+            accumulator += now - last_time
+            last_time = now
             
             # 处理事件
-            self.handle_events()
-            
-            # 处理玩家移动
-            self.handle_player_movement()
+            with profiler.section('handle_events'):
+                self.handle_events()
+            self.start_music()
             
-            if self.state == GameState.PLAYING:
-                # 更新敌人
-                self.update_enemies()
-                
-                # 更新子弹
-                self.update_bullets()
-                
-                # 更新道具
-                self.update_power_ups()
-                
-                # 生成新敌人
-                self.enemy_spawn_timer += 1
-                if self.enemy_spawn_timer >= ENEMY_SPAWN_TIME and len(self.enemies) < 5 + self.level:
-                    self.spawn_enemies(1)
-                    self.enemy_spawn_timer = 0
+            # 推进游戏逻辑（暂停时不推进，保证录像与实际游戏一致）
+            if self.state == GameState.PAUSED:
+                accumulator = 0.0
+            steps = 0
+            while accumulator >= tick_time and self.state != GameState.PAUSED:
+                if steps == MAX_CATCH_UP_TICKS:
+                    # 落后太多时丢弃剩余的时间
+                    accumulator = 0.0
+                    break
+                accumulator -= tick_time
+                steps += 1
+                # 发射键只在一个逻辑帧中生效
+                fire, self.fire_requested = self.fire_requested, False
+                direction = self.get_keyboard_direction()
+                with profiler.section('tick'):
+                    self.save_positions()
+                    # 录像从reset_game开始新的一局时才开始记录，菜单中的逻辑帧不录制
+                    if self.recorder is not None and self.recorder.game is not None:
+                        self.recorder.tick(direction, fire)
+                    else:
+                        self.tick(direction, fire)
             
-            # 更新爆炸效果
-            self.update_explosions()
+            # 绘制游戏，移动中的实体按剩余时间在两个逻辑帧之间插值
+            with profiler.section('draw'):
+                self.draw(accumulator / tick_time)
             
-            # 绘制游戏
-            self.draw()
+            profiler.end_frame(self.entity_counts() if profiler.tracing and self.player is not None else None)
 
     def spawn_power_up(self):
         # 随机选择道具类型
-        power_type = random.choice(["health", "speed", "shield"])
+        power_type = self.rng.choice(POWER_UP_TYPES)
         
-        # 随机位置生成道具
-        while True:
-            x = random.randint(1, (SCREEN_WIDTH // BLOCK_SIZE) - 2) * BLOCK_SIZE
-            y = random.randint(1, (SCREEN_HEIGHT // BLOCK_SIZE) - 2) * BLOCK_SIZE
-            
-            # 确保不会与其他物体重叠
-            rect = pygame.Rect(x, y, BLOCK_SIZE, BLOCK_SIZE)
-            if not any(wall.rect.colliderect(rect) for wall in self.walls) and \
-               not any(enemy.rect.colliderect(rect) for enemy in self.enemies) and \
-               not self.player.rect.colliderect(rect) and \
-               not any(power_up.rect.colliderect(rect) for power_up in self.power_ups):
-                break
+        # 随机选一个没有墙、坦克和其他道具的格子，没有空位时不生成，返回None
+        cell = self.spawn_choice('power_up')
+        if cell is None:
+            return None
         
         # 创建道具
-        self.power_ups.append(PowerUp(x, y, power_type))
+        x, y = self.walls.cell_position(*cell)
+        return self.entities.create_power_up(x, y, power_type)
         
     def update_power_ups(self):
         if self.state != GameState.PLAYING:
@@ -833,24 +983,52 @@ class TankGame:
             
         # 更新道具生成计时器
         self.power_up_timer += 1
-        if self.power_up_timer >= POWER_UP_SPAWN_TIME and len(self.power_ups) < POWER_UP_MAX_COUNT:
+        if self.power_up_timer >= POWER_UP_SPAWN_TIME and self.entities.count(POWER_UP) < POWER_UP_MAX_COUNT:
             self.spawn_power_up()
             self.power_up_timer = 0
         
-        # 更新所有道具
-        i = 0
-        while i < len(self.power_ups):
-            if self.power_ups[i].update():
-                self.power_ups.pop(i)
-            else:
-                # 检查玩家是否拾取道具
-                if self.player.rect.colliderect(self.power_ups[i].rect):
-                    self.player.apply_power_up(self.power_ups[i].type)
-                    self.power_ups.pop(i)
-                else:
-                    i += 1
+        # 批量更新所有道具的剩余时间和闪烁状态
+        entities = self.entities
+        entities.tick_power_ups()
+        
+        # 只在玩家附近的格子中查找被拾取的道具，几名玩家同时碰到时由靠前的玩家拾取
+        picked = {}
+        for eid in self.players:
+            player = entities.index(eid)
+            for i in self.power_up_grid.query(entities.rects[player]):
+                picked.setdefault(i, player)
+        for i in list(entities.query(POWER_UP)):
+            if entities.lifetime[i] <= 0:
+                entities.remove(i)
+            elif i in picked:
+                self.apply_power_up(picked[i], POWER_UP_TYPES[entities.variant[i]])
+                entities.remove(i)
 
 # 运行游戏
 if __name__ == "__main__":
-    game = TankGame()
+    import argparse
+    parser = argparse.ArgumentParser(description='坦克大战')
+    parser.add_argument('--seed', type=int, default=None, help='随机数种子，用于复现游戏')
+    parser.add_argument('--record', metavar='FILE', default=None, help='把游戏过程录制到录像文件')
+    parser.add_argument('--profile', action='store_true', help='启动时显示性能分析叠加层（F3键切换）')
+    parser.add_argument('--trace', metavar='FILE', default=None, help='退出时把性能跟踪保存为Chrome trace JSON')
+    parser.add_argument('--render', choices=RENDER_MODES, default=RENDER_MODE,
+                        help='渲染模式：capped按FPS限制帧率，uncapped不限制，vsync跟随显示器刷新率')
+    parser.add_argument('--levels', metavar='FILE', default=None, help='使用关卡包中设计好的关卡代替随机地图')
+    parser.add_argument('--world', metavar='WxH', type=parse_world_size, default=None,
+                        help='世界大小（像素），例如8000x6000，默认与窗口相同')
+    args = parser.parse_args()
+    
+    game = TankGame(seed=args.seed, render_mode=args.render, world_size=args.world)
+    if args.levels:
+        from level_pack import LevelPack
+        game.use_level_pack(LevelPack(args.levels))
+    if args.record:
+        from replay import ReplayRecorder
+        game.recorder = ReplayRecorder(args.record)
+    if args.profile:
+        game.profiler.toggle_overlay()
+    if args.trace:
+        game.trace_path = args.trace
+        game.profiler.start_trace()
     game.run()
\ No newline at end of file